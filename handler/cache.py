@@ -0,0 +1,188 @@
+"""
+Cache read-through au-dessus de Valkey/Redis.
+
+- TTL par entrée, TTL court pour les absences (cache négatif)
+- coalescence des chargements concurrents (single-flight) dans le conteneur
+  et entre conteneurs via un verrou SET NX PX
+- clés versionnées par groupe : une écriture incrémente la version du groupe,
+  les anciennes entrées ne sont plus lues et expirent d'elles-mêmes
+"""
+import json
+import threading
+import time
+
+MISSING = {"__missing__": True}
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_ratio": self.hit_ratio,
+        }
+
+
+class ReadThroughCache:
+    def __init__(
+        self,
+        client,
+        namespace: str = "app",
+        default_ttl: int = 300,
+        negative_ttl: int = 30,
+        lock_ttl_ms: int = 5000,
+        wait_interval: float = 0.01,
+        version_cache_seconds: float = 0.0,
+        sleep=time.sleep,
+    ):
+        self.client = client
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_interval = wait_interval
+        self.version_cache_seconds = version_cache_seconds
+        self._sleep = sleep
+        self._versions = {}
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def _version_key(self, group: str) -> str:
+        return f"{self.namespace}:version:{group}"
+
+    def version(self, group: str) -> int:
+        # Optionnel : garder la version en mémoire évite un aller-retour par lecture,
+        # au prix de `version_cache_seconds` de lecture obsolète après une écriture d'un autre conteneur
+        cached = self._versions.get(group)
+        if cached and time.monotonic() - cached[1] < self.version_cache_seconds:
+            return cached[0]
+        value = self.client.get(self._version_key(group))
+        version = int(value) if value else 0
+        self._versions[group] = (version, time.monotonic())
+        return version
+
+    def make_key(self, group: str, key: str) -> str:
+        return f"{self.namespace}:{group}:v{self.version(group)}:{key}"
+
+    def invalidate(self, group: str) -> int:
+        """À appeler après une écriture : toutes les clés du groupe deviennent obsolètes."""
+        version = int(self.client.incr(self._version_key(group)))
+        self._versions[group] = (version, time.monotonic())
+        return version
+
+    def _decode(self, raw):
+        value = json.loads(raw)
+        return None if value == MISSING else value
+
+    def _store(self, cache_key: str, value, ttl: int) -> None:
+        if value is None:
+            self.client.set(cache_key, json.dumps(MISSING), ex=self.negative_ttl)
+        else:
+            self.client.set(cache_key, json.dumps(value), ex=ttl)
+
+    def get(self, group: str, key: str, loader, ttl: int = None):
+        try:
+            cache_key = self.make_key(group, key)
+            raw = self.client.get(cache_key)
+        except Exception:
+            # Cache indisponible : on sert depuis la source plutôt que d'échouer
+            self.stats.errors += 1
+            self.stats.loads += 1
+            return loader()
+
+        if raw is not None:
+            self.stats.hits += 1
+            return self._decode(raw)
+
+        self.stats.misses += 1
+        return self._load_once(cache_key, loader, ttl or self.default_ttl)
+
+    def _load_once(self, cache_key: str, loader, ttl: int):
+        with self._inflight_lock:
+            waiter = self._inflight.get(cache_key)
+            if waiter is None:
+                waiter = {"event": threading.Event(), "value": None, "error": None}
+                self._inflight[cache_key] = waiter
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            self.stats.coalesced += 1
+            waiter["event"].wait()
+            if waiter["error"] is not None:
+                raise waiter["error"]
+            return waiter["value"]
+
+        try:
+            waiter["value"] = self._load_distributed(cache_key, loader, ttl)
+            return waiter["value"]
+        except Exception as e:
+            waiter["error"] = e
+            raise
+        finally:
+            waiter["event"].set()
+            with self._inflight_lock:
+                self._inflight.pop(cache_key, None)
+
+    def _load_distributed(self, cache_key: str, loader, ttl: int):
+        lock_key = f"{cache_key}:lock"
+        token = f"{id(self)}:{threading.get_ident()}:{time.monotonic_ns()}"
+
+        try:
+            acquired = self.client.set(lock_key, token, nx=True, px=self.lock_ttl_ms)
+        except Exception:
+            self.stats.errors += 1
+            acquired = True
+
+        if not acquired:
+            # Un autre conteneur charge la même clé : on attend sa valeur jusqu'à l'expiration du verrou
+            deadline = time.monotonic() + self.lock_ttl_ms / 1000
+            while time.monotonic() < deadline:
+                self._sleep(self.wait_interval)
+                raw = self.client.get(cache_key)
+                if raw is not None:
+                    self.stats.coalesced += 1
+                    return self._decode(raw)
+
+        self.stats.loads += 1
+        value = loader()
+        try:
+            self._store(cache_key, value, ttl)
+            if acquired:
+                if self.client.get(lock_key) in (token, token.encode()):
+                    self.client.delete(lock_key)
+        except Exception:
+            self.stats.errors += 1
+        return value
+
+
+def connect(endpoint: str, port: int = 6379, tls: bool = True):
+    try:
+        import redis
+    except ImportError:
+        return None
+
+    return redis.Redis(
+        host=endpoint,
+        port=port,
+        ssl=tls,
+        socket_connect_timeout=1,
+        socket_timeout=0.5,
+    )
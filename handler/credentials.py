@@ -0,0 +1,68 @@
+"""
+Cache des identifiants base de données lus dans Secrets Manager.
+
+Avec la rotation à utilisateurs alternés, l'ancien utilisateur reste valide
+pendant toute une période de rotation : les connexions chaudes continuent de
+fonctionner et seul un échec d'authentification déclenche une relecture de la
+version AWSCURRENT, une seule fois par tentative de connexion.
+"""
+import json
+import threading
+
+AUTH_FAILURE_SQLSTATES = {"28P01", "28000"}
+
+
+def is_auth_failure(error: Exception) -> bool:
+    sqlstate = getattr(error, "sqlstate", None) or getattr(error, "pgcode", None)
+    if sqlstate in AUTH_FAILURE_SQLSTATES:
+        return True
+    return "password authentication failed" in str(error)
+
+
+class CredentialCache:
+    def __init__(self, secret_id: str, client_factory=None):
+        self.secret_id = secret_id
+        self._client_factory = client_factory or self._default_client
+        self._client = None
+        self._credentials = None
+        self._version_id = None
+        self._lock = threading.Lock()
+        self.refreshes = 0
+
+    @staticmethod
+    def _default_client():
+        import boto3
+
+        return boto3.client("secretsmanager")
+
+    def _fetch(self) -> None:
+        if self._client is None:
+            self._client = self._client_factory()
+        secret = self._client.get_secret_value(SecretId=self.secret_id, VersionStage="AWSCURRENT")
+        self._credentials = json.loads(secret["SecretString"])
+        self._version_id = secret.get("VersionId")
+
+    def get(self) -> dict:
+        with self._lock:
+            if self._credentials is None:
+                self._fetch()
+            return self._credentials
+
+    def refresh(self, stale_version_id: str = None) -> dict:
+        with self._lock:
+            # Un autre thread a déjà rechargé une version plus récente
+            if stale_version_id is None or stale_version_id == self._version_id:
+                self._fetch()
+                self.refreshes += 1
+            return self._credentials
+
+    def connect(self, connect_with):
+        """Appelle `connect_with(credentials)`, relit AWSCURRENT une fois sur échec d'authentification."""
+        credentials = self.get()
+        version_id = self._version_id
+        try:
+            return connect_with(credentials)
+        except Exception as e:
+            if not is_auth_failure(e):
+                raise
+        return connect_with(self.refresh(version_id))
@@ -0,0 +1,142 @@
+"""
+Routage des connexions PostgreSQL entre le primaire et les réplicas de lecture.
+
+Les transactions en lecture seule partent sur un réplica dont le retard de
+réplication est sous le seuil, les autres (ou en cas d'échec) sur le primaire.
+Un réplica qui perd la connexion en cours de requête est écarté pendant
+`retry_after` secondes et `run` rejoue la lecture sur le primaire.
+Les connexions sont conservées entre invocations d'un même conteneur.
+"""
+import itertools
+import time
+from contextlib import contextmanager
+
+REPLICA_LAG_QUERY = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+
+def is_operational_error(error: Exception) -> bool:
+    # DB-API 2.0 : serveur injoignable ou connexion coupée, quel que soit le driver
+    return any(cls.__name__ == "OperationalError" for cls in type(error).__mro__)
+
+
+class DatabaseRouter:
+    def __init__(
+        self,
+        connect,
+        primary_host: str,
+        replica_hosts: list[str] = None,
+        max_lag_seconds: float = 30.0,
+        lag_check_interval: float = 5.0,
+        retry_after: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self._connect = connect
+        self.primary_host = primary_host
+        self.replica_hosts = list(replica_hosts or [])
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_check_interval = lag_check_interval
+        self.retry_after = retry_after
+        self._clock = clock
+        self._connections = {}
+        self.last_host = None
+        self._lag = {}
+        self._unhealthy_until = {}
+        self._cycle = itertools.cycle(self.replica_hosts) if self.replica_hosts else None
+
+    def _get_connection(self, host: str):
+        conn = self._connections.get(host)
+        if conn is None or getattr(conn, "closed", False):
+            conn = self._connect(host)
+            self._connections[host] = conn
+        return conn
+
+    def _discard(self, host: str) -> None:
+        conn = self._connections.pop(host, None)
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _mark_unhealthy(self, host: str) -> None:
+        self._discard(host)
+        self._lag.pop(host, None)
+        self._unhealthy_until[host] = self._clock() + self.retry_after
+
+    def replica_lag(self, host: str) -> float:
+        now = self._clock()
+        cached = self._lag.get(host)
+        if cached and now - cached[1] < self.lag_check_interval:
+            return cached[0]
+        conn = self._get_connection(host)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(REPLICA_LAG_QUERY)
+            lag = float(cursor.fetchone()[0] or 0)
+        finally:
+            cursor.close()
+            conn.rollback()
+        self._lag[host] = (lag, now)
+        return lag
+
+    def choose_replica(self):
+        if not self._cycle:
+            return None
+        now = self._clock()
+        for _ in range(len(self.replica_hosts)):
+            host = next(self._cycle)
+            if self._unhealthy_until.get(host, 0) > now:
+                continue
+            try:
+                if self.replica_lag(host) <= self.max_lag_seconds:
+                    return host
+            except Exception:
+                self._mark_unhealthy(host)
+        return None
+
+    @contextmanager
+    def connection(self, readonly: bool = False):
+        host = self.choose_replica() if readonly else None
+        if host is not None:
+            try:
+                conn = self._get_connection(host)
+            except Exception:
+                self._mark_unhealthy(host)
+                host = None
+        if host is None:
+            host = self.primary_host
+            conn = self._get_connection(host)
+        self.last_host = host
+
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            if host != self.primary_host and is_operational_error(e):
+                self._mark_unhealthy(host)
+                raise
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(host)
+            raise
+
+    def run(self, work, readonly: bool = False):
+        """`work(conn)` dans une transaction ; une lecture dont le réplica tombe est rejouée sur le primaire."""
+        try:
+            with self.connection(readonly=readonly) as conn:
+                return work(conn)
+        except Exception as e:
+            if self.last_host == self.primary_host or not is_operational_error(e):
+                raise
+        with self.connection() as conn:
+            return work(conn)
+
+    def close(self) -> None:
+        for host in list(self._connections):
+            self._discard(host)
@@ -0,0 +1,175 @@
+import json
+import os
+import time
+import uuid
+
+import cache
+from credentials import CredentialCache
+from db_router import DatabaseRouter
+from object_cache import ObjectCache
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# Invocation synthétique de `control.py lambda warm` : jamais présent dans un événement API Gateway
+WARMUP_KEY = "warmup"
+CONTAINER_ID = uuid.uuid4().hex[:12]
+
+_invocations = 0
+
+_router = None
+_credentials = None
+_cache = None
+_objects = None
+
+
+def get_credentials() -> CredentialCache:
+    global _credentials
+    if _credentials is None:
+        _credentials = CredentialCache(os.environ["DB_SECRET_ARN"])
+    return _credentials
+
+
+def connect(host: str):
+    import psycopg
+
+    def connect_with(credentials: dict):
+        return psycopg.connect(
+            host=host.split(":")[0],
+            port=int(os.environ.get("DB_PORT", "5432")),
+            dbname=os.environ.get("DB_NAME", "appdb"),
+            user=credentials["username"],
+            password=credentials["password"],
+            connect_timeout=5,
+        )
+
+    return get_credentials().connect(connect_with)
+
+
+def get_router() -> DatabaseRouter:
+    global _router
+    if _router is None:
+        read_hosts = os.environ.get("DB_READ_HOST", "")
+        _router = DatabaseRouter(
+            connect=connect,
+            primary_host=os.environ["DB_HOST"],
+            replica_hosts=[host for host in read_hosts.split(",") if host],
+            max_lag_seconds=float(os.environ.get("DB_MAX_REPLICA_LAG", "30")),
+        )
+    return _router
+
+
+def get_cache():
+    global _cache
+    if _cache is None and os.environ.get("CACHE_ENDPOINT"):
+        client = cache.connect(os.environ["CACHE_ENDPOINT"])
+        if client is not None:
+            _cache = cache.ReadThroughCache(
+                client,
+                namespace=os.environ.get("ENVIRONMENT", "dev"),
+                default_ttl=int(os.environ.get("CACHE_TTL", "300")),
+            )
+    return _cache
+
+
+def get_objects() -> ObjectCache:
+    global _objects
+    if _objects is None:
+        _objects = ObjectCache(
+            os.environ["DATA_BUCKET"],
+            memory_budget_bytes=int(os.environ.get("OBJECT_CACHE_MEMORY_BYTES", str(32 * 1024**2))),
+            disk_budget_bytes=int(os.environ.get("OBJECT_CACHE_DISK_BYTES", str(384 * 1024**2))),
+        )
+    return _objects
+
+
+def is_read_only(event) -> bool:
+    method = event.get("requestContext", {}).get("http", {}).get("method", "GET")
+    return method.upper() in READ_METHODS
+
+
+def response(status_code: int, body: dict) -> dict:
+    return {
+        'statusCode': status_code,
+        'headers': {
+            'Content-Type': 'application/json',
+            'Access-Control-Allow-Origin': '*'
+        },
+        'body': json.dumps(body)
+    }
+
+
+def select_one(conn) -> None:
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchone()
+    cursor.close()
+
+
+def db_health(event) -> dict:
+    router = get_router()
+    router.run(select_one, readonly=is_read_only(event))
+    return response(200, {
+        'database': 'ok',
+        'host': 'primary' if router.last_host == router.primary_host else 'replica',
+    })
+
+
+def cache_health() -> dict:
+    read_through = get_cache()
+    if read_through is None:
+        return response(200, {'cache': 'disabled'})
+    read_through.client.ping()
+    return response(200, {'cache': 'ok', 'stats': read_through.stats.as_dict()})
+
+
+def warmup(options: dict) -> dict:
+    """Ouvre les connexions du conteneur puis le garde occupé `hold_ms` pour que les invocations concurrentes en démarrent d'autres."""
+    def database():
+        with get_router().connection() as conn:
+            conn.cursor().execute("SELECT 1")
+
+    def read_through():
+        get_cache().client.ping()
+
+    initializers = {
+        "database": database if os.environ.get("DB_HOST") else None,
+        "cache": read_through if get_cache() is not None else None,
+        "objects": get_objects if os.environ.get("DATA_BUCKET") else None,
+    }
+    initialized, errors = [], {}
+    for name, initialize in initializers.items():
+        if initialize is None:
+            continue
+        try:
+            initialize()
+            initialized.append(name)
+        except Exception as e:
+            errors[name] = str(e)[:200]
+
+    time.sleep(min(int(options.get("hold_ms", 0)), 10_000) / 1000)
+    return {
+        "container": CONTAINER_ID,
+        "cold": _invocations == 1,
+        "initialized": initialized,
+        "errors": errors,
+    }
+
+
+def handler(event, context):
+    global _invocations
+    _invocations += 1
+    if WARMUP_KEY in event:
+        return warmup(event[WARMUP_KEY] or {})
+
+    try:
+        if event.get('rawPath', '').endswith('/health/db'):
+            return db_health(event)
+        if event.get('rawPath', '').endswith('/health/cache'):
+            return cache_health()
+        return response(200, {
+            'message': 'Lamdba is up brother',
+        })
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': str(e)})
+        }
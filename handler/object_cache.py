@@ -0,0 +1,210 @@
+"""
+Cache local des objets du bucket data, propre à chaque conteneur Lambda.
+
+- deux niveaux : mémoire pour les petits objets, /tmp pour les gros
+- éviction LRU sur un budget en octets par niveau
+- revalidation conditionnelle par ETag (If-None-Match) après `revalidate_after` secondes
+- accès mmap en lecture seule aux fichiers déjà sur disque
+"""
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+NOT_MODIFIED_CODES = {"304", "NotModified"}
+
+
+def is_not_modified(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    code = str(response.get("Error", {}).get("Code", ""))
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in NOT_MODIFIED_CODES or status == 304
+
+
+class Entry:
+    __slots__ = ("etag", "size", "fetched_at", "data", "path")
+
+    def __init__(self, etag: str, size: int, fetched_at: float, data: bytes = None, path: str = None):
+        self.etag = etag
+        self.size = size
+        self.fetched_at = fetched_at
+        self.data = data
+        self.path = path
+
+
+class LRUTier:
+    def __init__(self, budget_bytes: int, on_evict=None):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._on_evict = on_evict
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: Entry) -> None:
+        self.pop(key)
+        self._entries[key] = entry
+        self.used_bytes += entry.size
+        while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._release(evicted)
+            self.evictions += 1
+
+    def pop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._release(entry)
+        return entry
+
+    def _release(self, entry: Entry) -> None:
+        self.used_bytes -= entry.size
+        if self._on_evict is not None:
+            self._on_evict(entry)
+
+
+class ObjectCache:
+    def __init__(
+        self,
+        bucket: str,
+        s3_client=None,
+        memory_budget_bytes: int = 64 * 1024**2,
+        disk_budget_bytes: int = 384 * 1024**2,
+        small_object_bytes: int = 256 * 1024,
+        revalidate_after: float = 60.0,
+        directory: str = None,
+        clock=time.monotonic,
+    ):
+        self.bucket = bucket
+        self._client = s3_client
+        self.small_object_bytes = small_object_bytes
+        self.revalidate_after = revalidate_after
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "object-cache")
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.memory = LRUTier(memory_budget_bytes)
+        self.disk = LRUTier(disk_budget_bytes, on_evict=self._remove_file)
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "refreshed": 0}
+
+        # /tmp survit aux redémarrages du runtime dans le même environnement d'exécution,
+        # mais pas l'index en mémoire : on repart d'un répertoire vide
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client("s3")
+        return self._client
+
+    @staticmethod
+    def _remove_file(entry: Entry) -> None:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+    def _lookup(self, key: str):
+        return self.memory.get(key) or self.disk.get(key)
+
+    def _fetch(self, key: str, etag: str = None):
+        params = {"Bucket": self.bucket, "Key": key}
+        if etag:
+            params["IfNoneMatch"] = etag
+        try:
+            return self.client.get_object(**params)
+        except Exception as e:
+            if etag and is_not_modified(e):
+                return None
+            raise
+
+    def _store(self, key: str, resp: dict) -> Entry:
+        etag = resp.get("ETag")
+        size = resp.get("ContentLength")
+        now = self._clock()
+
+        if size is not None and size <= self.small_object_bytes:
+            entry = Entry(etag, size, now, data=resp["Body"].read())
+            self.disk.pop(key)
+            self.memory.put(key, entry)
+            return entry
+
+        # Le fichier n'est indexé qu'une fois entièrement écrit
+        fd, path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as handle:
+            for chunk in resp["Body"].iter_chunks(1024 * 1024):
+                handle.write(chunk)
+
+        entry = Entry(etag, os.path.getsize(path), now, path=path)
+        self.memory.pop(key)
+        self.disk.put(key, entry)
+        return entry
+
+    def _resolve(self, key: str) -> Entry:
+        """Entrée à jour de `key` ; l'appelant tient `self._lock`."""
+        entry = self._lookup(key)
+        if entry is not None and self._clock() - entry.fetched_at < self.revalidate_after:
+            self.stats["hits"] += 1
+            return entry
+
+        if entry is None:
+            self.stats["misses"] += 1
+            return self._store(key, self._fetch(key))
+
+        resp = self._fetch(key, entry.etag)
+        if resp is None:
+            self.stats["revalidated"] += 1
+            entry.fetched_at = self._clock()
+            return entry
+
+        self.stats["refreshed"] += 1
+        return self._store(key, resp)
+
+    def _entry(self, key: str) -> Entry:
+        with self._lock:
+            return self._resolve(key)
+
+    def get(self, key: str) -> bytes:
+        entry = self._entry(key)
+        if entry.data is not None:
+            return entry.data
+        with open(entry.path, "rb") as handle:
+            return handle.read()
+
+    def path(self, key: str) -> str:
+        """Chemin local de l'objet, les petits objets sont déplacés sur disque pour l'occasion."""
+        with self._lock:
+            entry = self._resolve(key)
+            if entry.path is None:
+                fd, path = tempfile.mkstemp(dir=self.directory)
+                with os.fdopen(fd, "wb") as handle:
+                    handle.write(entry.data)
+                entry = Entry(entry.etag, entry.size, entry.fetched_at, path=path)
+                self.memory.pop(key)
+                self.disk.put(key, entry)
+            return entry.path
+
+    def open_mmap(self, key: str) -> mmap.mmap:
+        """mmap en lecture seule, reste valide même si l'entrée est évincée ensuite."""
+        with open(self.path(key), "rb") as handle:
+            return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self.memory.pop(key)
+            self.disk.pop(key)
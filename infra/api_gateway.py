@@ -1,11 +1,34 @@
+import json
 import pulumi
 import pulumi_aws as aws
 
+from infra.api_routes import INTEGRATION_TIMEOUT_MAX_SECONDS, RouteFunction
+
 config = pulumi.Config()
 environment = config.get("environment") or "dev"
 
+ACCESS_LOG_FORMAT = {
+    "requestId": "$context.requestId",
+    "ip": "$context.identity.sourceIp",
+    "requestTime": "$context.requestTime",
+    "httpMethod": "$context.httpMethod",
+    "routeKey": "$context.routeKey",
+    "status": "$context.status",
+    "responseLength": "$context.responseLength",
+    "requestTimeEpoch": "$context.requestTimeEpoch",
+    "responseLatency": "$context.responseLatency",
+    "integrationLatency": "$context.integrationLatency",
+    "integrationStatus": "$context.integrationStatus",
+    "integrationError": "$context.integrationErrorMessage",
+    "errorMessage": "$context.error.message",
+}
+
 
-def create_api_gateway(lambda_function: aws.lambda_.Function):
+def create_api_gateway(
+    lambda_function: aws.lambda_.Function | aws.lambda_.Alias,
+    route_functions: list[tuple[RouteFunction, aws.lambda_.Function]] = None,
+    opts: pulumi.ResourceOptions = None,
+):
 
     api = aws.apigatewayv2.Api(
         f"main-api-{environment}",
@@ -22,6 +45,7 @@ def create_api_gateway(lambda_function: aws.lambda_.Function):
             "Name": f"main-api-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     integration = aws.apigatewayv2.Integration(
@@ -31,6 +55,7 @@ def create_api_gateway(lambda_function: aws.lambda_.Function):
         integration_uri=lambda_function.arn,
         integration_method="POST",
         payload_format_version="2.0",
+        opts=opts,
     )
 
     route = aws.apigatewayv2.Route(
@@ -38,6 +63,7 @@ def create_api_gateway(lambda_function: aws.lambda_.Function):
         api_id=api.id,
         route_key="$default",
         target=integration.id.apply(lambda id: f"integrations/{id}"),
+        opts=opts,
     )
 
     api_route = aws.apigatewayv2.Route(
@@ -45,31 +71,96 @@ def create_api_gateway(lambda_function: aws.lambda_.Function):
         api_id=api.id,
         route_key="ANY /api/{proxy+}",
         target=integration.id.apply(lambda id: f"integrations/{id}"),
+        opts=opts,
     )
 
+    routes = create_function_routes(api, route_functions or [], opts=opts)
+
+    log_group = create_api_log_group(opts=opts)
+
+    # Limites propres à chaque route : une route lourde ne consomme pas le quota des autres
+    route_settings = [
+        aws.apigatewayv2.StageRouteSettingArgs(
+            route_key=route.key,
+            detailed_metrics_enabled=True,
+            throttling_burst_limit=route.burst,
+            throttling_rate_limit=route.rate,
+        )
+        for function, _ in route_functions or []
+        for route in function.routes
+        if route.burst is not None or route.rate is not None
+    ]
+
+    # Limite des routes sans réglage propre, par défaut celle du compte (burst 5000, 10000 req/s)
+    burst_limit = config.get_int("api_throttling_burst_limit") or 5000
+    rate_limit = config.get_float("api_throttling_rate_limit") or 10000
+
     stage = aws.apigatewayv2.Stage(
         f"api-stage-{environment}",
         api_id=api.id,
         name=environment,
         auto_deploy=True,
+        default_route_settings=aws.apigatewayv2.StageDefaultRouteSettingsArgs(
+            detailed_metrics_enabled=True,
+            throttling_burst_limit=burst_limit,
+            throttling_rate_limit=rate_limit,
+        ),
+        route_settings=route_settings or None,
         access_log_settings=aws.apigatewayv2.StageAccessLogSettingsArgs(
-            destination_arn=create_api_log_group().arn,
-            format='{"requestId":"$context.requestId","ip":"$context.identity.sourceIp","requestTime":"$context.requestTime","httpMethod":"$context.httpMethod","routeKey":"$context.routeKey","status":"$context.status","responseLength":"$context.responseLength"}',
+            destination_arn=log_group.arn,
+            format=json.dumps(ACCESS_LOG_FORMAT, separators=(",", ":")),
         ),
         tags={
             "Name": f"api-stage-{environment}",
             "Environment": environment,
         },
+        # Un réglage de route exige que la route existe
+        opts=pulumi.ResourceOptions.merge(opts, pulumi.ResourceOptions(depends_on=routes)),
     )
 
     return {
         "api": api,
         "stage": stage,
         "integration": integration,
+        "routes": routes,
+        "log_group": log_group,
     }
 
 
-def create_api_log_group():
+def create_function_routes(
+    api: aws.apigatewayv2.Api,
+    route_functions: list[tuple[RouteFunction, aws.lambda_.Function]],
+    opts: pulumi.ResourceOptions = None,
+):
+
+    routes = []
+    for function, lambda_function in route_functions:
+        integration = aws.apigatewayv2.Integration(
+            f"lambda-integration-{function.name}-{environment}",
+            api_id=api.id,
+            integration_type="AWS_PROXY",
+            integration_uri=lambda_function.arn,
+            integration_method="POST",
+            payload_format_version="2.0",
+            timeout_milliseconds=min(function.timeout, INTEGRATION_TIMEOUT_MAX_SECONDS) * 1000,
+            opts=opts,
+        )
+
+        for route in function.routes:
+            routes.append(
+                aws.apigatewayv2.Route(
+                    f"route-{route.slug}-{environment}",
+                    api_id=api.id,
+                    route_key=route.key,
+                    target=integration.id.apply(lambda id: f"integrations/{id}"),
+                    opts=opts,
+                )
+            )
+
+    return routes
+
+
+def create_api_log_group(opts: pulumi.ResourceOptions = None):
 
     log_group = aws.cloudwatch.LogGroup(
         f"api-gateway-logs-{environment}",
@@ -79,6 +170,7 @@ def create_api_log_group():
             "Name": f"api-gateway-logs-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     return log_group
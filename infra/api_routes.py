@@ -0,0 +1,126 @@
+"""
+Route table: API routes served by dedicated, independently sized Lambda functions
+"""
+import re
+from dataclasses import dataclass
+
+import pulumi
+
+from infra.capacity import load_capacity
+
+# Routes servies par api-handler, toujours présentes
+HANDLER_ROUTE_KEYS = ("$default", "ANY /api/{proxy+}")
+HTTP_METHODS = ("ANY", "GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE")
+# Au-delà, API Gateway HTTP répond 503 même si la Lambda continue
+INTEGRATION_TIMEOUT_MAX_SECONDS = 30
+
+FUNCTION_NAME = re.compile(r"^[a-z][a-z0-9-]{0,30}$")
+
+
+@dataclass(frozen=True)
+class Route:
+    key: str
+    burst: int = None
+    rate: float = None
+
+    @property
+    def slug(self) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", self.key.lower().replace("{proxy+}", "proxy")).strip("-")
+
+
+@dataclass(frozen=True)
+class RouteFunction:
+    name: str
+    memory_size: int
+    timeout: int
+    reserved_concurrency: int = None
+    routes: tuple[Route, ...] = ()
+
+
+def parse_route(key: str, settings: dict) -> Route:
+    method, _, path = key.partition(" ")
+    if method not in HTTP_METHODS or not path.startswith("/"):
+        raise ValueError(f"Invalid route key '{key}': expected 'METHOD /path'")
+
+    settings = settings or {}
+    unknown = set(settings) - {"burst", "rate"}
+    if unknown:
+        raise ValueError(f"Unknown settings for route '{key}': {sorted(unknown)}")
+    burst, rate = settings.get("burst"), settings.get("rate")
+    if burst is not None and int(burst) < 0 or rate is not None and float(rate) < 0:
+        raise ValueError(f"Throttling limits for route '{key}' must not be negative")
+
+    return Route(
+        key=key,
+        burst=None if burst is None else int(burst),
+        rate=None if rate is None else float(rate),
+    )
+
+
+def resolve_route_table(spec: dict, capacity: dict) -> dict:
+    """
+    Valide `api_routes` et partage le budget de connexions entre api-handler et les fonctions dédiées.
+
+    La concurrence réservée des fonctions dédiées est retirée de celle d'api-handler : une route
+    lourde sature sa propre réservation sans prendre de conteneurs aux autres.
+    """
+    functions, seen = [], {}
+    for name, settings in (spec or {}).items():
+        settings = dict(settings or {})
+        if not FUNCTION_NAME.match(name) or name == "handler":
+            raise ValueError(f"Invalid route function name: '{name}'")
+
+        unknown = set(settings) - {"memory_size", "timeout", "reserved_concurrency", "routes"}
+        if unknown:
+            raise ValueError(f"Unknown settings for route function '{name}': {sorted(unknown)}")
+
+        memory_size = int(settings.get("memory_size") or capacity["lambda_memory_size"])
+        timeout = int(settings.get("timeout") or capacity["lambda_timeout"])
+        reserved = settings.get("reserved_concurrency")
+        if not 128 <= memory_size <= 10240:
+            raise ValueError(f"memory_size of '{name}' must be between 128 and 10240 MB")
+        if not 1 <= timeout <= 900:
+            raise ValueError(f"timeout of '{name}' must be between 1 and 900 seconds")
+        if reserved is not None and int(reserved) < 1:
+            raise ValueError(f"reserved_concurrency of '{name}' must be at least 1")
+
+        routes = tuple(parse_route(key, route) for key, route in (settings.get("routes") or {}).items())
+        if not routes:
+            raise ValueError(f"Route function '{name}' has no routes")
+        for route in routes:
+            if route.key in HANDLER_ROUTE_KEYS:
+                raise ValueError(f"Route '{route.key}' is served by api-handler")
+            if route.slug in seen:
+                raise ValueError(f"Route '{route.key}' conflicts with '{seen[route.slug]}'")
+            seen[route.slug] = route.key
+
+        functions.append(
+            RouteFunction(
+                name=name,
+                memory_size=memory_size,
+                timeout=timeout,
+                reserved_concurrency=None if reserved is None else int(reserved),
+                routes=routes,
+            )
+        )
+
+    # Une connexion au primaire par conteneur : les réservations se partagent le même budget
+    dedicated = sum(function.reserved_concurrency or 0 for function in functions)
+    budget = capacity["lambda_max_concurrency"]
+    if dedicated >= budget:
+        raise ValueError(
+            f"Route functions reserve {dedicated} of the {budget} connection budget, none is left for api-handler"
+        )
+
+    return {
+        "functions": functions,
+        "handler_max_concurrency": budget - dedicated,
+        "handler_reserved_concurrency": (
+            capacity["lambda_reserved_concurrency"] - dedicated if capacity["lambda_reserved_concurrency"] else None
+        ),
+    }
+
+
+def load_route_table() -> dict:
+    config = pulumi.Config()
+    return resolve_route_table(config.get_object("api_routes") or {}, load_capacity())
@@ -0,0 +1,146 @@
+"""
+Per-environment capacity profiles
+"""
+import pulumi
+
+from infra.db_profiles import ACU_MEMORY_GIB, compute_parameters, instance_memory_gib
+
+# Part des connexions PostgreSQL laissée aux Lambdas, le reste sert à l'admin et aux migrations
+CONNECTION_BUDGET_RATIO = 0.8
+
+CAPACITY_PROFILES = {
+    "dev": {
+        "db_engine": "postgres",
+        "db_instance_class": "db.t3.micro",
+        "db_replica_instance_class": "db.t3.micro",
+        "db_workload_profile": "oltp-small",
+        "db_allocated_storage": 20,
+        "db_max_allocated_storage": 100,
+        "db_storage_iops": None,
+        "db_storage_throughput": None,
+        "db_min_acu": 0.5,
+        "db_max_acu": 2,
+        "lambda_memory_size": 256,
+        "lambda_timeout": 30,
+        "lambda_ephemeral_storage": 512,
+        "lambda_reserve_concurrency": False,
+        # Seuils d'alarme historiques du dev, conservés tels quels
+        "alarm_rds_cpu_percent": 80,
+        "alarm_lambda_duration_ms": 25000,
+    },
+    "staging": {
+        "db_engine": "postgres",
+        "db_instance_class": "db.t4g.medium",
+        "db_replica_instance_class": "db.t4g.medium",
+        "db_workload_profile": "oltp-small",
+        "db_allocated_storage": 50,
+        "db_max_allocated_storage": 200,
+        "db_storage_iops": None,
+        "db_storage_throughput": None,
+        "db_min_acu": 0.5,
+        "db_max_acu": 8,
+        "lambda_memory_size": 512,
+        "lambda_timeout": 30,
+        "lambda_ephemeral_storage": 1024,
+        "lambda_reserve_concurrency": True,
+        "alarm_rds_cpu_percent": None,
+        "alarm_lambda_duration_ms": None,
+    },
+    "prod": {
+        "db_engine": "postgres",
+        "db_instance_class": "db.m6g.large",
+        "db_replica_instance_class": "db.m6g.large",
+        "db_workload_profile": "oltp-large",
+        "db_allocated_storage": 400,
+        "db_max_allocated_storage": 1000,
+        # gp3 : IOPS et débit provisionnés uniquement à partir de 400 GiB pour PostgreSQL
+        "db_storage_iops": 12000,
+        "db_storage_throughput": 500,
+        "db_min_acu": 2,
+        "db_max_acu": 32,
+        "lambda_memory_size": 1024,
+        "lambda_timeout": 30,
+        "lambda_ephemeral_storage": 2048,
+        "lambda_reserve_concurrency": True,
+        "alarm_rds_cpu_percent": None,
+        "alarm_lambda_duration_ms": None,
+    },
+}
+
+
+def resolve_capacity(profile_name: str, overrides: dict = None) -> dict:
+    if profile_name not in CAPACITY_PROFILES:
+        raise ValueError(f"Unknown capacity profile: {profile_name}")
+
+    capacity = dict(CAPACITY_PROFILES[profile_name])
+    capacity.update({key: value for key, value in (overrides or {}).items() if value is not None})
+    capacity["name"] = profile_name
+
+    if capacity["db_engine"] not in ("postgres", "aurora-serverless"):
+        raise ValueError(f"Unknown database engine: {capacity['db_engine']}")
+    aurora = capacity["db_engine"] == "aurora-serverless"
+
+    if not aurora and capacity["db_storage_iops"] and capacity["db_allocated_storage"] < 400:
+        raise ValueError("gp3 provisioned IOPS/throughput require at least 400 GiB of storage")
+    if not 512 <= capacity["lambda_ephemeral_storage"] <= 10240:
+        raise ValueError("lambda_ephemeral_storage must be between 512 and 10240 MB")
+    if capacity["db_min_acu"] > capacity["db_max_acu"]:
+        raise ValueError("db_min_acu must not exceed db_max_acu")
+
+    if aurora:
+        db_memory_gib = capacity["db_max_acu"] * ACU_MEMORY_GIB
+    else:
+        db_memory_gib = instance_memory_gib(capacity["db_instance_class"])
+
+    db_max_connections = int(
+        compute_parameters(
+            capacity["db_workload_profile"],
+            capacity["db_instance_class"],
+            memory_gib=db_memory_gib,
+        )["max_connections"]
+    )
+    connection_budget = int(db_max_connections * CONNECTION_BUDGET_RATIO)
+    burstable = not aurora and capacity["db_instance_class"].startswith("db.t")
+    timeout_ms = capacity["lambda_timeout"] * 1000
+    # Un seuil fixé au-delà du timeout ne se déclencherait jamais : on revient au seuil dérivé
+    duration_alarm = capacity["alarm_lambda_duration_ms"]
+    if not duration_alarm or duration_alarm >= timeout_ms:
+        duration_alarm = int(timeout_ms * 0.8)
+
+    capacity.update(
+        {
+            "db_memory_gib": db_memory_gib,
+            "db_max_connections": db_max_connections,
+            # Une connexion au primaire par conteneur Lambda chaud
+            "lambda_max_concurrency": connection_budget,
+            "lambda_reserved_concurrency": connection_budget if capacity["lambda_reserve_concurrency"] else None,
+            "alarm_lambda_duration_ms": duration_alarm,
+            "alarm_rds_cpu_percent": capacity["alarm_rds_cpu_percent"] or (70 if burstable else 80),
+            "alarm_rds_connections": connection_budget,
+            "alarm_rds_free_storage_bytes": int(capacity["db_allocated_storage"] * 0.25 * 1024**3),
+            "alarm_acu_utilization_percent": 90,
+        }
+    )
+
+    return capacity
+
+
+def load_capacity() -> dict:
+    config = pulumi.Config()
+    environment = config.get("environment") or "dev"
+    default_profile = environment if environment in CAPACITY_PROFILES else "dev"
+
+    overrides = {
+        "db_engine": config.get("db_engine"),
+        "db_min_acu": config.get_float("db_min_acu"),
+        "db_max_acu": config.get_float("db_max_acu"),
+        "db_instance_class": config.get("db_instance_class"),
+        "db_replica_instance_class": config.get("db_replica_instance_class"),
+        "db_workload_profile": config.get("db_workload_profile"),
+        "db_allocated_storage": config.get_int("db_allocated_storage"),
+        "lambda_memory_size": config.get_int("lambda_memory_size"),
+        "lambda_timeout": config.get_int("lambda_timeout"),
+        "lambda_ephemeral_storage": config.get_int("lambda_ephemeral_storage"),
+    }
+
+    return resolve_capacity(config.get("capacity_profile") or default_profile, overrides)
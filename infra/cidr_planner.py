@@ -0,0 +1,194 @@
+"""
+Subnet and CIDR planner
+"""
+import ipaddress
+import math
+from dataclasses import dataclass, field
+
+# AWS réserve les 4 premières adresses et la dernière de chaque sous-réseau
+AWS_RESERVED_ADDRESSES = 5
+MIN_SUBNET_PREFIX = 28
+MIN_VPC_PREFIX = 16
+
+# Le VPC est coupé en quarts (public, private, data, un quart libre), chaque quart en emplacements
+# fixes par AZ : ajouter une AZ ou agrandir un niveau ne déplace aucun autre sous-réseau
+TIER_REGION_BITS = 2
+AZ_SLOT_BITS = 3
+MAX_VPC_PREFIX = MIN_SUBNET_PREFIX - TIER_REGION_BITS - AZ_SLOT_BITS
+
+# Estimation AWS historique des ENI Lambda en VPC : concurrence x (mémoire / 3 Go).
+# Les ENI Hyperplane sont partagées, mais un déploiement ou une montée en charge en recrée temporairement
+LAMBDA_ENI_MEMORY_MB = 3072
+
+TIERS = ("public", "private", "data")
+
+
+@dataclass(frozen=True)
+class SubnetDemand:
+    peak_concurrency: int = 0
+    lambda_memory_mb: int = 128
+    lambda_functions: int = 1
+    interface_endpoints: int = 0
+    cache_nodes: int = 0
+    db_instances: int = 1
+    db_proxies: int = 0
+    nat_gateways: int = 1
+    load_balancers: int = 0
+
+
+@dataclass
+class SubnetPlan:
+    vpc_cidr: str
+    az_count: int
+    subnets: dict = field(default_factory=dict)
+    addresses: dict = field(default_factory=dict)
+
+    def cidrs(self, tier: str) -> list[str]:
+        return [str(network) for network in self.subnets.get(tier, [])]
+
+    def allocated(self) -> list[ipaddress.IPv4Network]:
+        return [network for networks in self.subnets.values() for network in networks]
+
+
+def lambda_addresses(demand: SubnetDemand) -> int:
+    if demand.peak_concurrency <= 0:
+        return 0
+    per_concurrency = max(demand.lambda_memory_mb, 128) / LAMBDA_ENI_MEMORY_MB
+    return max(math.ceil(demand.peak_concurrency * per_concurrency), demand.lambda_functions)
+
+
+def addresses_per_az(demand: SubnetDemand, az_count: int) -> dict:
+    """Adresses nécessaires par AZ et par niveau, avant marge de croissance."""
+
+    def spread(total: int) -> int:
+        return math.ceil(total / az_count)
+
+    return {
+        "public": spread(demand.nat_gateways) + demand.load_balancers * 8,
+        # Les endpoints interface ont une ENI dans chaque AZ
+        "private": spread(lambda_addresses(demand)) + demand.interface_endpoints,
+        # Un proxy RDS consomme plusieurs adresses par AZ, une instance peut basculer dans n'importe quelle AZ
+        "data": demand.db_instances + demand.db_proxies * 3 + spread(demand.cache_nodes),
+    }
+
+
+def prefix_for(addresses: int, growth_factor: float = 2.0) -> int:
+    needed = math.ceil(max(addresses, 1) * growth_factor) + AWS_RESERVED_ADDRESSES
+    prefix = 32 - math.ceil(math.log2(needed))
+    if prefix < MIN_VPC_PREFIX:
+        raise ValueError(f"{addresses} addresses do not fit in a single subnet")
+    return min(prefix, MIN_SUBNET_PREFIX)
+
+
+def validate_allocations(vpc: ipaddress.IPv4Network, allocations: list[ipaddress.IPv4Network]) -> None:
+    for network in allocations:
+        if not network.subnet_of(vpc):
+            raise ValueError(f"{network} is outside of the VPC CIDR {vpc}")
+
+    ordered = sorted(allocations, key=lambda network: int(network.network_address))
+    for previous, current in zip(ordered, ordered[1:]):
+        if previous.overlaps(current):
+            raise ValueError(f"Overlapping allocations: {previous} and {current}")
+
+
+def tier_slots(
+    vpc: ipaddress.IPv4Network,
+    tier: str,
+    reserved: list[ipaddress.IPv4Network],
+) -> list[ipaddress.IPv4Network]:
+    """Emplacements d'un niveau dans l'ordre des AZ, ceux qui touchent une plage réservée sont sautés."""
+    region = list(vpc.subnets(prefixlen_diff=TIER_REGION_BITS))[TIERS.index(tier)]
+    return [
+        slot
+        for slot in region.subnets(prefixlen_diff=AZ_SLOT_BITS)
+        if not any(slot.overlaps(network) for network in reserved)
+    ]
+
+
+def slot_subnet(slots: list[ipaddress.IPv4Network], index: int, prefix: int, tier: str) -> ipaddress.IPv4Network:
+    if index >= len(slots):
+        raise ValueError(f"No free {tier} slot left for AZ {index}")
+    slot = slots[index]
+    if prefix < slot.prefixlen:
+        raise ValueError(f"A /{prefix} {tier} subnet does not fit in its /{slot.prefixlen} slot")
+    return next(slot.subnets(new_prefix=prefix))
+
+
+def plan_subnets(
+    vpc_cidr: str,
+    az_count: int,
+    demand: SubnetDemand,
+    growth_factor: float = 2.0,
+    reserve_ratio: float = 0.5,
+    existing: list[str] = None,
+    min_prefix: dict = None,
+    deployed: dict = None,
+) -> SubnetPlan:
+    """
+    Découpe le VPC en sous-réseaux public/private/data par AZ.
+
+    Chaque sous-réseau est dimensionné à `growth_factor` fois la demande (plus les
+    5 adresses réservées par AWS), et au moins `reserve_ratio` du VPC reste libre
+    pour des AZ ou des niveaux supplémentaires. Les plages `existing` ne sont
+    jamais réutilisées.
+
+    Le sous-réseau d'un niveau dans une AZ occupe toujours le même emplacement. Les CIDR
+    de `deployed` (`{niveau: [cidr par AZ]}`) sont repris tels quels ; un plan qui
+    devrait les agrandir échoue au lieu de remplacer des sous-réseaux en service.
+    """
+    vpc = ipaddress.ip_network(vpc_cidr)
+    if vpc.version != 4 or vpc.prefixlen < MIN_VPC_PREFIX or vpc.prefixlen > MAX_VPC_PREFIX:
+        raise ValueError(f"VPC CIDR must be an IPv4 /{MIN_VPC_PREFIX} to /{MAX_VPC_PREFIX}: {vpc_cidr}")
+    if az_count < 1:
+        raise ValueError("az_count must be at least 1")
+
+    reserved = [ipaddress.ip_network(cidr) for cidr in existing or []]
+    validate_allocations(vpc, reserved)
+    deployed = {tier: [ipaddress.ip_network(cidr) for cidr in cidrs] for tier, cidrs in (deployed or {}).items()}
+    unknown = set(deployed) - set(TIERS)
+    if unknown:
+        raise ValueError(f"Unknown tiers in deployed subnets: {sorted(unknown)}")
+
+    addresses = addresses_per_az(demand, az_count)
+    prefixes = {tier: prefix_for(addresses[tier], growth_factor) for tier in TIERS}
+    for tier, prefix in (min_prefix or {}).items():
+        prefixes[tier] = min(prefixes[tier], prefix)
+
+    plan = SubnetPlan(vpc_cidr=str(vpc), az_count=az_count, addresses=addresses)
+    for tier in TIERS:
+        slots = tier_slots(vpc, tier, reserved)
+        pinned = deployed.get(tier, [])
+        plan.subnets[tier] = []
+        for index in range(az_count):
+            if index >= len(pinned):
+                plan.subnets[tier].append(slot_subnet(slots, index, prefixes[tier], tier))
+                continue
+            if pinned[index].prefixlen > prefixes[tier]:
+                raise ValueError(
+                    f"Deployed {tier} subnet {index} ({pinned[index]}) is smaller than the /{prefixes[tier]} "
+                    f"now required, growing it would replace the subnet"
+                )
+            plan.subnets[tier].append(pinned[index])
+    validate_allocations(vpc, reserved + plan.allocated())
+
+    used = sum(network.num_addresses for network in plan.allocated())
+    if used > vpc.num_addresses * (1 - reserve_ratio):
+        raise ValueError(
+            f"Subnet plan uses {used} of {vpc.num_addresses} addresses, "
+            f"leaving less than {reserve_ratio:.0%} for growth"
+        )
+
+    return plan
+
+
+def legacy_plan(az_count: int) -> SubnetPlan:
+    """Plan historique (/24 fixes, sans niveau data) conservé tant que le planner n'est pas activé."""
+    return SubnetPlan(
+        vpc_cidr="10.0.0.0/16",
+        az_count=az_count,
+        subnets={
+            "public": [ipaddress.ip_network(f"10.0.{i}.0/24") for i in range(az_count)],
+            "private": [ipaddress.ip_network(f"10.0.{i + 10}.0/24") for i in range(az_count)],
+            "data": [],
+        },
+    )
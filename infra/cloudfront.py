@@ -9,6 +9,7 @@ def create_cloudfront_distribution(
     static_bucket: aws.s3.BucketV2,
     oac: aws.cloudfront.OriginAccessControl,
     waf_acl_arn: pulumi.Output = None,
+    opts: pulumi.ResourceOptions = None,
 ):
 
     cache_policy = aws.cloudfront.CachePolicy(
@@ -31,6 +32,7 @@ def create_cloudfront_distribution(
             enable_accept_encoding_brotli=True,
             enable_accept_encoding_gzip=True,
         ),
+        opts=opts,
     )
 
     origin_request_policy = aws.cloudfront.OriginRequestPolicy(
@@ -46,6 +48,7 @@ def create_cloudfront_distribution(
         query_strings_config=aws.cloudfront.OriginRequestPolicyQueryStringsConfigArgs(
             query_string_behavior="none",
         ),
+        opts=opts,
     )
 
     distribution_args = {
@@ -104,6 +107,7 @@ def create_cloudfront_distribution(
     distribution = aws.cloudfront.Distribution(
         f"static-cdn-{environment}",
         **distribution_args,
+        opts=opts,
     )
 
     return distribution
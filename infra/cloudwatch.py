@@ -1,18 +1,151 @@
+import json
 import pulumi
 import pulumi_aws as aws
 
+from infra.capacity import load_capacity
+
 config = pulumi.Config()
 environment = config.get("environment") or "dev"
+capacity = load_capacity()
+
+
+def replica_widgets(replica_identifiers: list[str], lag_metric: str = "ReplicaLag") -> str:
+
+    if not replica_identifiers:
+        return ""
+
+    lag_metrics = [
+        ["AWS/RDS", lag_metric, "DBInstanceIdentifier", identifier]
+        for identifier in replica_identifiers
+    ]
+    cpu_metrics = [
+        ["AWS/RDS", "CPUUtilization", "DBInstanceIdentifier", identifier]
+        for identifier in replica_identifiers
+    ]
+
+    widgets = [
+        {
+            "type": "metric",
+            "x": 0,
+            "y": 12,
+            "width": 12,
+            "height": 6,
+            "properties": {
+                "title": "RDS Replica Lag",
+                "metrics": lag_metrics,
+                "region": "eu-west-3",
+                "period": 60,
+            },
+        },
+        {
+            "type": "metric",
+            "x": 12,
+            "y": 12,
+            "width": 12,
+            "height": 6,
+            "properties": {
+                "title": "RDS Replica CPU",
+                "metrics": cpu_metrics,
+                "region": "eu-west-3",
+                "period": 300,
+            },
+        },
+    ]
+
+    return "".join(f",\n        {json.dumps(widget)}" for widget in widgets)
+
+
+def cluster_widgets(cluster_identifier: str) -> str:
+
+    if not cluster_identifier:
+        return ""
+
+    capacity_widget = {
+        "type": "metric",
+        "x": 0,
+        "y": 18,
+        "width": 12,
+        "height": 6,
+        "properties": {
+            "title": "Aurora Serverless Capacity",
+            "metrics": [
+                ["AWS/RDS", "ServerlessDatabaseCapacity", "DBClusterIdentifier", cluster_identifier],
+                [".", "ACUUtilization", ".", ".", {"yAxis": "right"}],
+            ],
+            "region": "eu-west-3",
+            "period": 60,
+        },
+    }
+    # Le volume Aurora est partagé par le cluster et croît automatiquement
+    storage_widget = {
+        "type": "metric",
+        "x": 12,
+        "y": 18,
+        "width": 12,
+        "height": 6,
+        "properties": {
+            "title": "Aurora Storage",
+            "metrics": [
+                ["AWS/RDS", "VolumeBytesUsed", "DBClusterIdentifier", cluster_identifier],
+            ],
+            "region": "eu-west-3",
+            "period": 300,
+        },
+    }
+
+    return "".join(f",\n        {json.dumps(widget)}" for widget in (capacity_widget, storage_widget))
+
+
+def nat_widgets(nat_gateway_ids: list[str]) -> str:
+
+    if not nat_gateway_ids:
+        return ""
+
+    metrics = []
+    for nat_gateway_id in nat_gateway_ids:
+        metrics.append(["AWS/NATGateway", "BytesOutToDestination", "NatGatewayId", nat_gateway_id])
+        metrics.append(["AWS/NATGateway", "PacketsDropCount", "NatGatewayId", nat_gateway_id, {"yAxis": "right"}])
+
+    widget = {
+        "type": "metric",
+        "x": 0,
+        "y": 24,
+        "width": 24,
+        "height": 6,
+        "properties": {
+            "title": "NAT Gateways",
+            "metrics": metrics,
+            "region": "eu-west-3",
+            "stat": "Sum",
+            "period": 300,
+        },
+    }
+
+    return f",\n        {json.dumps(widget)}"
 
 
 def create_dashboard(
     lambda_function_name: pulumi.Output,
     rds_identifier: pulumi.Output,
     api_name: pulumi.Output,
+    replica_identifiers: list[pulumi.Output] = None,
+    cluster_identifier: pulumi.Output = None,
+    nat_gateway_ids: list[pulumi.Output] = None,
+    opts: pulumi.ResourceOptions = None,
 ):
 
+    lag_metric = "AuroraReplicaLag" if cluster_identifier is not None else "ReplicaLag"
+    # Aurora ne publie pas FreeStorageSpace : seul le stockage local (tables temporaires) est par instance
+    storage_metric = "FreeLocalStorage" if cluster_identifier is not None else "FreeStorageSpace"
+
     dashboard_body = pulumi.Output.all(
-        lambda_function_name, rds_identifier, api_name
+        lambda_function_name,
+        rds_identifier,
+        api_name,
+        cluster_identifier or "",
+        # Listes résolues dans l'apply : elles peuvent venir d'une StackReference
+        pulumi.Output.from_input(replica_identifiers or []),
+        pulumi.Output.from_input(nat_gateway_ids or []),
     ).apply(
         lambda args: f'''{{
     "widgets": [
@@ -44,7 +177,7 @@ def create_dashboard(
                 "metrics": [
                     ["AWS/RDS", "CPUUtilization", "DBInstanceIdentifier", "{args[1]}"],
                     [".", "DatabaseConnections", ".", "."],
-                    [".", "FreeStorageSpace", ".", "."]
+                    [".", "{storage_metric}", ".", "."]
                 ],
                 "region": "eu-west-3",
                 "period": 300
@@ -83,7 +216,7 @@ def create_dashboard(
                 "region": "eu-west-3",
                 "period": 300
             }}
-        }}
+        }}{replica_widgets(args[4], lag_metric)}{cluster_widgets(args[3])}{nat_widgets(args[5])}
     ]
 }}'''
     )
@@ -92,15 +225,13 @@ def create_dashboard(
         f"main-dashboard-{environment}",
         dashboard_name=f"main-dashboard-{environment}",
         dashboard_body=dashboard_body,
+        opts=opts,
     )
 
     return dashboard
 
 
-def create_alarms(
-    lambda_function_name: pulumi.Output,
-    rds_identifier: pulumi.Output,
-):
+def create_alert_topic(opts: pulumi.ResourceOptions = None):
 
     alert_topic = aws.sns.Topic(
         f"alerts-topic-{environment}",
@@ -109,11 +240,23 @@ def create_alarms(
             "Name": f"alerts-topic-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
+    return alert_topic
+
+
+def create_lambda_alarms(
+    lambda_function_name: pulumi.Output,
+    alert_topic_arn: pulumi.Output,
+    name: str = "lambda",
+    timeout: int = None,
+    opts: pulumi.ResourceOptions = None,
+):
+
     lambda_error_alarm = aws.cloudwatch.MetricAlarm(
-        f"lambda-errors-alarm-{environment}",
-        name=f"lambda-errors-{environment}",
+        f"{name}-errors-alarm-{environment}",
+        name=f"{name}-errors-{environment}",
         comparison_operator="GreaterThanThreshold",
         evaluation_periods=2,
         metric_name="Errors",
@@ -125,35 +268,51 @@ def create_alarms(
         dimensions={
             "FunctionName": lambda_function_name,
         },
-        alarm_actions=[alert_topic.arn],
-        ok_actions=[alert_topic.arn],
+        alarm_actions=[alert_topic_arn],
+        ok_actions=[alert_topic_arn],
         tags={
-            "Name": f"lambda-errors-alarm-{environment}",
+            "Name": f"{name}-errors-alarm-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     lambda_duration_alarm = aws.cloudwatch.MetricAlarm(
-        f"lambda-duration-alarm-{environment}",
-        name=f"lambda-duration-{environment}",
+        f"{name}-duration-alarm-{environment}",
+        name=f"{name}-duration-{environment}",
         comparison_operator="GreaterThanThreshold",
         evaluation_periods=3,
         metric_name="Duration",
         namespace="AWS/Lambda",
         period=300,
         statistic="Average",
-        threshold=25000,
+        threshold=int(timeout * 1000 * 0.8) if timeout else capacity["alarm_lambda_duration_ms"],
         alarm_description="Lambda function duration approaching timeout",
         dimensions={
             "FunctionName": lambda_function_name,
         },
-        alarm_actions=[alert_topic.arn],
+        alarm_actions=[alert_topic_arn],
         tags={
-            "Name": f"lambda-duration-alarm-{environment}",
+            "Name": f"{name}-duration-alarm-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
+    return {
+        "lambda_error_alarm": lambda_error_alarm,
+        "lambda_duration_alarm": lambda_duration_alarm,
+    }
+
+
+def create_database_alarms(
+    rds_identifier: pulumi.Output,
+    alert_topic_arn: pulumi.Output,
+    replica_identifiers: list[pulumi.Output] = None,
+    cluster_identifier: pulumi.Output = None,
+    opts: pulumi.ResourceOptions = None,
+):
+
     rds_cpu_alarm = aws.cloudwatch.MetricAlarm(
         f"rds-cpu-alarm-{environment}",
         name=f"rds-cpu-{environment}",
@@ -163,40 +322,45 @@ def create_alarms(
         namespace="AWS/RDS",
         period=300,
         statistic="Average",
-        threshold=80,
-        alarm_description="RDS CPU utilization exceeded 80%",
+        threshold=capacity["alarm_rds_cpu_percent"],
+        alarm_description=f"RDS CPU utilization exceeded {capacity['alarm_rds_cpu_percent']}%",
         dimensions={
             "DBInstanceIdentifier": rds_identifier,
         },
-        alarm_actions=[alert_topic.arn],
-        ok_actions=[alert_topic.arn],
+        alarm_actions=[alert_topic_arn],
+        ok_actions=[alert_topic_arn],
         tags={
             "Name": f"rds-cpu-alarm-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
-    rds_storage_alarm = aws.cloudwatch.MetricAlarm(
-        f"rds-storage-alarm-{environment}",
-        name=f"rds-storage-{environment}",
-        comparison_operator="LessThanThreshold",
-        evaluation_periods=2,
-        metric_name="FreeStorageSpace",
-        namespace="AWS/RDS",
-        period=300,
-        statistic="Average",
-        threshold=5368709120,
-        alarm_description="RDS free storage space below 5GB",
-        dimensions={
-            "DBInstanceIdentifier": rds_identifier,
-        },
-        alarm_actions=[alert_topic.arn],
-        ok_actions=[alert_topic.arn],
-        tags={
-            "Name": f"rds-storage-alarm-{environment}",
-            "Environment": environment,
-        },
-    )
+    # Le stockage Aurora croît automatiquement, pas de FreeStorageSpace côté cluster
+    rds_storage_alarm = None
+    if cluster_identifier is None:
+        rds_storage_alarm = aws.cloudwatch.MetricAlarm(
+            f"rds-storage-alarm-{environment}",
+            name=f"rds-storage-{environment}",
+            comparison_operator="LessThanThreshold",
+            evaluation_periods=2,
+            metric_name="FreeStorageSpace",
+            namespace="AWS/RDS",
+            period=300,
+            statistic="Average",
+            threshold=capacity["alarm_rds_free_storage_bytes"],
+            alarm_description=f"RDS free storage space below {capacity['alarm_rds_free_storage_bytes'] // 1024**3}GB",
+            dimensions={
+                "DBInstanceIdentifier": rds_identifier,
+            },
+            alarm_actions=[alert_topic_arn],
+            ok_actions=[alert_topic_arn],
+            tags={
+                "Name": f"rds-storage-alarm-{environment}",
+                "Environment": environment,
+            },
+            opts=opts,
+        )
 
     rds_connections_alarm = aws.cloudwatch.MetricAlarm(
         f"rds-connections-alarm-{environment}",
@@ -207,23 +371,126 @@ def create_alarms(
         namespace="AWS/RDS",
         period=300,
         statistic="Average",
-        threshold=80,
+        threshold=capacity["alarm_rds_connections"],
         alarm_description="RDS database connections exceeded threshold",
         dimensions={
             "DBInstanceIdentifier": rds_identifier,
         },
-        alarm_actions=[alert_topic.arn],
+        alarm_actions=[alert_topic_arn],
         tags={
             "Name": f"rds-connections-alarm-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
+    cluster_alarms = []
+    if cluster_identifier is not None:
+        capacity_alarm = aws.cloudwatch.MetricAlarm(
+            f"aurora-capacity-alarm-{environment}",
+            name=f"aurora-capacity-{environment}",
+            comparison_operator="GreaterThanOrEqualToThreshold",
+            evaluation_periods=3,
+            metric_name="ServerlessDatabaseCapacity",
+            namespace="AWS/RDS",
+            period=300,
+            statistic="Maximum",
+            threshold=capacity["db_max_acu"],
+            alarm_description=f"Aurora Serverless capacity pinned at max ACU ({capacity['db_max_acu']})",
+            dimensions={
+                "DBClusterIdentifier": cluster_identifier,
+            },
+            alarm_actions=[alert_topic_arn],
+            ok_actions=[alert_topic_arn],
+            tags={
+                "Name": f"aurora-capacity-alarm-{environment}",
+                "Environment": environment,
+            },
+            opts=opts,
+        )
+
+        acu_utilization_alarm = aws.cloudwatch.MetricAlarm(
+            f"aurora-acu-utilization-alarm-{environment}",
+            name=f"aurora-acu-utilization-{environment}",
+            comparison_operator="GreaterThanThreshold",
+            evaluation_periods=3,
+            metric_name="ACUUtilization",
+            namespace="AWS/RDS",
+            period=300,
+            statistic="Average",
+            threshold=capacity["alarm_acu_utilization_percent"],
+            alarm_description=f"Aurora ACU utilization exceeded {capacity['alarm_acu_utilization_percent']}%",
+            dimensions={
+                "DBClusterIdentifier": cluster_identifier,
+            },
+            alarm_actions=[alert_topic_arn],
+            ok_actions=[alert_topic_arn],
+            tags={
+                "Name": f"aurora-acu-utilization-alarm-{environment}",
+                "Environment": environment,
+            },
+            opts=opts,
+        )
+
+        cluster_alarms.extend([capacity_alarm, acu_utilization_alarm])
+
+    replica_alarms = []
+    max_replica_lag = config.get_int("db_replica_max_lag_seconds") or 30
+    for i, replica_identifier in enumerate(replica_identifiers or []):
+        replica_lag_alarm = aws.cloudwatch.MetricAlarm(
+            f"rds-replica-lag-alarm-{i}-{environment}",
+            name=f"rds-replica-lag-{i}-{environment}",
+            comparison_operator="GreaterThanThreshold",
+            evaluation_periods=3,
+            # AuroraReplicaLag est exprimé en millisecondes, ReplicaLag en secondes
+            metric_name="AuroraReplicaLag" if cluster_identifier is not None else "ReplicaLag",
+            namespace="AWS/RDS",
+            period=60,
+            statistic="Maximum",
+            threshold=max_replica_lag * 1000 if cluster_identifier is not None else max_replica_lag,
+            alarm_description=f"RDS replica lag above {max_replica_lag}s, reads fall back to primary",
+            dimensions={
+                "DBInstanceIdentifier": replica_identifier,
+            },
+            alarm_actions=[alert_topic_arn],
+            ok_actions=[alert_topic_arn],
+            tags={
+                "Name": f"rds-replica-lag-alarm-{i}-{environment}",
+                "Environment": environment,
+            },
+            opts=opts,
+        )
+
+        replica_cpu_alarm = aws.cloudwatch.MetricAlarm(
+            f"rds-replica-cpu-alarm-{i}-{environment}",
+            name=f"rds-replica-cpu-{i}-{environment}",
+            comparison_operator="GreaterThanThreshold",
+            evaluation_periods=3,
+            metric_name="CPUUtilization",
+            namespace="AWS/RDS",
+            period=300,
+            statistic="Average",
+            threshold=capacity["alarm_rds_cpu_percent"],
+            alarm_description=f"RDS replica CPU utilization exceeded {capacity['alarm_rds_cpu_percent']}%",
+            dimensions={
+                "DBInstanceIdentifier": replica_identifier,
+            },
+            alarm_actions=[alert_topic_arn],
+            ok_actions=[alert_topic_arn],
+            tags={
+                "Name": f"rds-replica-cpu-alarm-{i}-{environment}",
+                "Environment": environment,
+            },
+            opts=opts,
+        )
+
+        replica_alarms.extend([replica_lag_alarm, replica_cpu_alarm])
+
     return {
-        "alert_topic": alert_topic,
-        "lambda_error_alarm": lambda_error_alarm,
-        "lambda_duration_alarm": lambda_duration_alarm,
         "rds_cpu_alarm": rds_cpu_alarm,
         "rds_storage_alarm": rds_storage_alarm,
         "rds_connections_alarm": rds_connections_alarm,
+        "replica_alarms": replica_alarms,
+        "cluster_alarms": cluster_alarms,
     }
+
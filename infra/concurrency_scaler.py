@@ -0,0 +1,172 @@
+"""
+Scheduled concurrency scaler: reserved/provisioned concurrency from the ConcurrentExecutions history
+"""
+import json
+from pathlib import Path
+
+import pulumi
+import pulumi_aws as aws
+
+from infra.api_routes import load_route_table
+
+config = pulumi.Config()
+environment = config.get("environment") or "dev"
+route_table = load_route_table()
+concurrency_scaler_enabled = config.get_bool("concurrency_scaler") or False
+
+SCALER_DIR = Path(__file__).resolve().parent.parent / "scaler"
+LIVE_ALIAS = "live"
+
+
+def create_concurrency_scaler(
+    lambda_function: aws.lambda_.Function,
+    lambda_alias: aws.lambda_.Alias,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    assume_role_policy = json.dumps(
+        {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Action": "sts:AssumeRole",
+                    "Effect": "Allow",
+                    "Principal": {"Service": "lambda.amazonaws.com"},
+                }
+            ],
+        }
+    )
+
+    scaler_role = aws.iam.Role(
+        f"concurrency-scaler-role-{environment}",
+        assume_role_policy=assume_role_policy,
+        tags={
+            "Name": f"concurrency-scaler-role-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    aws.iam.RolePolicyAttachment(
+        f"concurrency-scaler-basic-policy-{environment}",
+        role=scaler_role.name,
+        policy_arn="arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole",
+        opts=opts,
+    )
+
+    scaler_policy_document = lambda_function.arn.apply(
+        lambda arn: json.dumps(
+            {
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Sid": "ConcurrencyControl",
+                        "Effect": "Allow",
+                        "Action": [
+                            "lambda:GetFunctionConcurrency",
+                            "lambda:PutFunctionConcurrency",
+                            "lambda:DeleteFunctionConcurrency",
+                            "lambda:GetProvisionedConcurrencyConfig",
+                            "lambda:PutProvisionedConcurrencyConfig",
+                            "lambda:DeleteProvisionedConcurrencyConfig",
+                        ],
+                        "Resource": [arn, f"{arn}:*"],
+                    },
+                    {
+                        "Sid": "ConcurrencyMetrics",
+                        "Effect": "Allow",
+                        "Action": ["cloudwatch:GetMetricData"],
+                        "Resource": "*",
+                    },
+                ],
+            }
+        )
+    )
+
+    aws.iam.RolePolicy(
+        f"concurrency-scaler-policy-{environment}",
+        role=scaler_role.id,
+        policy=scaler_policy_document,
+        opts=opts,
+    )
+
+    log_group = aws.cloudwatch.LogGroup(
+        f"concurrency-scaler-logs-{environment}",
+        name=f"/aws/lambda/concurrency-scaler-{environment}",
+        retention_in_days=14,
+        tags={
+            "Name": f"concurrency-scaler-logs-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    # Part du budget laissée à api-handler après les réservations de la table de routes
+    max_concurrency = route_table["handler_reserved_concurrency"] or route_table["handler_max_concurrency"]
+    min_reserved = config.get_int("concurrency_min_reserved")
+
+    scaler_function = aws.lambda_.Function(
+        f"concurrency-scaler-{environment}",
+        name=f"concurrency-scaler-{environment}",
+        runtime="python3.11",
+        handler="scaler_function.handler",
+        role=scaler_role.arn,
+        code=pulumi.AssetArchive(
+            {path.name: pulumi.FileAsset(str(path)) for path in sorted(SCALER_DIR.glob("*.py"))}
+        ),
+        timeout=60,
+        memory_size=256,
+        environment=aws.lambda_.FunctionEnvironmentArgs(
+            variables={
+                "FUNCTION_NAME": lambda_function.name,
+                "FUNCTION_ALIAS": lambda_alias.name,
+                "WEEKS": str(config.get_int("concurrency_history_weeks") or 4),
+                "PERCENTILE": str(config.get_float("concurrency_percentile") or 95),
+                "HEADROOM": str(config.get_float("concurrency_headroom") or 0.2),
+                "WINDOW_MINUTES": str(config.get_int("concurrency_window_minutes") or 60),
+                "LEAD_MINUTES": str(config.get_int("concurrency_lead_minutes") or 15),
+                "MIN_PROVISIONED": str(config.get_int("concurrency_min_provisioned") or 0),
+                # Plafond : le budget de connexions PostgreSQL des Lambdas
+                "MAX_CONCURRENCY": str(max_concurrency),
+                # Sans plancher, la concurrence réservée reste au plafond
+                **({"MIN_RESERVED": str(min_reserved)} if min_reserved else {}),
+            },
+        ),
+        tags={
+            "Name": f"concurrency-scaler-{environment}",
+            "Environment": environment,
+        },
+        opts=pulumi.ResourceOptions.merge(opts, pulumi.ResourceOptions(depends_on=[log_group])),
+    )
+
+    schedule = aws.cloudwatch.EventRule(
+        f"concurrency-scaler-schedule-{environment}",
+        name=f"concurrency-scaler-{environment}",
+        schedule_expression=config.get("concurrency_schedule") or "rate(15 minutes)",
+        tags={
+            "Name": f"concurrency-scaler-schedule-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    aws.cloudwatch.EventTarget(
+        f"concurrency-scaler-target-{environment}",
+        rule=schedule.name,
+        arn=scaler_function.arn,
+        opts=opts,
+    )
+
+    aws.lambda_.Permission(
+        f"concurrency-scaler-permission-{environment}",
+        action="lambda:InvokeFunction",
+        function=scaler_function.name,
+        principal="events.amazonaws.com",
+        source_arn=schedule.arn,
+        opts=opts,
+    )
+
+    return {
+        "function": scaler_function,
+        "schedule": schedule,
+    }
@@ -0,0 +1,182 @@
+"""
+PostgreSQL workload profiles
+"""
+import re
+from dataclasses import dataclass
+
+# Paramètres statiques : pris en compte uniquement après redémarrage de l'instance
+STATIC_PARAMETERS = {
+    "shared_buffers",
+    "max_connections",
+    "shared_preload_libraries",
+}
+
+BURSTABLE_MEMORY_GIB = {
+    "micro": 1,
+    "small": 2,
+    "medium": 4,
+    "large": 8,
+    "xlarge": 16,
+    "2xlarge": 32,
+}
+
+GIB_PER_VCPU = {
+    "m": 4,
+    "r": 8,
+    "x": 16,
+    "c": 2,
+}
+
+SSD_STORAGE_TYPES = {"gp2", "gp3", "io1", "io2"}
+
+# Sur Aurora la mémoire suit les ACU, seuls ces paramètres restent pertinents dans le cluster parameter group
+AURORA_PARAMETERS = {
+    "shared_preload_libraries",
+    "pg_stat_statements.track",
+    "auto_explain.log_min_duration",
+    "auto_explain.sample_rate",
+    "auto_explain.log_analyze",
+    "log_min_duration_statement",
+    "log_statement",
+}
+
+# Mémoire d'une ACU Aurora Serverless v2
+ACU_MEMORY_GIB = 2
+
+
+@dataclass(frozen=True)
+class WorkloadProfile:
+    name: str
+    shared_buffers_ratio: float
+    effective_cache_ratio: float
+    work_mem_share: float
+    connections_per_gib: int
+    min_connections: int
+    max_connections: int
+    log_min_duration_ms: int
+    auto_explain_min_duration_ms: int
+    auto_explain_sample_rate: float
+
+
+PROFILES = {
+    "oltp-small": WorkloadProfile(
+        name="oltp-small",
+        shared_buffers_ratio=0.25,
+        effective_cache_ratio=0.75,
+        work_mem_share=0.25,
+        connections_per_gib=100,
+        min_connections=50,
+        max_connections=1000,
+        log_min_duration_ms=500,
+        auto_explain_min_duration_ms=1000,
+        auto_explain_sample_rate=0.1,
+    ),
+    "oltp-large": WorkloadProfile(
+        name="oltp-large",
+        shared_buffers_ratio=0.25,
+        effective_cache_ratio=0.75,
+        work_mem_share=0.25,
+        connections_per_gib=50,
+        min_connections=100,
+        max_connections=5000,
+        log_min_duration_ms=250,
+        auto_explain_min_duration_ms=500,
+        auto_explain_sample_rate=0.01,
+    ),
+    "analytics": WorkloadProfile(
+        name="analytics",
+        shared_buffers_ratio=0.25,
+        effective_cache_ratio=0.75,
+        work_mem_share=0.5,
+        connections_per_gib=10,
+        min_connections=20,
+        max_connections=200,
+        log_min_duration_ms=5000,
+        auto_explain_min_duration_ms=10000,
+        auto_explain_sample_rate=1.0,
+    ),
+}
+
+
+def instance_memory_gib(instance_class: str) -> float:
+    match = re.fullmatch(r"db\.([a-z]+)(\d+)[a-z]*\.(\w+)", instance_class)
+    if not match:
+        raise ValueError(f"Unknown instance class: {instance_class}")
+    family, size = match.group(1), match.group(3)
+
+    if family == "t":
+        if size not in BURSTABLE_MEMORY_GIB:
+            raise ValueError(f"Unknown instance class: {instance_class}")
+        return BURSTABLE_MEMORY_GIB[size]
+
+    if family not in GIB_PER_VCPU:
+        raise ValueError(f"Unknown instance class: {instance_class}")
+    if size == "large":
+        vcpus = 2
+    elif size == "xlarge":
+        vcpus = 4
+    elif size.endswith("xlarge") and size[:-6].isdigit():
+        vcpus = 4 * int(size[:-6])
+    else:
+        raise ValueError(f"Unknown instance class: {instance_class}")
+    return vcpus * GIB_PER_VCPU[family]
+
+
+def compute_parameters(
+    profile_name: str,
+    instance_class: str,
+    storage_type: str = "gp3",
+    memory_gib: float = None,
+    min_connections: int = None,
+) -> dict:
+    """
+    Valeurs calculées par nom de paramètre, dans les unités attendues par RDS.
+
+    `min_connections` relève max_connections (un réplica en hot standby exige au moins
+    celui du primaire) ; work_mem est alors réparti sur ce nombre de connexions.
+    """
+    if profile_name not in PROFILES:
+        raise ValueError(f"Unknown workload profile: {profile_name}")
+    profile = PROFILES[profile_name]
+
+    if memory_gib is None:
+        memory_gib = instance_memory_gib(instance_class)
+    memory_kb = int(memory_gib * 1024 * 1024)
+    memory_gib = memory_kb / (1024 * 1024)
+    shared_buffers_kb = int(memory_kb * profile.shared_buffers_ratio)
+    effective_cache_kb = int(memory_kb * profile.effective_cache_ratio)
+
+    max_connections = int(min(
+        max(memory_gib * profile.connections_per_gib, profile.min_connections),
+        profile.max_connections,
+    ))
+    max_connections = max(max_connections, min_connections or 0)
+    work_mem_kb = max(
+        4096,
+        int((memory_kb - shared_buffers_kb) * profile.work_mem_share / max_connections),
+    )
+    maintenance_work_mem_kb = min(memory_kb // 16, 2 * 1024 * 1024)
+
+    ssd = storage_type in SSD_STORAGE_TYPES
+
+    return {
+        # shared_buffers et effective_cache_size sont exprimés en pages de 8 kB
+        "shared_buffers": str(shared_buffers_kb // 8),
+        "effective_cache_size": str(effective_cache_kb // 8),
+        "work_mem": str(work_mem_kb),
+        "maintenance_work_mem": str(maintenance_work_mem_kb),
+        "max_connections": str(max_connections),
+        "random_page_cost": "1.1" if ssd else "4",
+        "effective_io_concurrency": "200" if ssd else "1",
+        "shared_preload_libraries": "pg_stat_statements,auto_explain",
+        "pg_stat_statements.track": "top",
+        "auto_explain.log_min_duration": str(profile.auto_explain_min_duration_ms),
+        "auto_explain.sample_rate": str(profile.auto_explain_sample_rate),
+        "auto_explain.log_analyze": "0",
+        "log_min_duration_statement": str(profile.log_min_duration_ms),
+        "log_statement": "ddl",
+    }
+
+
+def apply_method(parameter_name: str) -> str:
+    return "pending-reboot" if parameter_name in STATIC_PARAMETERS else "immediate"
@@ -0,0 +1,44 @@
+"""
+ElastiCache Serverless (Valkey)
+"""
+import pulumi
+import pulumi_aws as aws
+
+config = pulumi.Config()
+environment = config.get("environment") or "dev"
+cache_enabled = config.get_bool("cache_enabled") or False
+
+
+def create_cache(
+    private_subnet_ids: list[pulumi.Output],
+    security_group_id: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    cache = aws.elasticache.ServerlessCache(
+        f"app-cache-{environment}",
+        name=f"app-cache-{environment}",
+        engine="valkey",
+        major_engine_version="8",
+        description="Read-through cache for hot API reads",
+        subnet_ids=private_subnet_ids,
+        security_group_ids=[security_group_id],
+        cache_usage_limits=aws.elasticache.ServerlessCacheCacheUsageLimitsArgs(
+            data_storage=aws.elasticache.ServerlessCacheCacheUsageLimitsDataStorageArgs(
+                maximum=config.get_int("cache_max_storage_gb") or 1,
+                unit="GB",
+            ),
+            ecpu_per_seconds=[
+                aws.elasticache.ServerlessCacheCacheUsageLimitsEcpuPerSecondArgs(
+                    maximum=config.get_int("cache_max_ecpu_per_second") or 5000,
+                ),
+            ],
+        ),
+        tags={
+            "Name": f"app-cache-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    return cache
@@ -0,0 +1,130 @@
+"""
+VPC flow logs -> S3 (Parquet)
+"""
+import json
+
+import pulumi
+import pulumi_aws as aws
+
+from infra import invoke_cache
+
+config = pulumi.Config()
+environment = config.get("environment") or "dev"
+flow_logs_enabled = config.get_bool("flow_logs")
+if flow_logs_enabled is None:
+    flow_logs_enabled = True
+
+FLOW_LOG_PREFIX = "flow-logs"
+
+# Champs par défaut + pkt-srcaddr/pkt-dstaddr (vraie source derrière un NAT),
+# flow-direction et traffic-path (chemin de sortie : NAT, gateway, endpoint...)
+FLOW_LOG_FIELDS = [
+    "version",
+    "account-id",
+    "interface-id",
+    "srcaddr",
+    "dstaddr",
+    "srcport",
+    "dstport",
+    "protocol",
+    "packets",
+    "bytes",
+    "start",
+    "end",
+    "action",
+    "log-status",
+    "vpc-id",
+    "subnet-id",
+    "az-id",
+    "pkt-srcaddr",
+    "pkt-dstaddr",
+    "flow-direction",
+    "traffic-path",
+    "tcp-flags",
+]
+
+
+def create_flow_log_bucket_policy(
+    data_bucket: aws.s3.BucketV2,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    account_id = invoke_cache.account_id()
+
+    policy_document = data_bucket.arn.apply(
+        lambda arn: json.dumps(
+            {
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Sid": "AWSLogDeliveryWrite",
+                        "Effect": "Allow",
+                        "Principal": {"Service": "delivery.logs.amazonaws.com"},
+                        "Action": "s3:PutObject",
+                        "Resource": f"{arn}/{FLOW_LOG_PREFIX}/AWSLogs/*",
+                        "Condition": {
+                            "StringEquals": {
+                                "aws:SourceAccount": account_id,
+                                "s3:x-amz-acl": "bucket-owner-full-control",
+                            }
+                        },
+                    },
+                    {
+                        "Sid": "AWSLogDeliveryAclCheck",
+                        "Effect": "Allow",
+                        "Principal": {"Service": "delivery.logs.amazonaws.com"},
+                        "Action": "s3:GetBucketAcl",
+                        "Resource": arn,
+                        "Condition": {
+                            "StringEquals": {
+                                "aws:SourceAccount": account_id,
+                            }
+                        },
+                    },
+                ],
+            }
+        )
+    )
+
+    bucket_policy = aws.s3.BucketPolicy(
+        f"data-storage-policy-{environment}",
+        bucket=data_bucket.id,
+        policy=policy_document,
+        opts=opts,
+    )
+
+    return bucket_policy
+
+
+def create_flow_log(
+    vpc_id: pulumi.Output,
+    data_bucket: aws.s3.BucketV2,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    bucket_policy = create_flow_log_bucket_policy(data_bucket, opts=opts)
+
+    flow_log = aws.ec2.FlowLog(
+        f"vpc-flow-log-{environment}",
+        vpc_id=vpc_id,
+        traffic_type=config.get("flow_logs_traffic_type") or "ALL",
+        log_destination_type="s3",
+        log_destination=data_bucket.arn.apply(lambda arn: f"{arn}/{FLOW_LOG_PREFIX}/"),
+        log_format=" ".join(f"${{{field}}}" for field in FLOW_LOG_FIELDS),
+        max_aggregation_interval=60,
+        destination_options=aws.ec2.FlowLogDestinationOptionsArgs(
+            file_format="parquet",
+            hive_compatible_partitions=True,
+            per_hour_partition=True,
+        ),
+        tags={
+            "Name": f"vpc-flow-log-{environment}",
+            "Environment": environment,
+        },
+        opts=pulumi.ResourceOptions.merge(opts, pulumi.ResourceOptions(depends_on=[bucket_policy])),
+    )
+
+    return {
+        "flow_log": flow_log,
+        "bucket_policy": bucket_policy,
+    }
@@ -9,6 +9,7 @@ environment = config.get("environment") or "dev"
 def create_lambda_role(
     data_bucket_arn: pulumi.Output,
     secrets_arn: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
 ):
 
     assume_role_policy = json.dumps(
@@ -31,12 +32,14 @@ def create_lambda_role(
             "Name": f"lambda-role-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     basic_policy = aws.iam.RolePolicyAttachment(
         f"lambda-basic-policy-{environment}",
         role=lambda_role.name,
         policy_arn="arn:aws:iam::aws:policy/service-role/AWSLambdaVPCAccessExecutionRole",
+        opts=opts,
     )
 
     custom_policy_document = pulumi.Output.all(data_bucket_arn, secrets_arn).apply(
@@ -83,12 +86,13 @@ def create_lambda_role(
         f"lambda-custom-policy-{environment}",
         role=lambda_role.id,
         policy=custom_policy_document,
+        opts=opts,
     )
 
     return lambda_role
 
 
-def create_rds_monitoring_role():
+def create_rds_monitoring_role(opts: pulumi.ResourceOptions = None):
 
     assume_role_policy = json.dumps(
         {
@@ -110,18 +114,20 @@ def create_rds_monitoring_role():
             "Name": f"rds-monitoring-role-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     aws.iam.RolePolicyAttachment(
         f"rds-monitoring-policy-{environment}",
         role=rds_monitoring_role.name,
         policy_arn="arn:aws:iam::aws:policy/service-role/AmazonRDSEnhancedMonitoringRole",
+        opts=opts,
     )
 
     return rds_monitoring_role
 
 
-def create_api_gateway_role():
+def create_api_gateway_role(opts: pulumi.ResourceOptions = None):
 
     assume_role_policy = json.dumps(
         {
@@ -143,12 +149,145 @@ def create_api_gateway_role():
             "Name": f"api-gateway-role-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     aws.iam.RolePolicyAttachment(
         f"api-gateway-cloudwatch-policy-{environment}",
         role=api_gw_role.name,
         policy_arn="arn:aws:iam::aws:policy/service-role/AmazonAPIGatewayPushToCloudWatchLogs",
+        opts=opts,
     )
 
     return api_gw_role
+
+
+def create_firehose_role(data_bucket_arn: pulumi.Output, opts: pulumi.ResourceOptions = None):
+
+    assume_role_policy = json.dumps(
+        {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Action": "sts:AssumeRole",
+                    "Effect": "Allow",
+                    "Principal": {"Service": "firehose.amazonaws.com"},
+                }
+            ],
+        }
+    )
+
+    firehose_role = aws.iam.Role(
+        f"firehose-role-{environment}",
+        assume_role_policy=assume_role_policy,
+        tags={
+            "Name": f"firehose-role-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    policy_document = data_bucket_arn.apply(
+        lambda bucket_arn: json.dumps(
+            {
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Sid": "S3Delivery",
+                        "Effect": "Allow",
+                        "Action": [
+                            "s3:AbortMultipartUpload",
+                            "s3:GetBucketLocation",
+                            "s3:GetObject",
+                            "s3:ListBucket",
+                            "s3:ListBucketMultipartUploads",
+                            "s3:PutObject",
+                        ],
+                        "Resource": [bucket_arn, f"{bucket_arn}/*"],
+                    },
+                    {
+                        "Sid": "GlueSchema",
+                        "Effect": "Allow",
+                        "Action": [
+                            "glue:GetTable",
+                            "glue:GetTableVersion",
+                            "glue:GetTableVersions",
+                        ],
+                        "Resource": "*",
+                    },
+                    {
+                        "Sid": "CloudWatchLogs",
+                        "Effect": "Allow",
+                        "Action": ["logs:PutLogEvents"],
+                        "Resource": "arn:aws:logs:*:*:*",
+                    },
+                ],
+            }
+        )
+    )
+
+    aws.iam.RolePolicy(
+        f"firehose-policy-{environment}",
+        role=firehose_role.id,
+        policy=policy_document,
+        opts=opts,
+    )
+
+    return firehose_role
+
+
+def create_log_subscription_role(
+    delivery_stream_arns: list[pulumi.Output],
+    opts: pulumi.ResourceOptions = None,
+):
+
+    assume_role_policy = json.dumps(
+        {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Action": "sts:AssumeRole",
+                    "Effect": "Allow",
+                    "Principal": {"Service": "logs.amazonaws.com"},
+                }
+            ],
+        }
+    )
+
+    subscription_role = aws.iam.Role(
+        f"log-subscription-role-{environment}",
+        assume_role_policy=assume_role_policy,
+        tags={
+            "Name": f"log-subscription-role-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    policy_document = pulumi.Output.all(*delivery_stream_arns).apply(
+        lambda arns: json.dumps(
+            {
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Sid": "FirehosePut",
+                        "Effect": "Allow",
+                        "Action": [
+                            "firehose:PutRecord",
+                            "firehose:PutRecordBatch",
+                        ],
+                        "Resource": list(arns),
+                    }
+                ],
+            }
+        )
+    )
+
+    aws.iam.RolePolicy(
+        f"log-subscription-policy-{environment}",
+        role=subscription_role.id,
+        policy=policy_document,
+        opts=opts,
+    )
+
+    return subscription_role
@@ -0,0 +1,77 @@
+"""
+Invoke cache: data sources memoized per stack/region
+"""
+import json
+import os
+import time
+from pathlib import Path
+
+import pulumi
+import pulumi_aws as aws
+
+config = pulumi.Config()
+cache_enabled = config.get_bool("invoke_cache")
+if cache_enabled is None:
+    cache_enabled = True
+cache_ttl = config.get_int("invoke_cache_ttl") or 24 * 3600
+# INVOKE_CACHE_REFRESH=1 pulumi preview : relance les invokes et réécrit le cache
+refresh = os.getenv("INVOKE_CACHE_REFRESH") == "1" or config.get_bool("invoke_cache_refresh") or False
+
+CACHE_DIR = Path(os.getenv("INVOKE_CACHE_DIR") or Path(__file__).resolve().parent.parent / ".pulumi-cache")
+
+# Un invoke n'est fait qu'une fois par exécution du programme, même sans cache fichier
+_memory = {}
+_entries = None
+
+
+def cache_path() -> Path:
+    return CACHE_DIR / f"{pulumi.get_project()}-{pulumi.get_stack()}-{aws.config.region or 'default'}.json"
+
+
+def load_entries() -> dict:
+    global _entries
+    if _entries is None:
+        try:
+            _entries = json.loads(cache_path().read_text())
+        except (OSError, ValueError):
+            _entries = {}
+    return _entries
+
+
+def save_entries(entries: dict) -> None:
+    path = cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".tmp")
+    temporary.write_text(json.dumps(entries, indent=2, sort_keys=True))
+    temporary.replace(path)
+
+
+def cached(key: str, fetch):
+    if key in _memory:
+        return _memory[key]
+
+    entry = load_entries().get(key) if cache_enabled else None
+    if entry and not refresh and time.time() - entry["fetched_at"] < cache_ttl:
+        value = entry["value"]
+    else:
+        value = fetch()
+        if cache_enabled:
+            entries = load_entries()
+            entries[key] = {"value": value, "fetched_at": time.time()}
+            save_entries(entries)
+
+    _memory[key] = value
+    return value
+
+
+def availability_zones(state: str = "available") -> list[str]:
+    return cached(f"availability_zones:{state}", lambda: list(aws.get_availability_zones(state=state).names))
+
+
+def account_id() -> str:
+    return cached("account_id", lambda: aws.get_caller_identity().account_id)
+
+
+def region() -> str:
+    # aws:region est dans la configuration de la stack : aucun appel nécessaire
+    return aws.config.region or cached("region", lambda: aws.get_region().name)
@@ -1,9 +1,29 @@
 import json
+from pathlib import Path
+
 import pulumi
 import pulumi_aws as aws
 
+from infra.api_routes import RouteFunction, load_route_table
+from infra.capacity import load_capacity
+from infra.concurrency_scaler import LIVE_ALIAS, concurrency_scaler_enabled
+
 config = pulumi.Config()
 environment = config.get("environment") or "dev"
+capacity = load_capacity()
+route_table = load_route_table()
+
+HANDLER_DIR = Path(__file__).resolve().parent.parent / "handler"
+
+
+def create_lambda_archive():
+
+    return pulumi.AssetArchive(
+        {
+            path.name: pulumi.FileAsset(str(path))
+            for path in sorted(HANDLER_DIR.glob("*.py"))
+        }
+    )
 
 
 def create_lambda_function(
@@ -13,93 +33,116 @@ def create_lambda_function(
     db_secret_arn: pulumi.Output,
     data_bucket_name: pulumi.Output,
     rds_endpoint: pulumi.Output,
+    rds_read_hosts: list[pulumi.Output] = None,
+    cache_endpoint: pulumi.Output = None,
+    ephemeral_storage: int = None,
+    function: RouteFunction = None,
+    opts: pulumi.ResourceOptions = None,
 ):
 
-    lambda_code = """
-import json
+    lambda_archive = create_lambda_archive()
+    ephemeral_storage = ephemeral_storage or capacity["lambda_ephemeral_storage"]
 
-def handler(event, context):
-    try:        
-        return {
-            'statusCode': 200,
-            'headers': {
-                'Content-Type': 'application/json',
-                'Access-Control-Allow-Origin': '*'
-            },
-            'body': json.dumps({
-                'message': 'Lamdba is up brother',
-            })
-        }
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'error': str(e)})
-        }
-"""
-
-    lambda_archive = pulumi.AssetArchive(
-        {
-            "lambda_function.py": pulumi.StringAsset(lambda_code),
-        }
-    )
+    # Sans `function` : api-handler, qui sert $default et /api/* ; sinon une fonction de la table de routes
+    if function is None:
+        name, log_group_name = "api-handler", "lambda-logs"
+        memory_size, timeout = capacity["lambda_memory_size"], capacity["lambda_timeout"]
+        reserved_concurrency = route_table["handler_reserved_concurrency"]
+        scaled = concurrency_scaler_enabled
+    else:
+        name, log_group_name = f"api-{function.name}", f"lambda-logs-{function.name}"
+        memory_size, timeout = function.memory_size, function.timeout
+        reserved_concurrency = function.reserved_concurrency
+        scaled = False
 
     log_group = aws.cloudwatch.LogGroup(
-        f"lambda-logs-{environment}",
-        name=f"/aws/lambda/api-handler-{environment}",
+        f"{log_group_name}-{environment}",
+        name=f"/aws/lambda/{name}-{environment}",
         retention_in_days=14,
         tags={
-            "Name": f"lambda-logs-{environment}",
+            "Name": f"{log_group_name}-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     lambda_function = aws.lambda_.Function(
-        f"api-handler-{environment}",
-        name=f"api-handler-{environment}",
+        f"{name}-{environment}",
+        name=f"{name}-{environment}",
         runtime="python3.11",
         handler="lambda_function.handler",
         role=lambda_role.arn,
         code=lambda_archive,
-        timeout=30,
-        memory_size=256,
+        timeout=timeout,
+        memory_size=memory_size,
+        reserved_concurrent_executions=reserved_concurrency,
+        # La concurrence provisionnée s'applique à un alias sur une version publiée
+        publish=scaled,
+        ephemeral_storage=aws.lambda_.FunctionEphemeralStorageArgs(size=ephemeral_storage),
+        layers=config.get_object("lambda_layer_arns") or [],
         vpc_config=aws.lambda_.FunctionVpcConfigArgs(
             security_group_ids=[lambda_sg_id],
             subnet_ids=private_subnet_ids,
         ),
         environment=aws.lambda_.FunctionEnvironmentArgs(
-            variables=pulumi.Output.all(
-                db_secret_arn, data_bucket_name, rds_endpoint
-            ).apply(
-                lambda args: {
-                    "ENVIRONMENT": environment,
-                    "DB_SECRET_ARN": args[0],
-                    "DATA_BUCKET": args[1],
-                    "DB_HOST": args[2],
-                    "DB_NAME": config.get("db_name") or "appdb",
-                }
-            ),
+            variables={
+                "ENVIRONMENT": environment,
+                "DB_SECRET_ARN": db_secret_arn,
+                "DATA_BUCKET": data_bucket_name,
+                "DB_HOST": rds_endpoint,
+                "DB_READ_HOST": pulumi.Output.from_input(rds_read_hosts or []).apply(",".join),
+                "DB_MAX_REPLICA_LAG": str(config.get_int("db_replica_max_lag_seconds") or 30),
+                "DB_NAME": config.get("db_name") or "appdb",
+                # Budgets du cache d'objets local : 1/8 de la mémoire, 3/4 de /tmp
+                "OBJECT_CACHE_MEMORY_BYTES": str(memory_size * 1024**2 // 8),
+                "OBJECT_CACHE_DISK_BYTES": str(ephemeral_storage * 1024**2 * 3 // 4),
+                **({"CACHE_ENDPOINT": cache_endpoint} if cache_endpoint is not None else {}),
+            },
         ),
         tags={
-            "Name": f"api-handler-{environment}",
+            "Name": f"{name}-{environment}",
             "Environment": environment,
         },
-        opts=pulumi.ResourceOptions(depends_on=[log_group]),
+        opts=pulumi.ResourceOptions.merge(
+            opts,
+            pulumi.ResourceOptions(
+                depends_on=[log_group],
+                # La concurrence réservée est ajustée par le scaler planifié
+                ignore_changes=["reservedConcurrentExecutions"] if scaled else None,
+            ),
+        ),
     )
 
     return lambda_function
 
 
+def create_lambda_alias(lambda_function: aws.lambda_.Function, opts: pulumi.ResourceOptions = None):
+
+    return aws.lambda_.Alias(
+        f"api-handler-{LIVE_ALIAS}-{environment}",
+        name=LIVE_ALIAS,
+        function_name=lambda_function.name,
+        function_version=lambda_function.version,
+        opts=opts,
+    )
+
+
 def create_lambda_permission_for_api_gateway(
     lambda_function: aws.lambda_.Function,
     api_gateway_execution_arn: pulumi.Output,
+    qualifier: pulumi.Input[str] = None,
+    name: str = "lambda",
+    opts: pulumi.ResourceOptions = None,
 ):
 
     permission = aws.lambda_.Permission(
-        f"api-gateway-lambda-permission-{environment}",
+        f"api-gateway-{name}-permission-{environment}",
         action="lambda:InvokeFunction",
         function=lambda_function.name,
+        qualifier=qualifier,
         principal="apigateway.amazonaws.com",
         source_arn=api_gateway_execution_arn.apply(lambda arn: f"{arn}/*/*"),
+        opts=opts,
     )
 
     return permission
@@ -0,0 +1,41 @@
+"""
+Layered stacks: network -> data -> app, edge
+"""
+import pulumi
+
+config = pulumi.Config()
+environment = config.get("environment") or "dev"
+
+LAYERS = ("network", "data", "app", "edge")
+
+UPSTREAM_LAYERS = {
+    "network": (),
+    "data": ("network",),
+    "app": ("network", "data"),
+    "edge": (),
+}
+
+
+def layer_stack_name(layer: str, env: str = None) -> str:
+    return f"{env or environment}-{layer}"
+
+
+def child_opts(parent: pulumi.ComponentResource) -> pulumi.ResourceOptions:
+    # Les ressources étaient à la racine de la stack monolithique : l'alias évite leur remplacement
+    return pulumi.ResourceOptions(
+        parent=parent,
+        aliases=[pulumi.Alias(parent=pulumi.ROOT_STACK_RESOURCE)],
+    )
+
+
+class LayerReference:
+    """Sorties d'une couche déployée dans sa propre stack, lues comme les attributs du composant."""
+
+    def __init__(self, layer: str):
+        self.layer = layer
+        self.reference = pulumi.StackReference(
+            f"{pulumi.get_organization()}/{pulumi.get_project()}/{layer_stack_name(layer)}"
+        )
+
+    def __getattr__(self, name: str) -> pulumi.Output:
+        return self.reference.get_output(name)
@@ -0,0 +1,207 @@
+"""
+App layer: Lambda, API Gateway, dashboard, log archive
+"""
+import pulumi
+
+from infra.api_gateway import create_api_gateway
+from infra.api_routes import load_route_table
+from infra.capacity import load_capacity
+from infra.cloudwatch import create_dashboard, create_lambda_alarms
+from infra.concurrency_scaler import concurrency_scaler_enabled, create_concurrency_scaler
+from infra.elasticache import cache_enabled
+from infra.iam import (
+    create_api_gateway_role,
+    create_firehose_role,
+    create_lambda_role,
+    create_log_subscription_role,
+)
+from infra.lambda_function import (
+    create_lambda_alias,
+    create_lambda_function,
+    create_lambda_permission_for_api_gateway,
+)
+from infra.layers import child_opts
+from infra.log_archive import (
+    create_access_log_table,
+    create_log_delivery_stream,
+    create_log_subscription,
+    parquet_enabled,
+)
+
+capacity = load_capacity()
+route_table = load_route_table()
+
+
+class AppLayer(pulumi.ComponentResource):
+    def __init__(self, name: str, network, data, opts: pulumi.ResourceOptions = None):
+        super().__init__("cloud-module:layers:App", name, None, opts)
+
+        child = child_opts(self)
+
+        # Les sorties optionnelles ne sont connues qu'au déploiement via StackReference :
+        # leur présence se déduit de la configuration partagée entre les couches
+        is_aurora = capacity["db_engine"] == "aurora-serverless"
+
+        pulumi.log.info("Creating Lambda function...")
+
+        lambda_role = create_lambda_role(
+            data_bucket_arn=data.data_bucket_arn,
+            secrets_arn=data.lambda_db_secret_arn,
+            opts=child,
+        )
+
+        function_args = dict(
+            lambda_role=lambda_role,
+            lambda_sg_id=network.lambda_sg_id,
+            private_subnet_ids=network.private_subnet_ids,
+            db_secret_arn=data.lambda_db_secret_arn,
+            data_bucket_name=data.data_bucket_name,
+            rds_endpoint=data.rds_endpoint,
+            rds_read_hosts=data.rds_reader_hosts,
+            cache_endpoint=data.cache_endpoint if cache_enabled else None,
+        )
+
+        lambda_function = create_lambda_function(**function_args, opts=child)
+
+        # Fonctions dédiées de la table de routes : même code, mémoire, timeout et concurrence propres
+        route_functions = [
+            (function, create_lambda_function(**function_args, function=function, opts=child))
+            for function in route_table["functions"]
+        ]
+
+        # Avec le scaler, l'API invoque l'alias qui porte la concurrence provisionnée
+        lambda_alias = create_lambda_alias(lambda_function, opts=child) if concurrency_scaler_enabled else None
+
+        pulumi.log.info("Creating API Gateway...")
+
+        create_api_gateway_role(opts=child)
+
+        api_gateway_resources = create_api_gateway(lambda_alias or lambda_function, route_functions, opts=child)
+        api = api_gateway_resources["api"]
+
+        # Permission pour API Gateway d'invoquer Lambda
+        create_lambda_permission_for_api_gateway(
+            lambda_function=lambda_function,
+            api_gateway_execution_arn=api.execution_arn,
+            qualifier=lambda_alias.name if lambda_alias else None,
+            opts=child,
+        )
+
+        for function, route_function in route_functions:
+            create_lambda_permission_for_api_gateway(
+                lambda_function=route_function,
+                api_gateway_execution_arn=api.execution_arn,
+                name=f"lambda-{function.name}",
+                opts=child,
+            )
+
+        if concurrency_scaler_enabled:
+            pulumi.log.info("Creating concurrency scaler...")
+
+            create_concurrency_scaler(lambda_function, lambda_alias, opts=child)
+
+        pulumi.log.info("Creating CloudWatch resources...")
+
+        create_dashboard(
+            lambda_function_name=lambda_function.name,
+            rds_identifier=data.db_identifier,
+            api_name=api.name,
+            replica_identifiers=data.db_replica_identifiers,
+            cluster_identifier=data.db_cluster_identifier if is_aurora else None,
+            nat_gateway_ids=pulumi.Output.from_input(network.nat_gateway_ids).apply(lambda ids: list(ids.values())),
+            opts=child,
+        )
+
+        create_lambda_alarms(
+            lambda_function_name=lambda_function.name,
+            alert_topic_arn=data.sns_alerts_topic_arn,
+            opts=child,
+        )
+
+        for function, route_function in route_functions:
+            create_lambda_alarms(
+                lambda_function_name=route_function.name,
+                alert_topic_arn=data.sns_alerts_topic_arn,
+                name=f"lambda-{function.name}",
+                timeout=function.timeout,
+                opts=child,
+            )
+
+        pulumi.log.info("Creating log archive pipeline...")
+
+        firehose_role = create_firehose_role(data_bucket_arn=data.data_bucket_arn, opts=child)
+
+        access_log_table = (
+            create_access_log_table(data_bucket_name=data.data_bucket_name, opts=child)
+            if parquet_enabled
+            else None
+        )
+
+        api_log_stream = create_log_delivery_stream(
+            source="api",
+            data_bucket_arn=data.data_bucket_arn,
+            firehose_role=firehose_role,
+            parquet_table=access_log_table,
+            opts=child,
+        )
+
+        lambda_log_stream = create_log_delivery_stream(
+            source="lambda",
+            data_bucket_arn=data.data_bucket_arn,
+            firehose_role=firehose_role,
+            opts=child,
+        )
+
+        log_subscription_role = create_log_subscription_role(
+            delivery_stream_arns=[api_log_stream.arn, lambda_log_stream.arn],
+            opts=child,
+        )
+
+        create_log_subscription(
+            source="api",
+            log_group_name=api_gateway_resources["log_group"].name,
+            delivery_stream=api_log_stream,
+            subscription_role=log_subscription_role,
+            opts=child,
+        )
+
+        # Le log group Lambda est créé avant la fonction (depends_on), son nom suit la convention AWS
+        create_log_subscription(
+            source="lambda",
+            log_group_name=lambda_function.name.apply(lambda name: f"/aws/lambda/{name}"),
+            delivery_stream=lambda_log_stream,
+            subscription_role=log_subscription_role,
+            opts=child,
+        )
+
+        for function, route_function in route_functions:
+            create_log_subscription(
+                source=f"lambda-{function.name}",
+                log_group_name=route_function.name.apply(lambda name: f"/aws/lambda/{name}"),
+                delivery_stream=lambda_log_stream,
+                subscription_role=log_subscription_role,
+                opts=child,
+            )
+
+        self.lambda_function_name = lambda_function.name
+        self.lambda_function_arn = lambda_function.arn
+        self.route_function_names = {function.name: route_function.name for function, route_function in route_functions}
+        self.api_gateway_url = api_gateway_resources["stage"].invoke_url
+        self.api_gateway_id = api.id
+        self.api_log_stream_name = api_log_stream.name
+        self.lambda_log_stream_name = lambda_log_stream.name
+
+        self.register_outputs(self.outputs)
+
+    @property
+    def outputs(self) -> dict:
+        return {
+            "lambda_max_concurrency": capacity["lambda_max_concurrency"],
+            "lambda_function_name": self.lambda_function_name,
+            "lambda_function_arn": self.lambda_function_arn,
+            "route_function_names": self.route_function_names,
+            "api_gateway_url": self.api_gateway_url,
+            "api_gateway_id": self.api_gateway_id,
+            "api_log_stream_name": self.api_log_stream_name,
+            "lambda_log_stream_name": self.lambda_log_stream_name,
+        }
@@ -0,0 +1,215 @@
+"""
+Data layer: data bucket, secrets, RDS/Aurora, cache, VPC endpoints, flow logs
+"""
+import pulumi
+
+from infra.capacity import load_capacity
+from infra.cloudwatch import create_alert_topic, create_database_alarms
+from infra.elasticache import cache_enabled, create_cache
+from infra.flow_logs import create_flow_log, flow_logs_enabled
+from infra.iam import create_rds_monitoring_role
+from infra.layers import child_opts
+from infra.rds import (
+    create_aurora_cluster,
+    create_aurora_parameter_group,
+    create_rds_instance,
+    create_rds_parameter_group,
+    create_rds_read_replicas,
+    create_rds_replica_parameter_group,
+    create_rds_subnet_group,
+)
+from infra.s3 import create_data_bucket
+from infra.secrets import (
+    create_api_key_secret,
+    create_db_app_secret,
+    create_db_secret,
+    create_db_secret_rotation,
+    generate_password,
+    manage_master_password,
+    rotation_enabled,
+)
+from infra.vpc_endpoints import create_vpc_endpoints
+
+capacity = load_capacity()
+
+
+class DataLayer(pulumi.ComponentResource):
+    def __init__(self, name: str, network, opts: pulumi.ResourceOptions = None):
+        super().__init__("cloud-module:layers:Data", name, None, opts)
+
+        child = child_opts(self)
+
+        pulumi.log.info("Creating S3 buckets...")
+
+        data_bucket = create_data_bucket(opts=child)
+
+        pulumi.log.info("Creating secrets...")
+
+        # Mot de passe persisté dans l'état de la stack, absent du programme si RDS le gère lui-même
+        db_password = None if manage_master_password else generate_password("db-master", opts=child)
+
+        api_key_secret = create_api_key_secret(opts=child)["secret"]
+
+        pulumi.log.info("Creating RDS resources...")
+
+        rds_monitoring_role = create_rds_monitoring_role(opts=child)
+        rds_subnet_group = create_rds_subnet_group(private_subnet_ids=network.data_subnet_ids, opts=child)
+
+        if capacity["db_engine"] == "aurora-serverless":
+            aurora = create_aurora_cluster(
+                subnet_group=rds_subnet_group,
+                parameter_group=create_aurora_parameter_group(opts=child),
+                security_group_id=network.rds_sg_id,
+                db_password=db_password,
+                monitoring_role_arn=rds_monitoring_role.arn,
+                opts=child,
+            )
+
+            db_endpoint = aurora["endpoint"]
+            db_address = aurora["endpoint"]
+            db_identifier = aurora["identifier"]
+            db_port = aurora["port"]
+            db_cluster_identifier = aurora["cluster_identifier"]
+            db_master_user_secrets = aurora["master_user_secrets"]
+            # Le reader endpoint Aurora répartit déjà les lectures entre les readers
+            db_reader_hosts = [aurora["reader_endpoint"]] if aurora["readers"] else []
+            db_replica_identifiers = [reader.identifier for reader in aurora["readers"]]
+        else:
+            rds_parameter_group = create_rds_parameter_group(opts=child)
+
+            rds_instance = create_rds_instance(
+                subnet_group=rds_subnet_group,
+                parameter_group=rds_parameter_group,
+                security_group_id=network.rds_sg_id,
+                db_password=db_password,
+                monitoring_role_arn=rds_monitoring_role.arn,
+                opts=child,
+            )
+
+            rds_replicas = create_rds_read_replicas(
+                primary=rds_instance,
+                parameter_group=create_rds_replica_parameter_group(rds_parameter_group, opts=child),
+                security_group_id=network.rds_sg_id,
+                monitoring_role_arn=rds_monitoring_role.arn,
+                opts=child,
+            )
+
+            db_endpoint = rds_instance.endpoint
+            db_address = rds_instance.address
+            db_identifier = rds_instance.identifier
+            db_port = rds_instance.port
+            db_cluster_identifier = None
+            db_master_user_secrets = rds_instance.master_user_secrets
+            db_reader_hosts = [replica.address for replica in rds_replicas]
+            db_replica_identifiers = [replica.identifier for replica in rds_replicas]
+
+        pulumi.log.info("Creating database secrets...")
+
+        if manage_master_password:
+            # Secret maître créé et tourné par RDS
+            db_secret_arn = db_master_user_secrets.apply(lambda secrets: secrets[0].secret_arn)
+        else:
+            db_secret_arn = create_db_secret(
+                db_password=db_password,
+                host=db_address,
+                port=db_port,
+                opts=child,
+            )["secret"].arn
+
+        # Avec la rotation, la Lambda utilise un utilisateur applicatif alterné, sinon le compte maître
+        if rotation_enabled:
+            db_app_secret = create_db_app_secret(
+                master_secret_arn=db_secret_arn,
+                host=db_address,
+                port=db_port,
+                opts=child,
+            )["secret"]
+            lambda_db_secret_arn = db_app_secret.arn
+
+            create_db_secret_rotation(
+                secret=db_app_secret,
+                master_secret_arn=db_secret_arn,
+                private_subnet_ids=network.private_subnet_ids,
+                security_group_id=network.rotation_sg_id,
+                opts=child,
+            )
+        else:
+            lambda_db_secret_arn = db_secret_arn
+
+        pulumi.log.info("Creating VPC endpoints...")
+
+        vpc_endpoints = create_vpc_endpoints(
+            vpc_id=network.vpc_id,
+            private_subnet_ids=network.private_subnet_ids,
+            private_route_table_ids=network.private_route_table_ids,
+            security_group_id=network.endpoint_sg_id,
+            data_bucket_arn=data_bucket.arn,
+            secret_arns=[db_secret_arn, lambda_db_secret_arn, api_key_secret.arn],
+            opts=child,
+        )
+
+        cache = None
+        if cache_enabled:
+            pulumi.log.info("Creating cache...")
+
+            cache = create_cache(
+                private_subnet_ids=network.data_subnet_ids,
+                security_group_id=network.cache_sg_id,
+                opts=child,
+            )
+
+        if flow_logs_enabled:
+            pulumi.log.info("Creating VPC flow logs...")
+
+            create_flow_log(vpc_id=network.vpc_id, data_bucket=data_bucket, opts=child)
+
+        pulumi.log.info("Creating database alarms...")
+
+        alert_topic = create_alert_topic(opts=child)
+
+        create_database_alarms(
+            rds_identifier=db_identifier,
+            alert_topic_arn=alert_topic.arn,
+            replica_identifiers=db_replica_identifiers,
+            cluster_identifier=db_cluster_identifier,
+            opts=child,
+        )
+
+        self.data_bucket_name = data_bucket.bucket
+        self.data_bucket_arn = data_bucket.arn
+        self.rds_endpoint = db_endpoint
+        self.rds_port = db_port
+        self.rds_reader_hosts = db_reader_hosts
+        self.db_identifier = db_identifier
+        self.db_cluster_identifier = db_cluster_identifier
+        self.db_replica_identifiers = db_replica_identifiers
+        self.db_secret_arn = db_secret_arn
+        self.lambda_db_secret_arn = lambda_db_secret_arn
+        self.api_key_secret_arn = api_key_secret.arn
+        self.cache_endpoint = cache.endpoints[0].address if cache else None
+        self.vpc_endpoint_ids = {service: endpoint.id for service, endpoint in vpc_endpoints.items()}
+        self.sns_alerts_topic_arn = alert_topic.arn
+
+        self.register_outputs(self.outputs)
+
+    @property
+    def outputs(self) -> dict:
+        outputs = {
+            "data_bucket_name": self.data_bucket_name,
+            "data_bucket_arn": self.data_bucket_arn,
+            "rds_endpoint": self.rds_endpoint,
+            "rds_port": self.rds_port,
+            "rds_engine": capacity["db_engine"],
+            "rds_instance_class": capacity["db_instance_class"],
+            "rds_reader_hosts": self.rds_reader_hosts,
+            "db_identifier": self.db_identifier,
+            "db_cluster_identifier": self.db_cluster_identifier,
+            "db_replica_identifiers": self.db_replica_identifiers,
+            "db_secret_arn": self.db_secret_arn,
+            "lambda_db_secret_arn": self.lambda_db_secret_arn,
+            "api_key_secret_arn": self.api_key_secret_arn,
+            "cache_endpoint": self.cache_endpoint,
+            "vpc_endpoint_ids": self.vpc_endpoint_ids,
+            "sns_alerts_topic_arn": self.sns_alerts_topic_arn,
+        }
+        return {name: value for name, value in outputs.items() if value is not None}
@@ -0,0 +1,55 @@
+"""
+Edge layer: static bucket, WAF, CloudFront
+"""
+import pulumi
+
+from infra.cloudfront import create_cloudfront_distribution
+from infra.layers import child_opts
+from infra.s3 import create_cloudfront_oac, create_static_bucket, create_static_bucket_policy
+from infra.waf import create_waf_acl
+
+
+class EdgeLayer(pulumi.ComponentResource):
+    def __init__(self, name: str, opts: pulumi.ResourceOptions = None):
+        super().__init__("cloud-module:layers:Edge", name, None, opts)
+
+        child = child_opts(self)
+
+        static_bucket = create_static_bucket(opts=child)
+
+        pulumi.log.info("Creating WAF...")
+
+        waf_acl = create_waf_acl(opts=child)
+
+        pulumi.log.info("Creating CloudFront distribution...")
+
+        cloudfront_oac = create_cloudfront_oac(static_bucket, opts=child)
+
+        cloudfront_distribution = create_cloudfront_distribution(
+            static_bucket=static_bucket,
+            oac=cloudfront_oac,
+            waf_acl_arn=waf_acl.arn,
+            opts=child,
+        )
+
+        create_static_bucket_policy(
+            static_bucket=static_bucket,
+            cloudfront_distribution_arn=cloudfront_distribution.arn,
+            opts=child,
+        )
+
+        self.static_bucket_name = static_bucket.bucket
+        self.cloudfront_domain = cloudfront_distribution.domain_name
+        self.cloudfront_distribution_id = cloudfront_distribution.id
+        self.waf_acl_arn = waf_acl.arn
+
+        self.register_outputs(self.outputs)
+
+    @property
+    def outputs(self) -> dict:
+        return {
+            "static_bucket_name": self.static_bucket_name,
+            "cloudfront_domain": self.cloudfront_domain,
+            "cloudfront_distribution_id": self.cloudfront_distribution_id,
+            "waf_acl_arn": self.waf_acl_arn,
+        }
@@ -0,0 +1,58 @@
+"""
+Network layer: VPC, subnets, NAT gateways, security groups
+"""
+import pulumi
+
+from infra.layers import child_opts
+from infra.vpc import create_security_groups, create_vpc
+
+
+class NetworkLayer(pulumi.ComponentResource):
+    def __init__(self, name: str, opts: pulumi.ResourceOptions = None):
+        super().__init__("cloud-module:layers:Network", name, None, opts)
+
+        pulumi.log.info("Creating VPC and networking resources...")
+
+        child = child_opts(self)
+        vpc_resources = create_vpc(opts=child)
+        security_groups = create_security_groups(vpc_resources["vpc"].id, opts=child)
+
+        nat_gws = vpc_resources["nat_gws"]
+        plan = vpc_resources["subnet_plan"]
+
+        self.vpc_id = vpc_resources["vpc"].id
+        self.public_subnet_ids = [subnet.id for subnet in vpc_resources["public_subnets"]]
+        self.private_subnet_ids = [subnet.id for subnet in vpc_resources["private_subnets"]]
+        # RDS et le cache vont dans le niveau data isolé quand le planner en crée un
+        self.data_subnet_ids = [
+            subnet.id for subnet in vpc_resources["data_subnets"] or vpc_resources["private_subnets"]
+        ]
+        self.private_route_table_ids = [rt.id for rt in vpc_resources["private_rts"]]
+        self.subnet_plan = {tier: plan.cidrs(tier) for tier in ("public", "private", "data")}
+        self.nat_gateway_ids = {az: nat_gw.id for az, nat_gw in zip(vpc_resources["nat_azs"], nat_gws)}
+        self.nat_interface_ids = [nat_gw.network_interface_id for nat_gw in nat_gws]
+        self.lambda_sg_id = security_groups["lambda_sg"].id
+        self.rds_sg_id = security_groups["rds_sg"].id
+        self.rotation_sg_id = security_groups["rotation_sg"].id
+        self.cache_sg_id = security_groups["cache_sg"].id
+        self.endpoint_sg_id = security_groups["endpoint_sg"].id
+
+        self.register_outputs(self.outputs)
+
+    @property
+    def outputs(self) -> dict:
+        return {
+            "vpc_id": self.vpc_id,
+            "public_subnet_ids": self.public_subnet_ids,
+            "private_subnet_ids": self.private_subnet_ids,
+            "data_subnet_ids": self.data_subnet_ids,
+            "private_route_table_ids": self.private_route_table_ids,
+            "subnet_plan": self.subnet_plan,
+            "nat_gateway_ids": self.nat_gateway_ids,
+            "nat_interface_ids": self.nat_interface_ids,
+            "lambda_sg_id": self.lambda_sg_id,
+            "rds_sg_id": self.rds_sg_id,
+            "rotation_sg_id": self.rotation_sg_id,
+            "cache_sg_id": self.cache_sg_id,
+            "endpoint_sg_id": self.endpoint_sg_id,
+        }
@@ -0,0 +1,172 @@
+"""
+CloudWatch Logs -> Firehose -> S3 archive
+"""
+import pulumi
+import pulumi_aws as aws
+
+from infra.api_gateway import ACCESS_LOG_FORMAT
+
+config = pulumi.Config()
+environment = config.get("environment") or "dev"
+parquet_enabled = config.get_bool("log_archive_parquet") or False
+
+LOG_ARCHIVE_PREFIX = "logs"
+PARTITION_PREFIX = "year=!{timestamp:yyyy}/month=!{timestamp:MM}/day=!{timestamp:dd}/hour=!{timestamp:HH}/"
+
+
+def create_access_log_table(data_bucket_name: pulumi.Output, opts: pulumi.ResourceOptions = None):
+
+    database = aws.glue.CatalogDatabase(
+        f"log-archive-db-{environment}",
+        name=f"log_archive_{environment}",
+        description="Archived CloudWatch logs",
+        opts=opts,
+    )
+
+    table = aws.glue.CatalogTable(
+        f"api-access-logs-table-{environment}",
+        name="api_access_logs",
+        database_name=database.name,
+        table_type="EXTERNAL_TABLE",
+        parameters={
+            "classification": "parquet",
+        },
+        partition_keys=[
+            aws.glue.CatalogTablePartitionKeyArgs(name=key, type="string")
+            for key in ("year", "month", "day", "hour")
+        ],
+        storage_descriptor=aws.glue.CatalogTableStorageDescriptorArgs(
+            location=data_bucket_name.apply(
+                lambda bucket: f"s3://{bucket}/{LOG_ARCHIVE_PREFIX}/api/"
+            ),
+            input_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+            output_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+            ser_de_info=aws.glue.CatalogTableStorageDescriptorSerDeInfoArgs(
+                serialization_library="org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe",
+            ),
+            columns=[
+                aws.glue.CatalogTableStorageDescriptorColumnArgs(name=field, type="string")
+                for field in ACCESS_LOG_FORMAT
+            ],
+        ),
+        opts=opts,
+    )
+
+    return {
+        "database": database,
+        "table": table,
+    }
+
+
+def create_log_delivery_stream(
+    source: str,
+    data_bucket_arn: pulumi.Output,
+    firehose_role: aws.iam.Role,
+    parquet_table: dict = None,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    processors = [
+        aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorArgs(
+            type="Decompression",
+            parameters=[
+                aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorParameterArgs(
+                    parameter_name="CompressionFormat",
+                    parameter_value="GZIP",
+                ),
+            ],
+        ),
+        aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorArgs(
+            type="CloudWatchLogProcessing",
+            parameters=[
+                aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorParameterArgs(
+                    parameter_name="DataMessageExtraction",
+                    parameter_value="true",
+                ),
+            ],
+        ),
+    ]
+
+    s3_args = {
+        "bucket_arn": data_bucket_arn,
+        "role_arn": firehose_role.arn,
+        "prefix": f"{LOG_ARCHIVE_PREFIX}/{source}/{PARTITION_PREFIX}",
+        "error_output_prefix": f"{LOG_ARCHIVE_PREFIX}-errors/{source}/!{{firehose:error-output-type}}/{PARTITION_PREFIX}",
+        "buffering_interval": 300,
+    }
+
+    if parquet_table:
+        # La conversion Parquet impose un buffer >= 64 MB et une compression portée par le SerDe
+        s3_args["buffering_size"] = 64
+        s3_args["compression_format"] = "UNCOMPRESSED"
+        s3_args["file_extension"] = ".parquet"
+        s3_args["data_format_conversion_configuration"] = aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationArgs(
+            input_format_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationInputFormatConfigurationArgs(
+                deserializer=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationInputFormatConfigurationDeserializerArgs(
+                    open_x_json_ser_de=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationInputFormatConfigurationDeserializerOpenXJsonSerDeArgs(),
+                ),
+            ),
+            output_format_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationOutputFormatConfigurationArgs(
+                serializer=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationOutputFormatConfigurationSerializerArgs(
+                    parquet_ser_de=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationOutputFormatConfigurationSerializerParquetSerDeArgs(
+                        compression="GZIP",
+                    ),
+                ),
+            ),
+            schema_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationDataFormatConversionConfigurationSchemaConfigurationArgs(
+                database_name=parquet_table["database"].name,
+                table_name=parquet_table["table"].name,
+                role_arn=firehose_role.arn,
+            ),
+        )
+    else:
+        processors.append(
+            aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationProcessorArgs(
+                type="AppendDelimiterToRecord",
+            )
+        )
+        s3_args["buffering_size"] = 5
+        s3_args["compression_format"] = "GZIP"
+        s3_args["file_extension"] = ".jsonl.gz"
+
+    s3_args["processing_configuration"] = aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationProcessingConfigurationArgs(
+        enabled=True,
+        processors=processors,
+    )
+
+    delivery_stream = aws.kinesis.FirehoseDeliveryStream(
+        f"{source}-log-archive-{environment}",
+        name=f"{source}-log-archive-{environment}",
+        destination="extended_s3",
+        extended_s3_configuration=aws.kinesis.FirehoseDeliveryStreamExtendedS3ConfigurationArgs(
+            **s3_args
+        ),
+        tags={
+            "Name": f"{source}-log-archive-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    return delivery_stream
+
+
+def create_log_subscription(
+    source: str,
+    log_group_name: pulumi.Output,
+    delivery_stream: aws.kinesis.FirehoseDeliveryStream,
+    subscription_role: aws.iam.Role,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    subscription = aws.cloudwatch.LogSubscriptionFilter(
+        f"{source}-log-subscription-{environment}",
+        name=f"{source}-log-archive-{environment}",
+        log_group=log_group_name,
+        filter_pattern="",
+        destination_arn=delivery_stream.arn,
+        role_arn=subscription_role.arn,
+        opts=opts,
+    )
+
+    return subscription
@@ -1,12 +1,20 @@
 import pulumi
 import pulumi_aws as aws
 
+from infra.capacity import load_capacity
+from infra.db_profiles import AURORA_PARAMETERS, apply_method, compute_parameters
+
 config = pulumi.Config()
 environment = config.get("environment") or "dev"
 db_name = config.get("db_name") or "appdb"
+capacity = load_capacity()
+manage_master_password = config.get_bool("db_manage_master_password") or False
 
 
-def create_rds_subnet_group(private_subnet_ids: list[pulumi.Output]):
+def create_rds_subnet_group(
+    private_subnet_ids: list[pulumi.Output],
+    opts: pulumi.ResourceOptions = None,
+):
 
     subnet_group = aws.rds.SubnetGroup(
         f"rds-subnet-group-{environment}",
@@ -16,42 +24,79 @@ def create_rds_subnet_group(private_subnet_ids: list[pulumi.Output]):
             "Name": f"rds-subnet-group-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     return subnet_group
 
 
-def create_rds_parameter_group():
+def create_rds_parameter_group(
+    profile_name: str = capacity["db_workload_profile"],
+    instance_class: str = capacity["db_instance_class"],
+    storage_type: str = "gp3",
+    name: str = "rds-pg-params",
+    min_connections: int = None,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    values = compute_parameters(profile_name, instance_class, storage_type, min_connections=min_connections)
+
+    # L'état précédent n'est pas lisible pendant l'évaluation : le diff de `pulumi preview` montre
+    # lesquels changent, ce message rappelle seulement lesquels attendent un redémarrage
+    static = sorted(name for name in values if apply_method(name) == "pending-reboot")
+    pulumi.log.info(
+        f"Parameter group profile '{profile_name}' on {instance_class}: "
+        f"static parameters ({', '.join(static)}) only take effect after a reboot when their value changes"
+    )
 
     parameter_group = aws.rds.ParameterGroup(
-        f"rds-pg-params-{environment}",
+        f"{name}-{environment}",
         family="postgres17",
         description="Custom parameter group for PostgreSQL 15",
         parameters=[
             aws.rds.ParameterGroupParameterArgs(
-                name="log_statement",
-                value="all",
-            ),
-            aws.rds.ParameterGroupParameterArgs(
-                name="log_min_duration_statement",
-                value="1000",
-            ),
+                name=name,
+                value=value,
+                apply_method=apply_method(name),
+            )
+            for name, value in sorted(values.items())
         ],
         tags={
-            "Name": f"rds-pg-params-{environment}",
+            "Name": f"{name}-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     return parameter_group
 
 
+def create_rds_replica_parameter_group(
+    parameter_group: aws.rds.ParameterGroup,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    # Sans réplica, ou de même classe que le primaire : le groupe du primaire convient
+    if not config.get_int("db_replica_count") or capacity["db_replica_instance_class"] == capacity["db_instance_class"]:
+        return parameter_group
+
+    # Mémoire dimensionnée pour la classe du réplica, max_connections au moins égal au primaire (hot standby)
+    primary = compute_parameters(capacity["db_workload_profile"], capacity["db_instance_class"])
+    return create_rds_parameter_group(
+        instance_class=capacity["db_replica_instance_class"],
+        name="rds-replica-pg-params",
+        min_connections=int(primary["max_connections"]),
+        opts=opts,
+    )
+
+
 def create_rds_instance(
     subnet_group: aws.rds.SubnetGroup,
     parameter_group: aws.rds.ParameterGroup,
     security_group_id: pulumi.Output,
-    db_password: str,
+    db_password: pulumi.Input,
     monitoring_role_arn: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
 ):
 
     db_username = config.get("db_username") or "dbadmin"
@@ -61,14 +106,17 @@ def create_rds_instance(
         identifier=f"main-db-{environment}",
         engine="postgres",
         engine_version="17.7",
-        instance_class="db.t3.micro",
-        allocated_storage=20,
-        max_allocated_storage=100,
+        instance_class=capacity["db_instance_class"],
+        allocated_storage=capacity["db_allocated_storage"],
+        max_allocated_storage=capacity["db_max_allocated_storage"],
         storage_type="gp3",
+        iops=capacity["db_storage_iops"],
+        storage_throughput=capacity["db_storage_throughput"],
         storage_encrypted=True,
         db_name=db_name,
         username=db_username,
-        password=db_password,
+        password=None if manage_master_password else db_password,
+        manage_master_user_password=manage_master_password or None,
         db_subnet_group_name=subnet_group.name,
         vpc_security_group_ids=[security_group_id],
         parameter_group_name=parameter_group.name,
@@ -88,6 +136,168 @@ def create_rds_instance(
             "Name": f"main-db-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     return rds_instance
+
+
+def create_rds_read_replicas(
+    primary: aws.rds.Instance,
+    parameter_group: aws.rds.ParameterGroup,
+    security_group_id: pulumi.Output,
+    monitoring_role_arn: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    replica_count = config.get_int("db_replica_count") or 0
+    replica_azs = config.get_object("db_replica_azs") or []
+
+    replicas = []
+    for i in range(replica_count):
+        replica = aws.rds.Instance(
+            f"main-db-replica-{i}-{environment}",
+            identifier=f"main-db-replica-{i}-{environment}",
+            replicate_source_db=primary.identifier,
+            instance_class=capacity["db_replica_instance_class"],
+            availability_zone=replica_azs[i % len(replica_azs)] if replica_azs else None,
+            storage_type="gp3",
+            storage_encrypted=True,
+            vpc_security_group_ids=[security_group_id],
+            parameter_group_name=parameter_group.name,
+            publicly_accessible=False,
+            skip_final_snapshot=True,
+            backup_retention_period=0,
+            maintenance_window="Mon:04:00-Mon:05:00",
+            monitoring_interval=60,
+            monitoring_role_arn=monitoring_role_arn,
+            performance_insights_enabled=True,
+            performance_insights_retention_period=7,
+            enabled_cloudwatch_logs_exports=["postgresql", "upgrade"],
+            tags={
+                "Name": f"main-db-replica-{i}-{environment}",
+                "Environment": environment,
+                "Role": "replica",
+            },
+            opts=opts,
+        )
+        replicas.append(replica)
+
+    return replicas
+
+
+def create_aurora_parameter_group(
+    profile_name: str = capacity["db_workload_profile"],
+    opts: pulumi.ResourceOptions = None,
+):
+
+    values = compute_parameters(
+        profile_name,
+        capacity["db_instance_class"],
+        memory_gib=capacity["db_memory_gib"],
+    )
+
+    parameter_group = aws.rds.ClusterParameterGroup(
+        f"aurora-pg-params-{environment}",
+        family="aurora-postgresql16",
+        description="Cluster parameter group for Aurora PostgreSQL 16",
+        parameters=[
+            aws.rds.ClusterParameterGroupParameterArgs(
+                name=name,
+                value=value,
+                apply_method=apply_method(name),
+            )
+            for name, value in sorted(values.items())
+            if name in AURORA_PARAMETERS
+        ],
+        tags={
+            "Name": f"aurora-pg-params-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    return parameter_group
+
+
+def create_aurora_cluster(
+    subnet_group: aws.rds.SubnetGroup,
+    parameter_group: aws.rds.ClusterParameterGroup,
+    security_group_id: pulumi.Output,
+    db_password: pulumi.Input,
+    monitoring_role_arn: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    db_username = config.get("db_username") or "dbadmin"
+    reader_count = config.get_int("db_replica_count") or 0
+
+    cluster = aws.rds.Cluster(
+        f"main-aurora-{environment}",
+        cluster_identifier=f"main-aurora-{environment}",
+        engine="aurora-postgresql",
+        engine_mode="provisioned",
+        engine_version="16.6",
+        database_name=db_name,
+        master_username=db_username,
+        master_password=None if manage_master_password else db_password,
+        manage_master_user_password=manage_master_password or None,
+        db_subnet_group_name=subnet_group.name,
+        db_cluster_parameter_group_name=parameter_group.name,
+        vpc_security_group_ids=[security_group_id],
+        storage_encrypted=True,
+        enable_http_endpoint=config.get_bool("db_data_api") or False,
+        serverlessv2_scaling_configuration=aws.rds.ClusterServerlessv2ScalingConfigurationArgs(
+            min_capacity=capacity["db_min_acu"],
+            max_capacity=capacity["db_max_acu"],
+        ),
+        skip_final_snapshot=environment == "dev",
+        final_snapshot_identifier=f"main-aurora-final-{environment}" if environment != "dev" else None,
+        backup_retention_period=7,
+        preferred_backup_window="03:00-04:00",
+        preferred_maintenance_window="mon:04:00-mon:05:00",
+        enabled_cloudwatch_logs_exports=["postgresql"],
+        deletion_protection=environment == "prod",
+        tags={
+            "Name": f"main-aurora-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    instances = []
+    for i in range(reader_count + 1):
+        role = "writer" if i == 0 else "reader"
+        instance = aws.rds.ClusterInstance(
+            f"main-aurora-{i}-{environment}",
+            identifier=f"main-aurora-{i}-{environment}",
+            cluster_identifier=cluster.id,
+            engine=cluster.engine,
+            engine_version=cluster.engine_version,
+            instance_class="db.serverless",
+            publicly_accessible=False,
+            promotion_tier=i,
+            monitoring_interval=60,
+            monitoring_role_arn=monitoring_role_arn,
+            performance_insights_enabled=True,
+            performance_insights_retention_period=7,
+            tags={
+                "Name": f"main-aurora-{i}-{environment}",
+                "Environment": environment,
+                "Role": role,
+            },
+            opts=opts,
+        )
+        instances.append(instance)
+
+    return {
+        "cluster": cluster,
+        "writer": instances[0],
+        "readers": instances[1:],
+        "endpoint": cluster.endpoint,
+        "reader_endpoint": cluster.reader_endpoint,
+        "identifier": instances[0].identifier,
+        "cluster_identifier": cluster.cluster_identifier,
+        "port": cluster.port,
+        "master_user_secrets": cluster.master_user_secrets,
+    }
@@ -6,7 +6,7 @@ config = pulumi.Config()
 environment = config.get("environment") or "dev"
 
 
-def create_static_bucket():
+def create_static_bucket(opts: pulumi.ResourceOptions = None):
     
     bucket = aws.s3.BucketV2(
         f"static-content-{environment}",
@@ -15,6 +15,7 @@ def create_static_bucket():
             "Environment": environment,
             "Purpose": "Static website content",
         },
+        opts=opts,
     )
 
     public_access_block = aws.s3.BucketPublicAccessBlock(
@@ -24,6 +25,7 @@ def create_static_bucket():
         block_public_policy=True,
         ignore_public_acls=True,
         restrict_public_buckets=True,
+        opts=opts,
     )
 
     versioning = aws.s3.BucketVersioningV2(
@@ -32,6 +34,7 @@ def create_static_bucket():
         versioning_configuration=aws.s3.BucketVersioningV2VersioningConfigurationArgs(
             status="Enabled",
         ),
+        opts=opts,
     )
 
     encryption = aws.s3.BucketServerSideEncryptionConfigurationV2(
@@ -44,12 +47,13 @@ def create_static_bucket():
                 ),
             ),
         ],
+        opts=opts,
     )
 
     return bucket
 
 
-def create_data_bucket():
+def create_data_bucket(opts: pulumi.ResourceOptions = None):
     
     bucket = aws.s3.BucketV2(
         f"data-storage-{environment}",
@@ -58,6 +62,7 @@ def create_data_bucket():
             "Environment": environment,
             "Purpose": "Data storage from RDS exports",
         },
+        opts=opts,
     )
 
     public_access_block = aws.s3.BucketPublicAccessBlock(
@@ -67,6 +72,7 @@ def create_data_bucket():
         block_public_policy=True,
         ignore_public_acls=True,
         restrict_public_buckets=True,
+        opts=opts,
     )
 
     versioning = aws.s3.BucketVersioningV2(
@@ -75,6 +81,7 @@ def create_data_bucket():
         versioning_configuration=aws.s3.BucketVersioningV2VersioningConfigurationArgs(
             status="Enabled",
         ),
+        opts=opts,
     )
 
     encryption = aws.s3.BucketServerSideEncryptionConfigurationV2(
@@ -87,6 +94,7 @@ def create_data_bucket():
                 ),
             ),
         ],
+        opts=opts,
     )
 
     lifecycle = aws.s3.BucketLifecycleConfigurationV2(
@@ -108,12 +116,13 @@ def create_data_bucket():
                 ],
             ),
         ],
+        opts=opts,
     )
 
     return bucket
 
 
-def create_cloudfront_oac(static_bucket: aws.s3.BucketV2):
+def create_cloudfront_oac(static_bucket: aws.s3.BucketV2, opts: pulumi.ResourceOptions = None):
     
     oac = aws.cloudfront.OriginAccessControl(
         f"static-oac-{environment}",
@@ -122,6 +131,7 @@ def create_cloudfront_oac(static_bucket: aws.s3.BucketV2):
         origin_access_control_origin_type="s3",
         signing_behavior="always",
         signing_protocol="sigv4",
+        opts=opts,
     )
 
     return oac
@@ -130,9 +140,8 @@ def create_cloudfront_oac(static_bucket: aws.s3.BucketV2):
 def create_static_bucket_policy(
     static_bucket: aws.s3.BucketV2,
     cloudfront_distribution_arn: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
 ):
-    
-    account_id = aws.get_caller_identity().account_id
 
     policy_document = pulumi.Output.all(
         static_bucket.arn, cloudfront_distribution_arn
@@ -162,6 +171,7 @@ def create_static_bucket_policy(
         f"static-content-policy-{environment}",
         bucket=static_bucket.id,
         policy=policy_document,
+        opts=opts,
     )
 
     return bucket_policy
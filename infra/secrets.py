@@ -4,22 +4,69 @@ AWS Secrets Manager
 import json
 import pulumi
 import pulumi_aws as aws
-import secrets
-import string
+import pulumi_random as random
 
 config = pulumi.Config()
 environment = config.get("environment") or "dev"
+db_name = config.get("db_name") or "appdb"
 db_username = config.get("db_username") or "dbadmin"
+db_app_username = config.get("db_app_username") or "app_user"
+# Opt-in : le rôle `db_app_username` doit exister dans PostgreSQL avant d'activer la rotation
+rotation_enabled = config.get_bool("db_secret_rotation") or False
+manage_master_password = config.get_bool("db_manage_master_password") or False
 
 
-def generate_password(length: int = 32) -> str:
-    alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-    return "".join(secrets.choice(alphabet) for _ in range(length))
+def generate_password(
+    name: str,
+    length: int = 32,
+    opts: pulumi.ResourceOptions = None,
+) -> pulumi.Output:
+    # Valeur conservée dans l'état de la stack, régénérée seulement si `password_rotation_id` change
+    password = random.RandomPassword(
+        f"{name}-password-{environment}",
+        length=length,
+        special=True,
+        # RDS refuse '/', '@', '"' et les espaces dans le mot de passe maître
+        override_special="!#$%^&*",
+        keepers={
+            "rotation": config.get("password_rotation_id") or "initial",
+        },
+        opts=opts,
+    )
+
+    return password.result
+
 
+def connection_secret_string(
+    username: str,
+    password: pulumi.Input,
+    host: pulumi.Output = None,
+    port: pulumi.Output = None,
+    master_arn: pulumi.Input = None,
+) -> pulumi.Output:
 
-def create_db_secret():
+    return pulumi.Output.all(host, port, password, master_arn).apply(
+        lambda args: json.dumps(
+            {
+                "engine": "postgres",
+                **({"host": args[0], "port": int(args[1])} if args[0] else {}),
+                "dbname": db_name,
+                "username": username,
+                "password": args[2],
+                **({"masterarn": args[3]} if args[3] else {}),
+            }
+        )
+    )
 
-    db_password = generate_password()
+
+def create_db_secret(
+    db_password: pulumi.Input = None,
+    host: pulumi.Output = None,
+    port: pulumi.Output = None,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    db_password = db_password or generate_password("db-master", opts=opts)
 
     secret = aws.secretsmanager.Secret(
         f"db-credentials-{environment}",
@@ -29,17 +76,14 @@ def create_db_secret():
             "Name": f"db-credentials-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     secret_value = aws.secretsmanager.SecretVersion(
         f"db-credentials-version-{environment}",
         secret_id=secret.id,
-        secret_string=json.dumps(
-            {
-                "username": db_username,
-                "password": db_password,
-            }
-        ),
+        secret_string=connection_secret_string(db_username, db_password, host, port),
+        opts=opts,
     )
 
     return {
@@ -49,9 +93,103 @@ def create_db_secret():
     }
 
 
-def create_api_key_secret():
+def create_db_app_secret(
+    master_secret_arn: pulumi.Output,
+    host: pulumi.Output,
+    port: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
+):
 
-    api_key = generate_password(48)
+    # Mot de passe du rôle créé à la main : la Lambda bascule sur ce secret dès ce `pulumi up`
+    app_password = config.get_secret("db_app_password")
+    if app_password is None:
+        raise ValueError(
+            f"db_secret_rotation requires the PostgreSQL role '{db_app_username}' and its password "
+            "in 'pulumi config set --secret db_app_password'"
+        )
+
+    secret = aws.secretsmanager.Secret(
+        f"db-app-credentials-{environment}",
+        name=f"db-app-credentials-{environment}",
+        description="Application database credentials, rotated with alternating users",
+        tags={
+            "Name": f"db-app-credentials-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    secret_value = aws.secretsmanager.SecretVersion(
+        f"db-app-credentials-version-{environment}",
+        secret_id=secret.id,
+        secret_string=connection_secret_string(
+            db_app_username,
+            app_password,
+            host,
+            port,
+            master_arn=master_secret_arn,
+        ),
+        # La rotation remplace la valeur, Pulumi ne doit pas la réécrire
+        opts=pulumi.ResourceOptions.merge(opts, pulumi.ResourceOptions(ignore_changes=["secret_string"])),
+    )
+
+    return {
+        "secret": secret,
+        "secret_version": secret_value,
+    }
+
+
+def create_db_secret_rotation(
+    secret: aws.secretsmanager.Secret,
+    master_secret_arn: pulumi.Output,
+    private_subnet_ids: list[pulumi.Output],
+    security_group_id: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    region = aws.config.region or "eu-west-3"
+
+    # Fonction de rotation fournie par AWS (Serverless Application Repository), stratégie multi-utilisateurs
+    rotation_stack = aws.serverlessrepository.CloudFormationStack(
+        f"db-rotation-{environment}",
+        name=f"db-rotation-{environment}",
+        application_id="arn:aws:serverlessrepo:us-east-1:297356227824:applications/SecretsManagerRDSPostgreSQLRotationMultiUser",
+        capabilities=["CAPABILITY_IAM", "CAPABILITY_RESOURCE_POLICY"],
+        parameters={
+            "endpoint": f"https://secretsmanager.{region}.amazonaws.com",
+            "functionName": f"db-rotation-{environment}",
+            "vpcSubnetIds": pulumi.Output.from_input(private_subnet_ids).apply(",".join),
+            "vpcSecurityGroupIds": security_group_id,
+            "masterSecretArn": master_secret_arn,
+        },
+        tags={
+            "Name": f"db-rotation-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    rotation = aws.secretsmanager.SecretRotation(
+        f"db-app-credentials-rotation-{environment}",
+        secret_id=secret.id,
+        rotation_lambda_arn=rotation_stack.outputs.apply(lambda outputs: outputs["RotationLambdaARN"]),
+        rotation_rules=aws.secretsmanager.SecretRotationRotationRulesArgs(
+            automatically_after_days=config.get_int("db_rotation_days") or 30,
+        ),
+        # La première rotation clone `db_app_username` : elle est lancée à la main une fois le rôle créé
+        rotate_immediately=False,
+        opts=opts,
+    )
+
+    return {
+        "rotation_stack": rotation_stack,
+        "rotation": rotation,
+    }
+
+
+def create_api_key_secret(opts: pulumi.ResourceOptions = None):
+
+    api_key = generate_password("api-key", 48, opts=opts)
 
     secret = aws.secretsmanager.Secret(
         f"api-keys-{environment}",
@@ -61,16 +199,20 @@ def create_api_key_secret():
             "Name": f"api-keys-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     secret_value = aws.secretsmanager.SecretVersion(
         f"api-keys-version-{environment}",
         secret_id=secret.id,
-        secret_string=json.dumps(
-            {
-                "internal_api_key": api_key,
-            }
+        secret_string=api_key.apply(
+            lambda key: json.dumps(
+                {
+                    "internal_api_key": key,
+                }
+            )
         ),
+        opts=opts,
     )
 
     return {
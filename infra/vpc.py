@@ -1,21 +1,102 @@
 import pulumi
 import pulumi_aws as aws
 
+from infra import invoke_cache
+from infra.api_routes import load_route_table
+from infra.capacity import load_capacity
+from infra.cidr_planner import SubnetDemand, SubnetPlan, legacy_plan, plan_subnets
+from infra.elasticache import cache_enabled
+from infra.vpc_endpoints import interface_endpoints_enabled
+
 config = pulumi.Config()
 environment = config.get("environment") or "dev"
+capacity = load_capacity()
+route_functions = load_route_table()["functions"]
+
+
+def subnet_plan(available_azs: int) -> SubnetPlan:
+
+    # Sans le planner, les /24 historiques sont conservés : changer un CIDR remplace le sous-réseau
+    if not config.get_bool("subnet_planner"):
+        return legacy_plan(2)
+
+    az_count = config.get_int("az_count") or 2
+    if az_count > available_azs:
+        raise ValueError(f"az_count {az_count} exceeds the {available_azs} available AZs")
+
+    interface_endpoints = 0
+    if interface_endpoints_enabled:
+        interface_endpoints = 2 + len(config.get_object("vpc_endpoint_extra_services") or [])
+
+    demand = SubnetDemand(
+        peak_concurrency=capacity["lambda_max_concurrency"],
+        lambda_memory_mb=max([capacity["lambda_memory_size"]] + [function.memory_size for function in route_functions]),
+        lambda_functions=1 + len(route_functions),
+        interface_endpoints=interface_endpoints,
+        cache_nodes=az_count if cache_enabled else 0,
+        db_instances=1 + (config.get_int("db_replica_count") or 0),
+        nat_gateways=az_count,
+    )
+
+    plan = plan_subnets(
+        config.get("vpc_cidr") or "10.0.0.0/16",
+        az_count,
+        demand,
+        growth_factor=config.get_float("subnet_growth_factor") or 2.0,
+        existing=config.get_object("reserved_cidrs") or [],
+        # Sortie subnet_plan du dernier déploiement : les sous-réseaux en service ne bougent pas
+        deployed=config.get_object("subnet_cidrs") or {},
+    )
+    pulumi.log.info(
+        "Subnet plan: " + ", ".join(f"{tier} {plan.cidrs(tier)}" for tier in plan.subnets)
+    )
+    return plan
+
+
+def create_subnets(
+    vpc: aws.ec2.Vpc,
+    tier: str,
+    cidrs: list[str],
+    az_names: list[str],
+    opts: pulumi.ResourceOptions = None,
+):
+
+    subnets = []
+    for i, (cidr, az) in enumerate(zip(cidrs, az_names)):
+        subnet = aws.ec2.Subnet(
+            f"{tier}-subnet-{i}-{environment}",
+            vpc_id=vpc.id,
+            cidr_block=cidr,
+            availability_zone=az,
+            map_public_ip_on_launch=tier == "public",
+            tags={
+                "Name": f"{tier}-subnet-{i}-{environment}",
+                "Environment": environment,
+                "Type": tier,
+            },
+            opts=opts,
+        )
+        subnets.append(subnet)
+
+    return subnets
+
+
+def create_vpc(opts: pulumi.ResourceOptions = None):
 
+    azs = invoke_cache.availability_zones()
+    plan = subnet_plan(len(azs))
+    az_names = azs[: plan.az_count]
 
-def create_vpc():
-    
     vpc = aws.ec2.Vpc(
         f"main-vpc-{environment}",
-        cidr_block="10.0.0.0/16",
+        cidr_block=plan.vpc_cidr,
         enable_dns_hostnames=True,
         enable_dns_support=True,
         tags={
             "Name": f"main-vpc-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     igw = aws.ec2.InternetGateway(
@@ -25,41 +106,12 @@ def create_vpc():
             "Name": f"main-igw-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
-    azs = aws.get_availability_zones(state="available")
-
-    public_subnets = []
-    for i, az in enumerate(azs.names[:2]):
-        subnet = aws.ec2.Subnet(
-            f"public-subnet-{i}-{environment}",
-            vpc_id=vpc.id,
-            cidr_block=f"10.0.{i}.0/24",
-            availability_zone=az,
-            map_public_ip_on_launch=True,
-            tags={
-                "Name": f"public-subnet-{i}-{environment}",
-                "Environment": environment,
-                "Type": "public",
-            },
-        )
-        public_subnets.append(subnet)
-
-    private_subnets = []
-    for i, az in enumerate(azs.names[:2]):
-        subnet = aws.ec2.Subnet(
-            f"private-subnet-{i}-{environment}",
-            vpc_id=vpc.id,
-            cidr_block=f"10.0.{i + 10}.0/24",
-            availability_zone=az,
-            map_public_ip_on_launch=False,
-            tags={
-                "Name": f"private-subnet-{i}-{environment}",
-                "Environment": environment,
-                "Type": "private",
-            },
-        )
-        private_subnets.append(subnet)
+    public_subnets = create_subnets(vpc, "public", plan.cidrs("public"), az_names, opts=opts)
+    private_subnets = create_subnets(vpc, "private", plan.cidrs("private"), az_names, opts=opts)
+    data_subnets = create_subnets(vpc, "data", plan.cidrs("data"), az_names, opts=opts)
 
     public_rt = aws.ec2.RouteTable(
         f"public-rt-{environment}",
@@ -74,6 +126,7 @@ def create_vpc():
             "Name": f"public-rt-{environment}",
             "Environment": environment,
         },
+        opts=opts,
     )
 
     for i, subnet in enumerate(public_subnets):
@@ -81,59 +134,106 @@ def create_vpc():
             f"public-rt-assoc-{i}-{environment}",
             subnet_id=subnet.id,
             route_table_id=public_rt.id,
+            opts=opts,
         )
 
-    nat_eip = aws.ec2.Eip(
-        f"nat-eip-{environment}",
-        domain="vpc",
-        tags={
-            "Name": f"nat-eip-{environment}",
-            "Environment": environment,
-        },
-    )
+    # Un NAT par AZ supprime le trafic inter-AZ et le point de défaillance unique, un seul NAT suffit en dev
+    nat_mode = config.get("nat_gateway_mode") or ("single" if environment == "dev" else "per-az")
+    if nat_mode not in ("single", "per-az"):
+        raise ValueError(f"Unknown NAT gateway mode: {nat_mode}")
+    nat_count = len(public_subnets) if nat_mode == "per-az" else 1
 
-    nat_gw = aws.ec2.NatGateway(
-        f"nat-gw-{environment}",
-        allocation_id=nat_eip.id,
-        subnet_id=public_subnets[0].id,
-        tags={
-            "Name": f"nat-gw-{environment}",
-            "Environment": environment,
-        },
-    )
+    nat_gws = []
+    private_rts = []
+    for i in range(nat_count):
+        # L'AZ 0 garde les noms historiques pour ne pas remplacer le NAT existant
+        suffix = environment if i == 0 else f"{i}-{environment}"
 
-    private_rt = aws.ec2.RouteTable(
-        f"private-rt-{environment}",
-        vpc_id=vpc.id,
-        routes=[
-            aws.ec2.RouteTableRouteArgs(
-                cidr_block="0.0.0.0/0",
-                nat_gateway_id=nat_gw.id,
-            ),
-        ],
-        tags={
-            "Name": f"private-rt-{environment}",
-            "Environment": environment,
-        },
-    )
+        nat_eip = aws.ec2.Eip(
+            f"nat-eip-{suffix}",
+            domain="vpc",
+            tags={
+                "Name": f"nat-eip-{suffix}",
+                "Environment": environment,
+            },
+            opts=opts,
+        )
+
+        nat_gw = aws.ec2.NatGateway(
+            f"nat-gw-{suffix}",
+            allocation_id=nat_eip.id,
+            subnet_id=public_subnets[i].id,
+            tags={
+                "Name": f"nat-gw-{suffix}",
+                "Environment": environment,
+                "AvailabilityZone": az_names[i],
+            },
+            opts=opts,
+        )
+
+        private_rt = aws.ec2.RouteTable(
+            f"private-rt-{suffix}",
+            vpc_id=vpc.id,
+            routes=[
+                aws.ec2.RouteTableRouteArgs(
+                    cidr_block="0.0.0.0/0",
+                    nat_gateway_id=nat_gw.id,
+                ),
+            ],
+            tags={
+                "Name": f"private-rt-{suffix}",
+                "Environment": environment,
+            },
+            opts=opts,
+        )
+
+        nat_gws.append(nat_gw)
+        private_rts.append(private_rt)
 
     for i, subnet in enumerate(private_subnets):
         aws.ec2.RouteTableAssociation(
             f"private-rt-assoc-{i}-{environment}",
             subnet_id=subnet.id,
-            route_table_id=private_rt.id,
+            route_table_id=private_rts[i % nat_count].id,
+            opts=opts,
+        )
+
+    # Niveau data isolé : aucune route sortante, seul le trafic interne au VPC est possible
+    if data_subnets:
+        data_rt = aws.ec2.RouteTable(
+            f"data-rt-{environment}",
+            vpc_id=vpc.id,
+            tags={
+                "Name": f"data-rt-{environment}",
+                "Environment": environment,
+            },
+            opts=opts,
         )
 
+        for i, subnet in enumerate(data_subnets):
+            aws.ec2.RouteTableAssociation(
+                f"data-rt-assoc-{i}-{environment}",
+                subnet_id=subnet.id,
+                route_table_id=data_rt.id,
+                opts=opts,
+            )
+
     return {
         "vpc": vpc,
         "public_subnets": public_subnets,
         "private_subnets": private_subnets,
+        "data_subnets": data_subnets,
         "igw": igw,
-        "nat_gw": nat_gw,
+        "nat_gw": nat_gws[0],
+        "nat_gws": nat_gws,
+        "private_rt": private_rts[0],
+        "private_rts": private_rts,
+        "nat_azs": az_names[:nat_count],
+        "subnet_plan": plan,
     }
 
 
-def create_security_groups(vpc_id: pulumi.Output):
+def create_security_groups(vpc_id: pulumi.Output, opts: pulumi.ResourceOptions = None):
 
     lambda_sg = aws.ec2.SecurityGroup(
         f"lambda-sg-{environment}",
@@ -152,6 +252,27 @@ def create_security_groups(vpc_id: pulumi.Output):
             "Name": f"lambda-sg-{environment}",
             "Environment": environment,
         },
+        opts=opts,
+    )
+
+    rotation_sg = aws.ec2.SecurityGroup(
+        f"rotation-sg-{environment}",
+        vpc_id=vpc_id,
+        description="Security group for the secret rotation Lambda",
+        egress=[
+            aws.ec2.SecurityGroupEgressArgs(
+                from_port=0,
+                to_port=0,
+                protocol="-1",
+                cidr_blocks=["0.0.0.0/0"],
+                description="Allow all outbound traffic",
+            ),
+        ],
+        tags={
+            "Name": f"rotation-sg-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
     )
 
     rds_sg = aws.ec2.SecurityGroup(
@@ -166,6 +287,13 @@ def create_security_groups(vpc_id: pulumi.Output):
                 security_groups=[lambda_sg.id],
                 description="Allow PostgreSQL from Lambda",
             ),
+            aws.ec2.SecurityGroupIngressArgs(
+                from_port=5432,
+                to_port=5432,
+                protocol="tcp",
+                security_groups=[rotation_sg.id],
+                description="Allow PostgreSQL from secret rotation",
+            ),
         ],
         egress=[
             aws.ec2.SecurityGroupEgressArgs(
@@ -180,9 +308,60 @@ def create_security_groups(vpc_id: pulumi.Output):
             "Name": f"rds-sg-{environment}",
             "Environment": environment,
         },
+        opts=opts,
+    )
+
+    cache_sg = aws.ec2.SecurityGroup(
+        f"cache-sg-{environment}",
+        vpc_id=vpc_id,
+        description="Security group for the ElastiCache cache",
+        ingress=[
+            aws.ec2.SecurityGroupIngressArgs(
+                from_port=6379,
+                to_port=6380,
+                protocol="tcp",
+                security_groups=[lambda_sg.id],
+                description="Allow Valkey from Lambda",
+            ),
+        ],
+        tags={
+            "Name": f"cache-sg-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+    endpoint_sg = aws.ec2.SecurityGroup(
+        f"endpoint-sg-{environment}",
+        vpc_id=vpc_id,
+        description="Security group for VPC interface endpoints",
+        ingress=[
+            aws.ec2.SecurityGroupIngressArgs(
+                from_port=443,
+                to_port=443,
+                protocol="tcp",
+                security_groups=[lambda_sg.id],
+                description="Allow HTTPS from Lambda",
+            ),
+            aws.ec2.SecurityGroupIngressArgs(
+                from_port=443,
+                to_port=443,
+                protocol="tcp",
+                security_groups=[rotation_sg.id],
+                description="Allow HTTPS from secret rotation",
+            ),
+        ],
+        tags={
+            "Name": f"endpoint-sg-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
     )
 
     return {
         "lambda_sg": lambda_sg,
         "rds_sg": rds_sg,
+        "rotation_sg": rotation_sg,
+        "cache_sg": cache_sg,
+        "endpoint_sg": endpoint_sg,
     }
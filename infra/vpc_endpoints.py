@@ -0,0 +1,182 @@
+"""
+VPC endpoints
+"""
+import json
+
+import pulumi
+import pulumi_aws as aws
+
+from infra import invoke_cache
+
+config = pulumi.Config()
+environment = config.get("environment") or "dev"
+
+# Endpoints interface facturés à l'heure et par AZ : désactivés par défaut en dev
+interface_endpoints_enabled = config.get_bool("vpc_interface_endpoints")
+if interface_endpoints_enabled is None:
+    interface_endpoints_enabled = environment != "dev"
+
+OPTIONAL_SERVICES = ("sqs", "xray")
+
+
+def endpoint_policy(statements: list[dict]) -> str:
+    return json.dumps({"Version": "2012-10-17", "Statement": statements})
+
+
+def create_s3_gateway_endpoint(
+    vpc_id: pulumi.Output,
+    route_table_ids: list[pulumi.Output],
+    data_bucket_arn: pulumi.Output,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    region = invoke_cache.region()
+
+    # Gratuit : le trafic S3 des sous-réseaux privés ne passe plus par le NAT
+    return aws.ec2.VpcEndpoint(
+        f"s3-endpoint-{environment}",
+        vpc_id=vpc_id,
+        service_name=f"com.amazonaws.{region}.s3",
+        vpc_endpoint_type="Gateway",
+        route_table_ids=route_table_ids,
+        policy=data_bucket_arn.apply(
+            lambda arn: endpoint_policy(
+                [
+                    {
+                        "Effect": "Allow",
+                        "Principal": "*",
+                        "Action": [
+                            "s3:GetObject",
+                            "s3:PutObject",
+                            "s3:DeleteObject",
+                            "s3:ListBucket",
+                        ],
+                        "Resource": [arn, f"{arn}/*"],
+                    }
+                ]
+            )
+        ),
+        tags={
+            "Name": f"s3-endpoint-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+
+def create_interface_endpoint(
+    service: str,
+    vpc_id: pulumi.Output,
+    private_subnet_ids: list[pulumi.Output],
+    security_group_id: pulumi.Output,
+    policy: pulumi.Input[str] = None,
+    opts: pulumi.ResourceOptions = None,
+):
+
+    region = invoke_cache.region()
+
+    return aws.ec2.VpcEndpoint(
+        f"{service}-endpoint-{environment}",
+        vpc_id=vpc_id,
+        service_name=f"com.amazonaws.{region}.{service}",
+        vpc_endpoint_type="Interface",
+        private_dns_enabled=True,
+        subnet_ids=private_subnet_ids,
+        security_group_ids=[security_group_id],
+        policy=policy,
+        tags={
+            "Name": f"{service}-endpoint-{environment}",
+            "Environment": environment,
+        },
+        opts=opts,
+    )
+
+
+def create_vpc_endpoints(
+    vpc_id: pulumi.Output,
+    private_subnet_ids: list[pulumi.Output],
+    private_route_table_ids: list[pulumi.Output],
+    security_group_id: pulumi.Output,
+    data_bucket_arn: pulumi.Output,
+    secret_arns: list[pulumi.Output],
+    opts: pulumi.ResourceOptions = None,
+):
+
+    endpoints = {
+        "s3": create_s3_gateway_endpoint(vpc_id, private_route_table_ids, data_bucket_arn, opts=opts),
+    }
+
+    if not interface_endpoints_enabled:
+        return endpoints
+
+    region = invoke_cache.region()
+    account_id = invoke_cache.account_id()
+
+    secrets_policy = pulumi.Output.all(*secret_arns).apply(
+        lambda arns: endpoint_policy(
+            [
+                {
+                    "Effect": "Allow",
+                    "Principal": "*",
+                    "Action": [
+                        "secretsmanager:GetSecretValue",
+                        "secretsmanager:DescribeSecret",
+                        "secretsmanager:PutSecretValue",
+                        "secretsmanager:UpdateSecretVersionStage",
+                    ],
+                    "Resource": sorted(set(arns)),
+                },
+                {
+                    # Utilisé par la fonction de rotation, sans ressource associée
+                    "Effect": "Allow",
+                    "Principal": "*",
+                    "Action": "secretsmanager:GetRandomPassword",
+                    "Resource": "*",
+                },
+            ]
+        )
+    )
+
+    logs_policy = endpoint_policy(
+        [
+            {
+                "Effect": "Allow",
+                "Principal": "*",
+                "Action": [
+                    "logs:CreateLogStream",
+                    "logs:PutLogEvents",
+                    "logs:DescribeLogStreams",
+                ],
+                "Resource": f"arn:aws:logs:{region}:{account_id}:log-group:*-{environment}*",
+            }
+        ]
+    )
+
+    endpoints["secretsmanager"] = create_interface_endpoint(
+        "secretsmanager", vpc_id, private_subnet_ids, security_group_id, secrets_policy, opts=opts
+    )
+    endpoints["logs"] = create_interface_endpoint(
+        "logs", vpc_id, private_subnet_ids, security_group_id, logs_policy, opts=opts
+    )
+
+    for service in config.get_object("vpc_endpoint_extra_services") or []:
+        if service not in OPTIONAL_SERVICES:
+            raise ValueError(f"Unsupported VPC endpoint service: {service}")
+
+        policy = None
+        if service == "sqs":
+            policy = endpoint_policy(
+                [
+                    {
+                        "Effect": "Allow",
+                        "Principal": "*",
+                        "Action": "sqs:*",
+                        "Resource": f"arn:aws:sqs:{region}:{account_id}:*-{environment}*",
+                    }
+                ]
+            )
+        endpoints[service] = create_interface_endpoint(
+            service, vpc_id, private_subnet_ids, security_group_id, policy, opts=opts
+        )
+
+    return endpoints
@@ -8,10 +8,11 @@ config = pulumi.Config()
 environment = config.get("environment") or "dev"
 
 
-def create_waf_acl():
+def create_waf_acl(opts: pulumi.ResourceOptions = None):
     waf_provider = aws.Provider(
         "waf-provider",
         region="us-east-1",
+        opts=opts,
     )
 
     waf_acl = aws.wafv2.WebAcl(
@@ -105,7 +106,7 @@ def create_waf_acl():
             "Name": f"cloudfront-waf-{environment}",
             "Environment": environment,
         },
-        opts=pulumi.ResourceOptions(provider=waf_provider),
+        opts=pulumi.ResourceOptions.merge(opts, pulumi.ResourceOptions(provider=waf_provider)),
     )
 
     return waf_acl
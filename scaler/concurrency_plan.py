@@ -0,0 +1,213 @@
+"""
+Plan de concurrence Lambda par fenêtre horaire.
+
+- prévision pure : percentile des `ConcurrentExecutions` des N dernières semaines par
+  fenêtre de la journée (ou de la semaine), plus une marge -> provisioned, plafonné par
+  le budget de connexions
+- reserved reste au plafond : c'est une limite dure, une fenêtre calme qui la baisserait
+  ferait rejeter (429) tout pic imprévu jusqu'au passage suivant du scaler. Avec
+  `min_reserved`, reserved suit le maximum observé plus la marge sans descendre sous ce plancher
+- la cible d'un instant prend aussi la fenêtre suivante (`lead_minutes`) : la
+  capacité est en place avant le pic
+- lecture des métriques (GetMetricData) et application (reserved / provisioned),
+  partagées par `scripts/control.py lambda scale` et la Lambda planifiée
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+MINUTES_PER_DAY = 24 * 60
+METRIC_PERIOD = 300
+# Les points à 5 minutes sont conservés 63 jours par CloudWatch
+MAX_WEEKS = 9
+WEEKDAYS = ("lun", "mar", "mer", "jeu", "ven", "sam", "dim")
+
+
+@dataclass(frozen=True)
+class Target:
+    provisioned: int
+    reserved: int = None
+
+
+@dataclass(frozen=True)
+class PlanOptions:
+    window_minutes: int = 60
+    percentile: float = 95.0
+    headroom: float = 0.2
+    min_provisioned: int = 0
+    min_reserved: int = None
+    max_concurrency: int = None
+    weekly: bool = False
+    lead_minutes: int = 15
+
+    def __post_init__(self):
+        if MINUTES_PER_DAY % self.window_minutes:
+            raise ValueError(f"window_minutes must divide a day: {self.window_minutes}")
+        if not 0 < self.percentile <= 100:
+            raise ValueError(f"percentile must be in (0, 100]: {self.percentile}")
+        if self.headroom < 0:
+            raise ValueError("headroom must not be negative")
+        if self.min_reserved is not None and self.min_reserved < 1:
+            raise ValueError("min_reserved must be at least 1")
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentile par interpolation linéaire (même définition que numpy par défaut)."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def window_count(options: PlanOptions) -> int:
+    return (7 if options.weekly else 1) * MINUTES_PER_DAY // options.window_minutes
+
+
+def window_index(when: datetime, options: PlanOptions) -> int:
+    when = when.astimezone(timezone.utc)
+    minutes = when.hour * 60 + when.minute
+    if options.weekly:
+        minutes += when.weekday() * MINUTES_PER_DAY
+    return minutes // options.window_minutes
+
+
+def window_label(index: int, options: PlanOptions) -> str:
+    minutes = index * options.window_minutes
+    day, minutes = divmod(minutes, MINUTES_PER_DAY)
+    label = f"{minutes // 60:02d}:{minutes % 60:02d}"
+    return f"{WEEKDAYS[day]} {label}" if options.weekly else label
+
+
+def clamp(value: int, low: int, high: int = None) -> int:
+    value = max(value, low)
+    return min(value, high) if high is not None else value
+
+
+def build_plan(samples: list[tuple[datetime, float]], options: PlanOptions = PlanOptions()) -> list[Target]:
+    """Une cible par fenêtre (UTC) ; une fenêtre sans point est une fenêtre inactive."""
+    buckets = [[] for _ in range(window_count(options))]
+    for when, value in samples:
+        buckets[window_index(when, options)].append(value)
+
+    ceiling = options.max_concurrency
+    if not samples:
+        # Aucun historique : seul le plafond s'applique
+        return [Target(provisioned=clamp(options.min_provisioned, 0, ceiling), reserved=ceiling)] * len(buckets)
+
+    scale = 1 + options.headroom
+    plan = []
+    for values in buckets:
+        # CloudWatch n'émet aucun point quand la fonction est inactive
+        values = values or [0.0]
+        provisioned = clamp(math.ceil(percentile(values, options.percentile) * scale), options.min_provisioned, ceiling)
+        if options.min_reserved is None:
+            reserved = ceiling
+        else:
+            reserved = clamp(math.ceil(max(values) * scale), max(provisioned, options.min_reserved), ceiling)
+        plan.append(Target(provisioned=provisioned, reserved=reserved))
+    return plan
+
+
+def target_at(plan: list[Target], when: datetime, options: PlanOptions = PlanOptions()) -> Target:
+    """Cible de l'instant `when` : maximum de sa fenêtre et de celle atteinte dans `lead_minutes`."""
+    current = plan[window_index(when, options)]
+    upcoming = plan[window_index(when + timedelta(minutes=options.lead_minutes), options)]
+    reserved = (
+        None
+        if current.reserved is None or upcoming.reserved is None
+        else max(current.reserved, upcoming.reserved)
+    )
+    return Target(provisioned=max(current.provisioned, upcoming.provisioned), reserved=reserved)
+
+
+def render_plan(plan: list[Target], options: PlanOptions = PlanOptions()) -> str:
+    lines = [f"{'fenêtre':<10} {'provisioned':>11} {'reserved':>9}"]
+    for index, target in enumerate(plan):
+        reserved = "-" if target.reserved is None else str(target.reserved)
+        lines.append(f"{window_label(index, options):<10} {target.provisioned:>11} {reserved:>9}")
+    return "\n".join(lines)
+
+
+def fetch_concurrency(cloudwatch, function_name: str, weeks: int, now: datetime = None) -> list[tuple[datetime, float]]:
+    """Maximum de `ConcurrentExecutions` par tranche de 5 minutes sur les `weeks` dernières semaines."""
+    if not 1 <= weeks <= MAX_WEEKS:
+        raise ValueError(f"weeks must be between 1 and {MAX_WEEKS}")
+    now = now or datetime.now(timezone.utc)
+    query = {
+        "Id": "concurrency",
+        "MetricStat": {
+            "Metric": {
+                "Namespace": "AWS/Lambda",
+                "MetricName": "ConcurrentExecutions",
+                "Dimensions": [{"Name": "FunctionName", "Value": function_name}],
+            },
+            "Period": METRIC_PERIOD,
+            "Stat": "Maximum",
+        },
+    }
+
+    samples = []
+    paginator = cloudwatch.get_paginator("get_metric_data")
+    for page in paginator.paginate(
+        MetricDataQueries=[query],
+        StartTime=now - timedelta(weeks=weeks),
+        EndTime=now,
+        ScanBy="TimestampAscending",
+    ):
+        for result in page["MetricDataResults"]:
+            samples.extend(zip(result["Timestamps"], result["Values"]))
+    return samples
+
+
+def current_target(client, function_name: str, alias: str = None) -> Target:
+    reserved = client.get_function_concurrency(FunctionName=function_name).get("ReservedConcurrentExecutions")
+    provisioned = 0
+    if alias:
+        try:
+            config = client.get_provisioned_concurrency_config(FunctionName=function_name, Qualifier=alias)
+            provisioned = config["RequestedProvisionedConcurrentExecutions"]
+        except client.exceptions.ProvisionedConcurrencyConfigNotFoundException:
+            pass
+    return Target(provisioned=provisioned, reserved=reserved)
+
+
+def apply_target(client, function_name: str, target: Target, alias: str = None) -> dict:
+    """
+    Applique reserved et provisioned (sur l'alias) si la cible diffère de l'état courant.
+
+    La concurrence réservée doit toujours couvrir la concurrence provisionnée : en baisse,
+    provisioned est réduite d'abord ; en hausse, reserved est relevée d'abord.
+    """
+    current = current_target(client, function_name, alias)
+    changes = {}
+
+    def set_reserved() -> None:
+        if target.reserved == current.reserved:
+            return
+        if target.reserved is None:
+            client.delete_function_concurrency(FunctionName=function_name)
+        else:
+            client.put_function_concurrency(FunctionName=function_name, ReservedConcurrentExecutions=target.reserved)
+        changes["reserved"] = [current.reserved, target.reserved]
+
+    def set_provisioned() -> None:
+        if not alias or target.provisioned == current.provisioned:
+            return
+        if target.provisioned:
+            client.put_provisioned_concurrency_config(
+                FunctionName=function_name,
+                Qualifier=alias,
+                ProvisionedConcurrentExecutions=target.provisioned,
+            )
+        else:
+            client.delete_provisioned_concurrency_config(FunctionName=function_name, Qualifier=alias)
+        changes["provisioned"] = [current.provisioned, target.provisioned]
+
+    if target.provisioned < current.provisioned:
+        set_provisioned()
+        set_reserved()
+    else:
+        set_reserved()
+        set_provisioned()
+    return changes
+
@@ -0,0 +1,46 @@
+import json
+import os
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+import boto3
+
+from concurrency_plan import PlanOptions, apply_target, build_plan, fetch_concurrency, target_at
+
+_clients = {}
+
+
+def client(service: str):
+    if service not in _clients:
+        _clients[service] = boto3.client(service)
+    return _clients[service]
+
+
+def plan_options() -> PlanOptions:
+    max_concurrency = os.environ.get("MAX_CONCURRENCY")
+    min_reserved = os.environ.get("MIN_RESERVED")
+    return PlanOptions(
+        window_minutes=int(os.environ.get("WINDOW_MINUTES", "60")),
+        percentile=float(os.environ.get("PERCENTILE", "95")),
+        headroom=float(os.environ.get("HEADROOM", "0.2")),
+        min_provisioned=int(os.environ.get("MIN_PROVISIONED", "0")),
+        min_reserved=int(min_reserved) if min_reserved else None,
+        max_concurrency=int(max_concurrency) if max_concurrency else None,
+        weekly=os.environ.get("WEEKLY") == "true",
+        lead_minutes=int(os.environ.get("LEAD_MINUTES", "15")),
+    )
+
+
+def handler(event, context):
+    function_name = os.environ["FUNCTION_NAME"]
+    alias = os.environ.get("FUNCTION_ALIAS") or None
+    options = plan_options()
+    now = datetime.now(timezone.utc)
+
+    samples = fetch_concurrency(client("cloudwatch"), function_name, int(os.environ.get("WEEKS", "4")), now)
+    target = target_at(build_plan(samples, options), now, options)
+    changes = apply_target(client("lambda"), function_name, target, alias)
+
+    result = {"function": function_name, "samples": len(samples), "target": asdict(target), "changes": changes}
+    print(json.dumps(result))
+    return result
@@ -0,0 +1,223 @@
+"""
+Latences par route à partir des access logs API Gateway exportés.
+
+Usage:
+    python scripts/access_log_analyzer.py <fichier|répertoire>... [--workers 4] [--json]
+
+Accepte des fichiers JSON lines, compressés (.gz) ou non, et les objets Parquet de
+l'archive S3 (voir logs_query.py, pyarrow requis). Chaque fichier est agrégé dans un sketch de quantiles
+fusionnable, les résultats des workers sont ensuite fusionnés : p50/p95/p99 de la
+latence totale, de la latence d'intégration et du surcoût de la passerelle.
+"""
+import argparse
+import gzip
+import json
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from logs_query import PARQUET_MAGIC, iter_parquet
+
+METRICS = ("total", "integration", "overhead")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class QuantileSketch:
+    """Sketch à buckets logarithmiques (type DDSketch), erreur relative bornée par `alpha`."""
+
+    def __init__(self, alpha: float = 0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        if value < 0:
+            raise ValueError("Les latences négatives ne sont pas supportées")
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value == 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.alpha != self.alpha:
+            raise ValueError("Impossible de fusionner des sketches de précisions différentes")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float):
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+def parse_latency(value):
+    if value in (None, "", "-"):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def new_route_stats(alpha: float) -> dict:
+    return {metric: QuantileSketch(alpha) for metric in METRICS}
+
+
+def add_record(stats: dict, record: dict, alpha: float) -> None:
+    total = parse_latency(record.get("responseLatency"))
+    if total is None:
+        return
+    route = record.get("routeKey") or "-"
+    route_stats = stats.setdefault(route, new_route_stats(alpha))
+    route_stats["total"].add(total)
+    integration = parse_latency(record.get("integrationLatency"))
+    if integration is not None:
+        route_stats["integration"].add(integration)
+        route_stats["overhead"].add(max(total - integration, 0.0))
+
+
+def merge_stats(target: dict, other: dict) -> dict:
+    for route, route_stats in other.items():
+        if route not in target:
+            target[route] = route_stats
+            continue
+        for metric in METRICS:
+            target[route][metric].merge(route_stats[metric])
+    return target
+
+
+def is_parquet(path: Path) -> bool:
+    if path.suffix == ".parquet":
+        return True
+    # Objets Parquet archivés sans extension
+    with open(path, "rb") as handle:
+        return handle.read(len(PARQUET_MAGIC)) == PARQUET_MAGIC
+
+
+def iter_records(path: Path):
+    if is_parquet(path):
+        yield from iter_parquet(str(path))
+        return
+
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            # Export CloudWatch brut : le message JSON est encapsulé
+            if isinstance(record.get("message"), str) and "routeKey" not in record:
+                try:
+                    record = json.loads(record["message"])
+                except json.JSONDecodeError:
+                    continue
+            yield record
+
+
+def analyze_file(path: str, alpha: float = 0.01) -> dict:
+    stats = {}
+    for record in iter_records(Path(path)):
+        add_record(stats, record, alpha)
+    return stats
+
+
+def expand_paths(paths: list[str]) -> list[str]:
+    files = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(str(p) for p in sorted(path.rglob("*")) if p.is_file())
+        else:
+            files.append(str(path))
+    return files
+
+
+def analyze(paths: list[str], workers: int = 1, alpha: float = 0.01) -> dict:
+    files = expand_paths(paths)
+    stats = {}
+    if workers <= 1 or len(files) <= 1:
+        for path in files:
+            merge_stats(stats, analyze_file(path, alpha))
+        return stats
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(analyze_file, files, [alpha] * len(files)):
+            merge_stats(stats, partial)
+    return stats
+
+
+def summarize(stats: dict) -> list[dict]:
+    rows = []
+    for route in sorted(stats, key=lambda r: -stats[r]["total"].count):
+        row = {"route": route, "count": stats[route]["total"].count}
+        for metric in METRICS:
+            for q in QUANTILES:
+                row[f"{metric}_p{int(q * 100)}"] = stats[route][metric].quantile(q)
+        rows.append(row)
+    return rows
+
+
+def format_ms(value) -> str:
+    return "-" if value is None else f"{value:.0f}"
+
+
+def print_table(rows: list[dict]) -> None:
+    header = f"{'route':<40} {'count':>8}"
+    for metric in METRICS:
+        header += "".join(f" {metric[:5] + '_p' + str(int(q * 100)):>10}" for q in QUANTILES)
+    print(header)
+    for row in rows:
+        line = f"{row['route'][:40]:<40} {row['count']:>8}"
+        for metric in METRICS:
+            line += "".join(f" {format_ms(row[f'{metric}_p{int(q * 100)}']):>10}" for q in QUANTILES)
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latences API Gateway par route")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--alpha", type=float, default=0.01, help="erreur relative du sketch")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    rows = summarize(analyze(args.paths, args.workers, args.alpha))
+    if not rows:
+        print("Aucune requête avec latence trouvée.")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+
+
+if __name__ == "__main__":
+    main()
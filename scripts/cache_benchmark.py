@@ -0,0 +1,121 @@
+"""
+Benchmark du cache read-through (handler/cache.py) contre un Redis/Valkey local.
+
+Usage:
+    docker run -d -p 6379:6379 valkey/valkey:8
+    python scripts/cache_benchmark.py [--url redis://localhost:6379/0] [--requests 20000]
+        [--keys 1000] [--zipf 1.1] [--threads 8] [--loader-ms 20] [--write-ratio 0.01]
+
+Les clés suivent une loi de Zipf (quelques clés chaudes, une longue traîne), le
+chargeur simule la latence de RDS. Le rapport donne le ratio de hit, le nombre de
+chargements évités par coalescence et les percentiles de latence.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root / "handler"))
+
+from cache import ReadThroughCache  # noqa: E402
+
+
+def zipf_weights(count: int, exponent: float) -> list[float]:
+    return [1 / (rank**exponent) for rank in range(1, count + 1)]
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run(client, args) -> dict:
+    cache = ReadThroughCache(client, namespace=f"bench-{uuid.uuid4().hex[:8]}", default_ttl=args.ttl)
+    weights = zipf_weights(args.keys, args.zipf)
+    rng = random.Random(args.seed)
+    keys = rng.choices(range(args.keys), weights=weights, k=args.requests)
+    writes = {index for index in range(args.requests) if rng.random() < args.write_ratio}
+    # 1 % des clés n'existent pas en base : elles alimentent le cache négatif
+    missing = set(range(args.keys - max(args.keys // 100, 1), args.keys))
+
+    latencies = []
+    latencies_lock = threading.Lock()
+
+    def loader_for(key: int):
+        def loader():
+            time.sleep(args.loader_ms / 1000)
+            return None if key in missing else {"id": key, "payload": "x" * 64}
+
+        return loader
+
+    def request(index: int) -> None:
+        key = keys[index]
+        started = time.perf_counter()
+        if index in writes:
+            cache.invalidate("items")
+        else:
+            cache.get("items", str(key), loader_for(key))
+        elapsed = (time.perf_counter() - started) * 1000
+        with latencies_lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(request, range(args.requests)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "duration_s": duration,
+        "throughput": args.requests / duration,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        **cache.stats.as_dict(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du cache read-through")
+    parser.add_argument("--url", default="redis://localhost:6379/0")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--keys", type=int, default=1000)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--loader-ms", type=float, default=20.0)
+    parser.add_argument("--write-ratio", type=float, default=0.01)
+    parser.add_argument("--ttl", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        import redis
+    except ImportError:
+        print("Le paquet redis est requis : pip install redis")
+        sys.exit(1)
+
+    client = redis.Redis.from_url(args.url)
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError as e:
+        print(f"Redis injoignable sur {args.url}: {e}")
+        sys.exit(1)
+
+    result = run(client, args)
+
+    print(f"Requêtes      : {args.requests} ({args.threads} threads, {args.keys} clés, zipf {args.zipf})")
+    print(f"Débit         : {result['throughput']:.0f} req/s en {result['duration_s']:.2f} s")
+    print(f"Hit ratio     : {result['hit_ratio'] * 100:.1f} % ({result['hits']} hits, {result['misses']} misses)")
+    print(f"Chargements   : {result['loads']} (coalescés : {result['coalesced']}, erreurs : {result['errors']})")
+    print(f"Latence (ms)  : p50 {result['p50_ms']:.2f}  p95 {result['p95_ms']:.2f}  p99 {result['p99_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,48 @@
+"""
+Activation / désactivation de Lambdas et de distributions CloudFront, en masse.
+
+Usage:
+    python scripts/control.py lambda disable <nom> [<nom> ...] [--tag Environment=prod] [--workers 8]
+    python scripts/control.py lambda scale <nom> [--weeks 4] [--percentile 95] [--headroom 0.2]
+        [--window 60] [--lead 15] [--max 320] [--min-reserved N] [--alias live] [--weekly] [--dry-run]
+    python scripts/control.py lambda warm <nom> --count 50 [--hold-ms 500] [--qualifier live]
+    python scripts/control.py cloudfront disable <id> [<id> ...] [--tag Environment=prod] [--wait]
+    python scripts/control.py cloudfront warm <id> --paths /index.html /assets/app.js
+
+Les cibles sont des noms de fonctions / IDs de distributions et/ou un sélecteur de
+tags (`--tag clé=valeur`, répétable, toutes les paires doivent correspondre). Les
+actions tournent sur un pool de `--workers` threads qui partagent un client par
+service. Une mise à jour CloudFront refait get-config/update si l'ETag a changé
+entre-temps (PreconditionFailed). `--wait` attend ensuite que chaque distribution
+modifiée soit `Deployed` (jusqu'à `--wait-timeout` secondes).
+
+`lambda scale` calcule un plan par fenêtre horaire (UTC) à partir des `--weeks`
+dernières semaines de `ConcurrentExecutions` : percentile + marge en concurrence
+provisionnée (sur `--alias`), plafonnée par `--max`. La concurrence réservée reste à
+`--max` : baissée dans une fenêtre calme, elle rejetterait (429) un pic imprévu ; avec
+`--min-reserved`, elle suit le maximum observé + marge sans passer sous ce plancher. La cible de l'instant, qui anticipe la fenêtre suivante de
+`--lead` minutes, est appliquée ; la Lambda `concurrency-scaler-<env>` fait de même
+à intervalle régulier quand `concurrency_scaler` est activé.
+
+`lambda warm` envoie `--count` invocations synthétiques simultanées (clé `warmup`) :
+le handler ouvre ses connexions (base, cache, S3) puis garde le conteneur occupé
+`--hold-ms`, ce qui force les invocations suivantes sur d'autres conteneurs. Le
+rapport donne le nombre de conteneurs distincts atteints. `cloudfront warm` demande
+chaque chemin de `--paths` au domaine de la distribution (cache du POP le plus proche).
+"""
+import argparse
+import functools
+import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
 
 _root = Path(__file__).resolve().parent.parent
 _dotenv = _root / ".env"
@@ -11,69 +53,372 @@ if _dotenv.exists():
     except ImportError:
         pass
 
-import boto3
-from botocore.exceptions import ClientError
+import boto3  # noqa: E402
+from botocore.config import Config  # noqa: E402
+from botocore.exceptions import BotoCoreError, ClientError, WaiterError  # noqa: E402
+
+sys.path.insert(0, str(_root / "scaler"))
+
+from concurrency_plan import (  # noqa: E402
+    MAX_WEEKS,
+    PlanOptions,
+    apply_target,
+    build_plan,
+    fetch_concurrency,
+    render_plan,
+    target_at,
+)
 
 
 REGION = os.getenv("AWS_REGION") or "eu-west-3"
+# Clé de l'événement synthétique de `lambda warm`, reconnue par handler/lambda_function.py
+WARMUP_KEY = "warmup"
+# CloudFront est global : son API et ses tags sont servis depuis us-east-1
+CLOUDFRONT_REGION = "us-east-1"
+PRECONDITION_ATTEMPTS = 5
+
+TAG_RESOURCE_TYPES = {"lambda": "lambda:function", "cloudfront": "cloudfront:distribution"}
+
 
-def lambda_disable(name: str) -> None:
-    client = boto3.client("lambda", region_name=REGION)
+@dataclass
+class ActionResult:
+    target: str
+    changed: bool = False
+    message: str = ""
+    error: str = ""
+
+
+class Clients:
+    """Un client boto3 par (service, région), partagé entre les threads (les clients sont thread-safe)."""
+
+    def __init__(self, workers: int = 8):
+        self.config = Config(max_pool_connections=max(workers, 10), retries={"mode": "adaptive", "max_attempts": 10})
+        self.lock = threading.Lock()
+        self.clients = {}
+
+    def get(self, service: str, region: str = REGION):
+        with self.lock:
+            if (service, region) not in self.clients:
+                self.clients[(service, region)] = boto3.client(service, region_name=region, config=self.config)
+            return self.clients[(service, region)]
+
+
+def lambda_disable(client, name: str) -> ActionResult:
     client.put_function_concurrency(FunctionName=name, ReservedConcurrentExecutions=0)
-    print(f"Lambda '{name}' désactivée (concurrency = 0)")
+    return ActionResult(name, changed=True, message=f"Lambda '{name}' désactivée (concurrency = 0)")
 
 
-def lambda_enable(name: str) -> None:
-    client = boto3.client("lambda", region_name=REGION)
+def lambda_enable(client, name: str) -> ActionResult:
     client.delete_function_concurrency(FunctionName=name)
-    print(f"Lambda '{name}' activée")
-
-def cloudfront_disable(distribution_id: str) -> None:
-    client = boto3.client("cloudfront")
-    resp = client.get_distribution_config(Id=distribution_id)
-    config = resp["DistributionConfig"]
-    etag = resp["ETag"]
-    if not config["Enabled"]:
-        print(f"CloudFront '{distribution_id}' est déjà désactivée")
-        return
-    config["Enabled"] = False
-    client.update_distribution(Id=distribution_id, DistributionConfig=config, IfMatch=etag)
-    print(f"CloudFront '{distribution_id}' désactivée")
-
-
-def cloudfront_enable(distribution_id: str) -> None:
-    client = boto3.client("cloudfront")
-    resp = client.get_distribution_config(Id=distribution_id)
-    config = resp["DistributionConfig"]
-    etag = resp["ETag"]
-    if config["Enabled"]:
-        print(f"CloudFront '{distribution_id}' est déjà activée")
-        return
-    config["Enabled"] = True
-    client.update_distribution(Id=distribution_id, DistributionConfig=config, IfMatch=etag)
-    print(f"CloudFront '{distribution_id}' activée")
+    return ActionResult(name, changed=True, message=f"Lambda '{name}' activée")
+
+
+def lambda_scale(
+    client,
+    name: str,
+    cloudwatch,
+    options: PlanOptions,
+    weeks: int = 4,
+    alias: str = None,
+    dry_run: bool = False,
+    now: datetime = None,
+) -> ActionResult:
+    now = now or datetime.now(timezone.utc)
+    samples = fetch_concurrency(cloudwatch, name, weeks, now)
+    plan = build_plan(samples, options)
+    target = target_at(plan, now, options)
+
+    reserved = "-" if target.reserved is None else target.reserved
+    lines = [
+        f"Lambda '{name}' : {len(samples)} points sur {weeks} semaine(s)",
+        render_plan(plan, options),
+        f"Cible : provisioned {target.provisioned}, reserved {reserved}",
+    ]
+    if dry_run:
+        return ActionResult(name, message="\n".join(lines + ["(dry-run, rien n'est appliqué)"]))
+
+    changes = apply_target(client, name, target, alias)
+    applied = ", ".join(f"{key} {old} -> {new}" for key, (old, new) in changes.items()) or "déjà en place"
+    return ActionResult(name, changed=bool(changes), message="\n".join(lines + [f"Appliqué : {applied}"]))
+
+
+def lambda_warm(client, name: str, count: int, hold_ms: int = 500, qualifier: str = None) -> ActionResult:
+    payload = json.dumps({WARMUP_KEY: {"hold_ms": hold_ms}}).encode()
+    qualified = {"Qualifier": qualifier} if qualifier else {}
+
+    def invoke(_) -> dict:
+        resp = client.invoke(FunctionName=name, InvocationType="RequestResponse", Payload=payload, **qualified)
+        body = json.loads(resp["Payload"].read() or b"null")
+        if resp.get("FunctionError") or not isinstance(body, dict) or "container" not in body:
+            raise RuntimeError(str(body)[:200])
+        return body
+
+    replies, failures = [], []
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        for future in [pool.submit(invoke, index) for index in range(count)]:
+            try:
+                replies.append(future.result())
+            except (ClientError, BotoCoreError, RuntimeError) as e:
+                # Une invocation en timeout ou injoignable compte comme un échec, sans interrompre les autres
+                failures.append(e.response["Error"]["Code"] if isinstance(e, ClientError) else str(e))
+
+    containers = {reply["container"] for reply in replies}
+    cold = sum(1 for reply in replies if reply["cold"])
+    init_errors = sorted({f"{component}: {error}" for reply in replies for component, error in reply["errors"].items()})
+
+    lines = [
+        f"Lambda '{name}{':' + qualifier if qualifier else ''}' : {len(containers)}/{count} conteneurs distincts chauds, "
+        f"{cold} démarrés à froid, {len(failures)} échec(s)"
+    ]
+    lines += [f"  échec : {failure}" for failure in sorted(set(failures))]
+    lines += [f"  initialisation : {error}" for error in init_errors]
+    return ActionResult(name, changed=bool(containers), message="\n".join(lines), error="" if replies else "aucune invocation réussie")
+
+
+def edge_warm(domain: str, paths: list[str], timeout: float = 10.0) -> list[dict]:
+    """GET de chaque chemin via CloudFront ; la seconde requête doit être un hit du POP."""
+
+    def fetch(path: str) -> dict:
+        url = f"https://{domain}/{path.lstrip('/')}"
+        result = {"path": path}
+        for attempt in ("first", "second"):
+            try:
+                with urlopen(Request(url, headers={"User-Agent": "cloud-module-warm"}), timeout=timeout) as resp:
+                    resp.read()
+                    result[attempt] = (resp.status, resp.headers.get("X-Cache", "-"))
+            except HTTPError as e:
+                result[attempt] = (e.code, e.headers.get("X-Cache", "-"))
+            except URLError as e:
+                result[attempt] = (None, str(e.reason))
+        return result
+
+    with ThreadPoolExecutor(max_workers=min(len(paths), 16) or 1) as pool:
+        return list(pool.map(fetch, paths))
+
+
+def cloudfront_warm(client, distribution_id: str, paths: list[str]) -> ActionResult:
+    domain = client.get_distribution(Id=distribution_id)["Distribution"]["DomainName"]
+    results = edge_warm(domain, paths)
+    hits = sum(1 for result in results if "hit" in str(result["second"][1]).lower())
+    lines = [f"CloudFront '{distribution_id}' ({domain}) : {hits}/{len(paths)} chemin(s) en cache"]
+    lines += [f"  {result['second'][0]} {result['second'][1]:<28} {result['path']}" for result in results]
+    return ActionResult(distribution_id, changed=bool(hits), message="\n".join(lines))
+
+
+def cloudfront_set_enabled(client, distribution_id: str, enabled: bool) -> ActionResult:
+    state = "activée" if enabled else "désactivée"
+    for attempt in range(1, PRECONDITION_ATTEMPTS + 1):
+        resp = client.get_distribution_config(Id=distribution_id)
+        config = resp["DistributionConfig"]
+        etag = resp["ETag"]
+        if config["Enabled"] == enabled:
+            return ActionResult(distribution_id, message=f"CloudFront '{distribution_id}' est déjà {state}")
+        config["Enabled"] = enabled
+        try:
+            client.update_distribution(Id=distribution_id, DistributionConfig=config, IfMatch=etag)
+        except ClientError as e:
+            # Configuration modifiée entre le get et l'update : relire avec le nouvel ETag
+            if e.response["Error"]["Code"] != "PreconditionFailed" or attempt == PRECONDITION_ATTEMPTS:
+                raise
+            time.sleep(0.2 * attempt)
+            continue
+        return ActionResult(distribution_id, changed=True, message=f"CloudFront '{distribution_id}' {state}")
+
+
+def cloudfront_disable(client, distribution_id: str) -> ActionResult:
+    return cloudfront_set_enabled(client, distribution_id, False)
+
+
+def cloudfront_enable(client, distribution_id: str) -> ActionResult:
+    return cloudfront_set_enabled(client, distribution_id, True)
+
+
+ACTIONS = {
+    ("lambda", "disable"): lambda_disable,
+    ("lambda", "enable"): lambda_enable,
+    ("cloudfront", "disable"): cloudfront_disable,
+    ("cloudfront", "enable"): cloudfront_enable,
+}
+
+
+def parse_tags(values: list[str]) -> dict:
+    tags = {}
+    for value in values:
+        key, _, tag_value = value.partition("=")
+        if not key or not tag_value:
+            raise argparse.ArgumentTypeError(f"--tag attend clé=valeur : {value}")
+        tags.setdefault(key, []).append(tag_value)
+    return tags
+
+
+def resolve_targets(tagging_client, resource: str, names: list[str], tags: dict) -> list[str]:
+    targets = list(names)
+    if tags:
+        paginator = tagging_client.get_paginator("get_resources")
+        pages = paginator.paginate(
+            ResourceTypeFilters=[TAG_RESOURCE_TYPES[resource]],
+            TagFilters=[{"Key": key, "Values": values} for key, values in tags.items()],
+        )
+        for page in pages:
+            for mapping in page["ResourceTagMappingList"]:
+                arn = mapping["ResourceARN"]
+                # arn:aws:lambda:<région>:<compte>:function:<nom> / arn:aws:cloudfront::<compte>:distribution/<id>
+                targets.append(arn.rsplit(":", 1)[-1] if resource == "lambda" else arn.rsplit("/", 1)[-1])
+    return list(dict.fromkeys(targets))
+
+
+def describe_error(error: Exception) -> str:
+    if isinstance(error, ClientError):
+        return f"{error.response['Error']['Code']} - {error.response['Error']['Message']}"
+    return f"{type(error).__name__} - {error}"
+
+
+def run_actions(action, client, targets: list[str], workers: int) -> list[ActionResult]:
+    def run(target: str) -> ActionResult:
+        try:
+            return action(client, target)
+        except (ClientError, BotoCoreError) as e:
+            return ActionResult(target, error=describe_error(e))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, target) for target in targets]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"Erreur AWS ({result.target}): {result.error}" if result.error else result.message, flush=True)
+        return [future.result() for future in futures]
+
+
+def wait_deployed(client, distribution_ids: list[str], timeout: float, delay: int = 15) -> dict:
+    """Un waiter `distribution_deployed` par distribution ; affiche la progression à chaque fin."""
+    waiter_config = {"Delay": delay, "MaxAttempts": max(int(timeout // delay), 1)}
+    started = time.monotonic()
+
+    def wait(distribution_id: str) -> bool:
+        try:
+            client.get_waiter("distribution_deployed").wait(Id=distribution_id, WaiterConfig=waiter_config)
+            return True
+        except WaiterError:
+            return False
+
+    statuses = {}
+    with ThreadPoolExecutor(max_workers=max(len(distribution_ids), 1)) as pool:
+        futures = {pool.submit(wait, distribution_id): distribution_id for distribution_id in distribution_ids}
+        for future in as_completed(futures):
+            distribution_id = futures[future]
+            statuses[distribution_id] = "Deployed" if future.result() else "InProgress"
+            print(
+                f"[{len(statuses)}/{len(futures)}] {distribution_id} {statuses[distribution_id]}"
+                f" ({time.monotonic() - started:.0f}s)",
+                flush=True,
+            )
+    return statuses
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"doit être au moins 1 : {value}")
+    return number
+
 
 def main() -> None:
-    if len(sys.argv) != 4:
-        print(__doc__.strip())
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Activation / désactivation de Lambdas et de distributions CloudFront")
+    parser.add_argument("resource", choices=["lambda", "cloudfront"], type=str.lower)
+    parser.add_argument("action", choices=["enable", "disable", "scale", "warm"], type=str.lower)
+    parser.add_argument("targets", nargs="*", help="noms de fonctions ou IDs de distributions")
+    parser.add_argument("--tag", action="append", default=[], help="sélection par tag clé=valeur")
+    parser.add_argument("--workers", type=positive_int, default=8)
+    parser.add_argument("--wait", action="store_true", help="attendre le statut Deployed (CloudFront)")
+    parser.add_argument("--wait-timeout", type=float, default=1800, help="secondes")
+    parser.add_argument("--weeks", type=int, default=4, help="historique (scale)")
+    parser.add_argument("--percentile", type=float, default=95, help="percentile provisionné (scale)")
+    parser.add_argument("--headroom", type=float, default=0.2, help="marge, 0.2 = +20 %% (scale)")
+    parser.add_argument("--window", type=int, default=60, help="fenêtre en minutes (scale)")
+    parser.add_argument("--lead", type=int, default=15, help="anticipation en minutes (scale)")
+    parser.add_argument("--min-provisioned", type=int, default=0)
+    parser.add_argument(
+        "--min-reserved", type=int, help="prévoir aussi la concurrence réservée, sans descendre sous ce plancher (scale)"
+    )
+    parser.add_argument("--max", type=int, help="plafond de concurrence, sortie lambda_max_concurrency")
+    parser.add_argument("--alias", default="live", help="alias portant la concurrence provisionnée")
+    parser.add_argument("--weekly", action="store_true", help="une fenêtre par jour de la semaine")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--count", type=positive_int, default=10, help="invocations simultanées (lambda warm)")
+    parser.add_argument("--hold-ms", type=int, default=500, help="durée d'occupation de chaque conteneur (lambda warm)")
+    parser.add_argument("--qualifier", help="version ou alias invoqué par l'API, par exemple live (lambda warm)")
+    parser.add_argument("--paths", nargs="+", default=[], help="chemins statiques (cloudfront warm)")
+    args = parser.parse_args()
 
-    resource, action, target = sys.argv[1].lower(), sys.argv[2].lower(), sys.argv[3]
+    if not args.targets and not args.tag:
+        parser.error("au moins une cible ou un --tag est requis")
+    if args.action == "scale" and args.resource != "lambda":
+        parser.error("scale ne s'applique qu'aux Lambdas")
+    if args.action == "warm" and args.resource == "cloudfront" and not args.paths:
+        parser.error("cloudfront warm attend --paths")
+    if not 1 <= args.weeks <= MAX_WEEKS:
+        parser.error(f"--weeks doit être entre 1 et {MAX_WEEKS} (rétention des points à 5 minutes)")
+    try:
+        tags = parse_tags(args.tag)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    # Les invocations de warm partagent le pool de connexions du client Lambda
+    clients = Clients(max(args.workers, args.count) if args.action == "warm" else args.workers)
+    region = CLOUDFRONT_REGION if args.resource == "cloudfront" else REGION
+    client = clients.get(args.resource, region)
 
-    if resource not in ("lambda", "cloudfront"):
-        print("Ressource invalide. Utilisez 'lambda' ou 'cloudfront'.")
+    try:
+        tagging_client = clients.get("resourcegroupstaggingapi", region)
+        targets = resolve_targets(tagging_client, args.resource, args.targets, tags)
+    except (ClientError, BotoCoreError) as e:
+        print(f"Erreur AWS: {describe_error(e)}")
         sys.exit(1)
-    if action not in ("enable", "disable"):
-        print("Action invalide. Utilisez 'enable' ou 'disable'.")
+    if not targets:
+        print("Aucune ressource ne correspond aux tags.")
         sys.exit(1)
 
-    try:
-        if resource == "lambda":
-            (lambda_enable if action == "enable" else lambda_disable)(target)
-        else:
-            (cloudfront_enable if action == "enable" else cloudfront_disable)(target)
-    except ClientError as e:
-        print(f"Erreur AWS: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
+    if args.action == "scale":
+        try:
+            options = PlanOptions(
+                window_minutes=args.window,
+                percentile=args.percentile,
+                headroom=args.headroom,
+                min_provisioned=args.min_provisioned,
+                min_reserved=args.min_reserved,
+                max_concurrency=args.max,
+                weekly=args.weekly,
+                lead_minutes=args.lead,
+            )
+        except ValueError as e:
+            parser.error(str(e))
+        action = functools.partial(
+            lambda_scale,
+            cloudwatch=clients.get("cloudwatch", region),
+            options=options,
+            weeks=args.weeks,
+            alias=args.alias or None,
+            dry_run=args.dry_run,
+        )
+    elif args.action == "warm" and args.resource == "lambda":
+        action = functools.partial(lambda_warm, count=args.count, hold_ms=args.hold_ms, qualifier=args.qualifier)
+    elif args.action == "warm":
+        action = functools.partial(cloudfront_warm, paths=args.paths)
+    else:
+        action = ACTIONS[(args.resource, args.action)]
+
+    results = run_actions(action, client, targets, args.workers)
+    failed = [result for result in results if result.error]
+
+    if args.wait and args.resource == "cloudfront":
+        changed = [result.target for result in results if result.changed]
+        if changed:
+            print(f"Attente du déploiement de {len(changed)} distribution(s)...")
+            statuses = wait_deployed(client, changed, args.wait_timeout)
+            failed += [distribution_id for distribution_id, status in statuses.items() if status != "Deployed"]
+
+    succeeded = sum(1 for result in results if not result.error)
+    print(f"{succeeded}/{len(results)} cible(s) traitée(s)")
+    if failed:
         sys.exit(1)
 
 
@@ -0,0 +1,264 @@
+"""
+Déploiement concurrent de plusieurs environnements (stacks Pulumi.<env>.yaml).
+
+Usage:
+    python scripts/deploy_environments.py dev staging prod [--workers 2] [--timeout 3600]
+        [--after prod=staging ...] [--no-order] [--preview] [--backend file://~/.pulumi-local]
+
+Les stacks sont déployées via l'Automation API par un pool de `--workers` threads.
+Une stack attend que ses prédécesseurs (`--after stack=prédécesseur`, prod après
+staging par défaut) aient réussi ; si l'un échoue, elle est ignorée. Au-delà de
+`--timeout` secondes, la CLI reçoit SIGINT (annulation propre, l'état est
+sauvegardé) puis est tuée après `--grace` secondes. La sortie de chaque stack est
+préfixée par son nom, un tableau récapitulatif termine l'exécution.
+"""
+import argparse
+import signal
+import subprocess
+import sys
+import threading
+import time
+import types
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+_dotenv = _root / ".env"
+if _dotenv.exists():
+    try:
+        import dotenv
+        dotenv.load_dotenv(_dotenv)
+    except ImportError:
+        pass
+
+from pulumi import automation as auto  # noqa: E402
+from pulumi.automation import _cmd as sdk_cmd  # noqa: E402
+from pulumi.automation.errors import create_command_error  # noqa: E402
+
+# Promotion : prod n'est déployée qu'après un staging réussi
+DEFAULT_ORDER = {"prod": ("staging",)}
+
+_print_lock = threading.Lock()
+
+
+@dataclass
+class StackResult:
+    stack: str
+    status: str = "pending"
+    seconds: float = 0.0
+    changes: dict = field(default_factory=dict)
+    message: str = ""
+
+
+# Processus de la CLI lancé par le SDK dans le thread courant, pour l'échéance de DeadlineCommand
+_running = threading.local()
+
+
+class TrackedPopen(subprocess.Popen):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        command = getattr(_running, "command", None)
+        if command is not None:
+            command.process = self
+
+
+# Seul le module de commandes du SDK voit ce Popen : PulumiCommand.run reste celui du SDK
+sdk_cmd.subprocess = types.SimpleNamespace(**{**vars(subprocess), "Popen": TrackedPopen})
+
+
+class DeadlineCommand(auto.PulumiCommand):
+    """CLI Pulumi interrompue au-delà d'une échéance : SIGINT puis SIGKILL après `grace` secondes."""
+
+    def __init__(self, grace: float = 60.0, root: str = None):
+        super().__init__(root=root)
+        self.grace = grace
+        self.deadline = None
+        self.timed_out = False
+        self.process = None
+
+    def interrupt(self) -> None:
+        process = self.process
+        if process is None or process.poll() is not None:
+            return
+        self.timed_out = True
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=self.grace)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def run(self, args, cwd, additional_env, on_output=None, on_error=None):
+        if self.deadline is None:
+            return super().run(args, cwd, additional_env, on_output, on_error)
+
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            self.timed_out = True
+            raise create_command_error(auto.CommandResult(stdout="", stderr="deadline exceeded", code=1))
+
+        # Le watchdog interrompt la CLI de l'extérieur, le SDK lit ses sorties jusqu'à la fin
+        watchdog = threading.Timer(remaining, self.interrupt)
+        watchdog.daemon = True
+        _running.command = self
+        self.process = None
+        watchdog.start()
+        try:
+            return super().run(args, cwd, additional_env, on_output, on_error)
+        finally:
+            watchdog.cancel()
+            _running.command = None
+
+
+def emit(stack: str, line: str) -> None:
+    with _print_lock:
+        print(f"[{stack}] {line}", flush=True)
+
+
+def deploy_stack(
+    stack_name: str,
+    work_dir: str = str(_root),
+    preview: bool = False,
+    timeout: float = None,
+    grace: float = 60.0,
+    backend: str = None,
+) -> StackResult:
+    result = StackResult(stack_name)
+    command = DeadlineCommand(grace=grace)
+    env_vars = {"PULUMI_BACKEND_URL": backend} if backend else None
+    started = time.monotonic()
+    command.deadline = started + timeout if timeout else None
+
+    def output(line: str) -> None:
+        emit(stack_name, line)
+
+    try:
+        stack = auto.select_stack(
+            stack_name=stack_name,
+            work_dir=work_dir,
+            opts=auto.LocalWorkspaceOptions(pulumi_command=command, env_vars=env_vars),
+        )
+        if preview:
+            changes = stack.preview(on_output=output, on_error=output).change_summary
+        else:
+            changes = stack.up(on_output=output, on_error=output).summary.resource_changes or {}
+        result.changes = {getattr(op, "value", op): count for op, count in changes.items() if op != "same"}
+        result.status = "succeeded"
+    except auto.CommandError as e:
+        result.status = "timeout" if command.timed_out else "failed"
+        result.message = (str(e).strip().splitlines() or [""])[-1][:120]
+    finally:
+        result.seconds = time.monotonic() - started
+
+    return result
+
+
+def resolve_order(stacks: list[str], order: dict) -> dict:
+    """Prédécesseurs de chaque stack, limités aux stacks sélectionnées ; refuse les cycles."""
+    dependencies = {stack: [dep for dep in order.get(stack, ()) if dep in stacks] for stack in stacks}
+
+    visiting, done = set(), set()
+
+    def visit(stack: str, path: list[str]) -> None:
+        if stack in done:
+            return
+        if stack in visiting:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [stack])}")
+        visiting.add(stack)
+        for dependency in dependencies[stack]:
+            visit(dependency, path + [stack])
+        visiting.discard(stack)
+        done.add(stack)
+
+    for stack in stacks:
+        visit(stack, [])
+    return dependencies
+
+
+def run_all(stacks: list[str], dependencies: dict, runner, workers: int) -> dict:
+    results = {stack: StackResult(stack) for stack in stacks}
+    remaining = list(stacks)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while remaining or running:
+            for stack in list(remaining):
+                statuses = [results[dependency].status for dependency in dependencies[stack]]
+                if any(status in ("failed", "timeout", "skipped") for status in statuses):
+                    failed = [dep for dep in dependencies[stack] if results[dep].status != "succeeded"]
+                    results[stack].status = "skipped"
+                    results[stack].message = f"{', '.join(failed)} n'a pas réussi"
+                    remaining.remove(stack)
+                elif all(status == "succeeded" for status in statuses):
+                    running[pool.submit(runner, stack)] = stack
+                    remaining.remove(stack)
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stack = running.pop(future)
+                try:
+                    results[stack] = future.result()
+                except Exception as e:
+                    results[stack] = StackResult(stack, status="failed", message=str(e)[:120])
+
+    return results
+
+
+def summary(results: dict) -> str:
+    lines = [f"{'stack':<20} {'statut':<10} {'durée':>8}  changements / message"]
+    for result in results.values():
+        changes = ", ".join(f"{op} {count}" for op, count in sorted(result.changes.items())) or "-"
+        detail = result.message if result.status != "succeeded" else changes
+        lines.append(f"{result.stack:<20} {result.status:<10} {result.seconds:7.1f}s  {detail}")
+    return "\n".join(lines)
+
+
+def parse_after(values: list[str]) -> dict:
+    order = {}
+    for value in values:
+        stack, _, dependency = value.partition("=")
+        if not stack or not dependency:
+            raise argparse.ArgumentTypeError(f"--after attend stack=prédécesseur : {value}")
+        order.setdefault(stack, []).append(dependency)
+    return order
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Déploiement concurrent de plusieurs stacks")
+    parser.add_argument("stacks", nargs="+")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--timeout", type=float, default=3600, help="secondes par stack")
+    parser.add_argument("--grace", type=float, default=60, help="délai entre SIGINT et SIGKILL")
+    parser.add_argument("--after", action="append", default=[], help="stack=prédécesseur")
+    parser.add_argument("--no-order", action="store_true", help="ignorer l'ordre par défaut")
+    parser.add_argument("--preview", action="store_true")
+    parser.add_argument("--backend", help="URL du backend, par exemple file://~/.pulumi-local")
+    args = parser.parse_args()
+
+    order = {} if args.no_order else {stack: list(deps) for stack, deps in DEFAULT_ORDER.items()}
+    for stack, deps in parse_after(args.after).items():
+        order.setdefault(stack, []).extend(deps)
+
+    try:
+        dependencies = resolve_order(args.stacks, order)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    def runner(stack: str) -> StackResult:
+        emit(stack, "préparation...")
+        return deploy_stack(stack, preview=args.preview, timeout=args.timeout, grace=args.grace, backend=args.backend)
+
+    results = run_all(args.stacks, dependencies, runner, args.workers)
+    print()
+    print(summary(results))
+
+    if any(result.status != "succeeded" for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Déploiement par couches (network -> data -> app, edge).
+
+Usage:
+    python scripts/deploy_layers.py init <env>
+    python scripts/deploy_layers.py up <env> [--layers app ...] [--force] [--preview]
+    python scripts/deploy_layers.py measure <env> [--command preview|up] [--runs 3]
+
+`init` crée les stacks {env}-network, {env}-data, {env}-app et {env}-edge avec la
+configuration de la stack {env} et `layer` positionné. `up` ne déploie que les couches
+dont l'empreinte a changé : sources importées par la couche, handler et scaler (app), dépendances,
+configuration de la stack et sorties des couches amont. L'empreinte déployée est gardée
+dans le tag `layer-fingerprint` de chaque stack. `measure` compare la durée médiane d'un
+preview (ou up) de la stack monolithique {env} et de la seule stack {env}-app.
+
+`up` refuse de déployer tant que la stack {env} gère encore des ressources : les couches en
+créeraient une seconde copie. Entre `init` et `up`, l'état se déplace avec `pulumi state move`
+(readme, section 16).
+"""
+import argparse
+import ast
+import hashlib
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+_dotenv = _root / ".env"
+if _dotenv.exists():
+    try:
+        import dotenv
+        dotenv.load_dotenv(_dotenv)
+    except ImportError:
+        pass
+
+sys.path.insert(0, str(_root))
+
+from infra.layers import LAYERS, UPSTREAM_LAYERS, layer_stack_name  # noqa: E402
+
+FINGERPRINT_TAG = "layer-fingerprint"
+SHARED_FILES = ("__main__.py", "Pulumi.yaml", "pyproject.toml", "uv.lock")
+LAYER_DIRECTORIES = {"app": ("handler", "scaler")}
+
+
+def pulumi(*args: str, check: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(["pulumi", *args], cwd=_root, capture_output=True, text=True, check=check)
+
+
+def module_path(module: str) -> Path | None:
+    base = _root.joinpath(*module.split("."))
+    for candidate in (base.with_suffix(".py"), base / "__init__.py"):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def import_closure(entry: Path) -> set[Path]:
+    # Modules infra.* atteints depuis le module de la couche, sans l'exécuter
+    seen, pending = set(), [entry]
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        for node in ast.walk(ast.parse(path.read_text(), filename=str(path))):
+            if isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                modules = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+            elif isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            else:
+                continue
+            for module in modules:
+                if module.split(".")[0] == "infra" and (found := module_path(module)):
+                    pending.append(found)
+    return seen
+
+
+def layer_sources(layer: str) -> list[Path]:
+    sources = import_closure(_root / "infra" / "layers" / f"{layer}.py")
+    sources.update(_root / name for name in SHARED_FILES if (_root / name).exists())
+    for directory in LAYER_DIRECTORIES.get(layer, ()):
+        sources.update(path for path in (_root / directory).rglob("*") if path.is_file() and "__pycache__" not in path.parts)
+    return sorted(sources)
+
+
+def fingerprint(layer: str, env: str) -> str:
+    digest = hashlib.sha256()
+    for path in layer_sources(layer):
+        digest.update(str(path.relative_to(_root)).encode())
+        digest.update(path.read_bytes())
+
+    # Le fichier de configuration contient les secrets chiffrés : une rotation change l'empreinte
+    stack_config = _root / f"Pulumi.{layer_stack_name(layer, env)}.yaml"
+    if stack_config.exists():
+        digest.update(stack_config.read_bytes())
+
+    for upstream in UPSTREAM_LAYERS[layer]:
+        outputs = pulumi("stack", "output", "--json", "--show-secrets", "-s", layer_stack_name(upstream, env))
+        digest.update(upstream.encode())
+        digest.update(outputs.stdout.encode())
+
+    return digest.hexdigest()[:32]
+
+
+def deployed_fingerprint(stack: str) -> str | None:
+    result = pulumi("stack", "tag", "get", FINGERPRINT_TAG, "-s", stack, check=False)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def monolith_resources(env: str) -> list[str]:
+    """URNs encore gérées par la stack monolithique {env}, hors stack et providers."""
+    result = pulumi("stack", "export", "-s", env, check=False)
+    if result.returncode != 0:
+        return []
+    resources = json.loads(result.stdout).get("deployment", {}).get("resources") or []
+    return [
+        resource["urn"]
+        for resource in resources
+        if resource["type"] != "pulumi:pulumi:Stack" and not resource["type"].startswith("pulumi:providers:")
+    ]
+
+
+def ensure_monolith_empty(env: str) -> None:
+    urns = monolith_resources(env)
+    if urns:
+        print(
+            f"La stack '{env}' gère encore {len(urns)} ressource(s) : les couches créeraient un second VPC, "
+            f"une seconde base et une seconde distribution CloudFront."
+        )
+        print(f"Déplacer d'abord l'état vers les stacks {env}-<couche> (readme, section 16).")
+        sys.exit(1)
+
+
+def init(env: str) -> None:
+    for layer in LAYERS:
+        stack = layer_stack_name(layer, env)
+        if pulumi("stack", "select", stack, check=False).returncode != 0:
+            pulumi("stack", "init", stack)
+        pulumi("config", "cp", "-s", env, "--dest", stack)
+        pulumi("config", "set", "layer", layer, "-s", stack)
+        print(f"Stack '{stack}' prête")
+
+
+def up(env: str, layers: list[str], force: bool, preview: bool) -> None:
+    ensure_monolith_empty(env)
+    for layer in LAYERS:
+        if layers and layer not in layers:
+            continue
+
+        stack = layer_stack_name(layer, env)
+        current = fingerprint(layer, env)
+        if not force and current == deployed_fingerprint(stack):
+            print(f"{stack}: inchangée, ignorée")
+            continue
+
+        print(f"{stack}: {'preview' if preview else 'déploiement'}...")
+        started = time.perf_counter()
+        command = ["preview", "-s", stack] if preview else ["up", "--yes", "--skip-preview", "-s", stack]
+        result = subprocess.run(["pulumi", *command], cwd=_root)
+        if result.returncode != 0:
+            print(f"Échec de '{stack}', couches suivantes non déployées.")
+            sys.exit(result.returncode)
+        print(f"{stack}: {time.perf_counter() - started:.1f}s")
+
+        if not preview:
+            # Les sorties amont viennent d'être redéployées : l'empreinte est recalculée après coup
+            pulumi("stack", "tag", "set", FINGERPRINT_TAG, fingerprint(layer, env), "-s", stack)
+
+
+def timed(command: list[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run(["pulumi", *command], cwd=_root, capture_output=True, check=True)
+    return time.perf_counter() - started
+
+
+def measure(env: str, command: str, runs: int) -> None:
+    extra = ["--yes", "--skip-preview"] if command == "up" else []
+    for stack in (env, layer_stack_name("app", env)):
+        durations = [timed([command, *extra, "-s", stack]) for _ in range(runs)]
+        print(
+            f"{command} {stack:<20} médiane {statistics.median(durations):6.1f}s "
+            f"(min {min(durations):.1f}s, max {max(durations):.1f}s, {runs} runs)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Déploiement par couches de stacks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    init_parser = subparsers.add_parser("init", help="créer les stacks de couches")
+    init_parser.add_argument("env")
+
+    up_parser = subparsers.add_parser("up", help="déployer les couches modifiées")
+    up_parser.add_argument("env")
+    up_parser.add_argument("--layers", nargs="+", choices=LAYERS, default=[])
+    up_parser.add_argument("--force", action="store_true", help="ignorer les empreintes")
+    up_parser.add_argument("--preview", action="store_true")
+
+    measure_parser = subparsers.add_parser("measure", help="comparer monolithe et couche app")
+    measure_parser.add_argument("env")
+    measure_parser.add_argument("--command", choices=("preview", "up"), default="preview")
+    measure_parser.add_argument("--runs", type=int, default=3)
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "init":
+            init(args.env)
+        elif args.command == "up":
+            up(args.env, args.layers, args.force, args.preview)
+        else:
+            measure(args.env, args.command, args.runs)
+    except subprocess.CalledProcessError as e:
+        print(f"Erreur Pulumi ({' '.join(e.cmd[1:])}): {(e.stderr or '').strip()}")
+        sys.exit(1)
+    except FileNotFoundError:
+        print("La CLI pulumi est introuvable dans le PATH.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
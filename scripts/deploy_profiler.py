@@ -0,0 +1,281 @@
+"""
+Profil d'un déploiement Pulumi : durée par ressource et chemin critique.
+
+Usage:
+    python scripts/deploy_profiler.py record <stack> [--preview] [--log deploy-events.jsonl] [--top 15]
+    python scripts/deploy_profiler.py report <deploy-events.jsonl> [--top 15] [--json]
+
+`record` lance un preview ou un up via l'Automation API, enregistre les événements du
+moteur (format de `pulumi up --event-log`, plus l'heure de réception `receivedAt`)
+puis les dépendances de chaque ressource lues dans l'état de la stack (ligne
+`dependencies`). `report` rejoue l'analyse hors ligne sur ce fichier, ou sur un
+fichier produit par `pulumi up --event-log` (dépendances alors inconnues, chaque
+ressource est une racine).
+
+Le chemin critique part de la ressource terminée en dernier et remonte, à chaque
+étape, la dépendance terminée le plus tard : c'est elle qui a retenu le démarrage.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+_dotenv = _root / ".env"
+if _dotenv.exists():
+    try:
+        import dotenv
+        dotenv.load_dotenv(_dotenv)
+    except ImportError:
+        pass
+
+
+# Étapes sans appel au provider : durée nulle, ignorées dans le classement
+PASSIVE_OPS = {"same", "read", "refresh"}
+
+
+@dataclass
+class Step:
+    urn: str
+    type: str
+    op: str
+    start: float
+    end: float = None
+    failed: bool = False
+
+    @property
+    def duration(self) -> float:
+        return (self.end - self.start) if self.end is not None else 0.0
+
+
+@dataclass
+class Node:
+    urn: str
+    type: str
+    steps: list[Step] = field(default_factory=list)
+    dependencies: list[str] = field(default_factory=list)
+
+    @property
+    def start(self) -> float:
+        return min(step.start for step in self.steps)
+
+    @property
+    def end(self) -> float:
+        return max(step.end if step.end is not None else step.start for step in self.steps)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    @property
+    def ops(self) -> str:
+        return "+".join(step.op for step in self.steps)
+
+
+def resource_name(urn: str) -> str:
+    return urn.rsplit("::", 1)[-1]
+
+
+def event_time(event: dict) -> float:
+    # receivedAt est à la milliseconde, timestamp (horodatage du moteur) à la seconde
+    return event.get("receivedAt", event.get("timestamp", 0))
+
+
+def load_log(path: str) -> tuple[list[dict], dict]:
+    events, dependencies = [], {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "dependencies" in record:
+                dependencies.update(record["dependencies"])
+            else:
+                events.append(record)
+    events.sort(key=lambda event: event.get("sequence", 0))
+    return events, dependencies
+
+
+def build_nodes(events: list[dict], dependencies: dict = None) -> dict:
+    nodes, pending = {}, {}
+
+    for event in events:
+        if "resourcePreEvent" in event:
+            metadata = event["resourcePreEvent"]["metadata"]
+            step = Step(urn=metadata["urn"], type=metadata["type"], op=metadata["op"], start=event_time(event))
+            pending[(step.urn, step.op)] = step
+            node = nodes.setdefault(step.urn, Node(urn=step.urn, type=step.type))
+            node.steps.append(step)
+        elif "resOutputsEvent" in event or "resOpFailedEvent" in event:
+            key = "resOutputsEvent" if "resOutputsEvent" in event else "resOpFailedEvent"
+            metadata = event[key]["metadata"]
+            step = pending.pop((metadata["urn"], metadata["op"]), None)
+            if step is not None:
+                step.end = event_time(event)
+                step.failed = key == "resOpFailedEvent"
+
+    for urn, node in nodes.items():
+        node.dependencies = [dependency for dependency in (dependencies or {}).get(urn, []) if dependency in nodes]
+
+    return nodes
+
+
+def critical_path(nodes: dict) -> list[Node]:
+    if not nodes:
+        return []
+
+    path, current, seen = [], max(nodes.values(), key=lambda node: node.end), set()
+    while current is not None and current.urn not in seen:
+        seen.add(current.urn)
+        path.append(current)
+        predecessors = [nodes[urn] for urn in current.dependencies]
+        current = max(predecessors, key=lambda node: node.end) if predecessors else None
+    return list(reversed(path))
+
+
+def slowest(nodes: dict, limit: int) -> list[Node]:
+    active = [node for node in nodes.values() if any(step.op not in PASSIVE_OPS for step in node.steps)]
+    return sorted(active, key=lambda node: node.duration, reverse=True)[:limit]
+
+
+def analyze(events: list[dict], dependencies: dict = None, limit: int = 15) -> dict:
+    nodes = build_nodes(events, dependencies)
+    if not nodes:
+        return {"total": 0.0, "critical_path": [], "slowest": [], "by_type": {}}
+
+    origin = min(node.start for node in nodes.values())
+    total = max(node.end for node in nodes.values()) - origin
+
+    def describe(node: Node) -> dict:
+        return {
+            "urn": node.urn,
+            "name": resource_name(node.urn),
+            "type": node.type,
+            "ops": node.ops,
+            "start": round(node.start - origin, 3),
+            "duration": round(node.duration, 3),
+            "failed": any(step.failed for step in node.steps),
+        }
+
+    by_type = {}
+    for node in nodes.values():
+        by_type[node.type] = by_type.get(node.type, 0.0) + node.duration
+
+    path = critical_path(nodes)
+    return {
+        "total": round(total, 3),
+        "critical_path": [describe(node) for node in path],
+        "critical_path_busy": round(sum(node.duration for node in path), 3),
+        "slowest": [describe(node) for node in slowest(nodes, limit)],
+        "by_type": dict(sorted(by_type.items(), key=lambda item: item[1], reverse=True)[:limit]),
+    }
+
+
+def render(report: dict) -> str:
+    lines = [f"Durée totale : {report['total']:.1f}s", "", "Chemin critique :"]
+    for entry in report["critical_path"]:
+        lines.append(
+            f"  +{entry['start']:7.1f}s  {entry['duration']:7.1f}s  {entry['ops']:<18} {entry['name']} ({entry['type']})"
+        )
+    if report["critical_path"]:
+        busy = report["critical_path_busy"]
+        lines.append(f"  {busy:.1f}s d'opérations, {report['total'] - busy:.1f}s d'attente (programme, provider)")
+
+    lines += ["", "Ressources les plus longues :"]
+    for entry in report["slowest"]:
+        marker = " ÉCHEC" if entry["failed"] else ""
+        lines.append(f"  {entry['duration']:7.1f}s  {entry['ops']:<18} {entry['name']} ({entry['type']}){marker}")
+
+    lines += ["", "Par type :"]
+    for type_, seconds in report["by_type"].items():
+        lines.append(f"  {seconds:7.1f}s  {type_}")
+    return "\n".join(lines)
+
+
+def serialize(event, received_at: float) -> dict:
+    # EngineEvent n'a pas de to_json : seuls les champs utiles à l'analyse sont écrits
+    record = {"sequence": event.sequence, "timestamp": event.timestamp, "receivedAt": received_at}
+    if event.resource_pre_event:
+        metadata = event.resource_pre_event.metadata
+        record["resourcePreEvent"] = {"metadata": {"urn": metadata.urn, "type": metadata.type, "op": metadata.op.value}}
+    elif event.res_outputs_event:
+        metadata = event.res_outputs_event.metadata
+        record["resOutputsEvent"] = {"metadata": {"urn": metadata.urn, "type": metadata.type, "op": metadata.op.value}}
+    elif event.res_op_failed_event:
+        metadata = event.res_op_failed_event.metadata
+        record["resOpFailedEvent"] = {"metadata": {"urn": metadata.urn, "type": metadata.type, "op": metadata.op.value}}
+    elif event.summary_event:
+        record["summaryEvent"] = {"durationSeconds": event.summary_event.duration_seconds}
+    else:
+        return None
+    return record
+
+
+def state_dependencies(stack) -> dict:
+    resources = stack.export_stack().deployment.get("resources") or []
+    return {resource["urn"]: resource.get("dependencies") or [] for resource in resources}
+
+
+def record(stack_name: str, log_path: str, preview: bool) -> None:
+    from pulumi import automation as auto
+
+    stack = auto.select_stack(stack_name=stack_name, work_dir=str(_root))
+
+    with open(log_path, "w") as log:
+        def on_event(event) -> None:
+            entry = serialize(event, time.time())
+            if entry is not None:
+                log.write(json.dumps(entry) + "\n")
+
+        started = time.perf_counter()
+        if preview:
+            stack.preview(on_event=on_event)
+        else:
+            stack.up(on_event=on_event, on_output=print)
+        print(f"{'preview' if preview else 'up'} terminé en {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        # Les nouvelles ressources d'un preview n'ont pas encore de dépendances dans l'état
+        log.write(json.dumps({"dependencies": state_dependencies(stack)}) + "\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Profil des déploiements Pulumi")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser("record", help="déployer et enregistrer les événements")
+    record_parser.add_argument("stack")
+    record_parser.add_argument("--preview", action="store_true")
+    record_parser.add_argument("--log", default="deploy-events.jsonl")
+    record_parser.add_argument("--top", type=int, default=15)
+
+    report_parser = subparsers.add_parser("report", help="analyser un journal enregistré")
+    report_parser.add_argument("log")
+    report_parser.add_argument("--top", type=int, default=15)
+    report_parser.add_argument("--json", action="store_true")
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        try:
+            record(args.stack, args.log, args.preview)
+        except Exception as e:
+            # Le journal partiel reste exploitable avec `report`
+            print(f"Erreur Pulumi : {e}", file=sys.stderr)
+            sys.exit(1)
+        log_path = args.log
+    else:
+        if not os.path.exists(args.log):
+            print(f"Journal introuvable : {args.log}")
+            sys.exit(1)
+        log_path = args.log
+
+    events, dependencies = load_log(log_path)
+    report = analyze(events, dependencies, args.top)
+    print(json.dumps(report, indent=2) if getattr(args, "json", False) else render(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Top talkers des VPC flow logs (Parquet, partitions horaires Hive).
+
+Usage:
+    python scripts/flow_logs_analyzer.py <data_bucket> --start 2026-10-01T00 --end 2026-10-01T06
+        [--by source|destination|port|path|interface ...] [--top 20]
+        [--nat-eni eni-...] [--endpoint-ip 10.0.10.25] [--vpc-cidr 10.0.0.0/16]
+        [--gateway-prefix 52.95.128.0/21 ...] [--account-id 123456789012] [--local DIR]
+
+Seules les partitions de la plage sont listées et seules les colonnes utiles sont
+lues (projection Parquet, lecture par batch). Le chemin de chaque flux est classé
+en nat, endpoint, local, internet ou other à partir de traffic-path, des ENI des
+NAT gateways (`pulumi stack output nat_interface_ids`), des adresses des
+endpoints interface et des plages servies par le gateway endpoint S3 (prefix list
+`com.amazonaws.<region>.s3`, lue via EC2 si `--gateway-prefix` est absent).
+"""
+import argparse
+import io
+import ipaddress
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+from logs_query import LocalArchive, S3Archive, iter_hours, parse_hour
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+REGION = os.getenv("AWS_REGION") or "eu-west-3"
+FLOW_LOG_PREFIX = "flow-logs"
+
+COLUMNS = [
+    "interface_id",
+    "srcaddr",
+    "dstaddr",
+    "dstport",
+    "protocol",
+    "packets",
+    "bytes",
+    "start",
+    "pkt_srcaddr",
+    "pkt_dstaddr",
+    "flow_direction",
+    "traffic_path",
+]
+
+PROTOCOLS = {1: "icmp", 6: "tcp", 17: "udp"}
+
+# traffic-path (flux sortants) : 1 ressource du VPC, 2 IGW ou gateway endpoint,
+# 7 gateway endpoint, 8 IGW (les deux derniers uniquement sur Nitro).
+# Le 2 est ambigu : la destination dans la prefix list du gateway endpoint tranche
+GATEWAY_ENDPOINT_PATHS = {7}
+GATEWAY_OR_INTERNET_PATH = 2
+INTERNET_PATHS = {8}
+
+GROUP_KEYS = {
+    "source": lambda row: row["pkt_srcaddr"] or row["srcaddr"],
+    "destination": lambda row: row["pkt_dstaddr"] or row["dstaddr"],
+    "port": lambda row: f"{PROTOCOLS.get(row['protocol'], row['protocol'])}/{row['dstport']}",
+    "path": lambda row: row["path"],
+    "interface": lambda row: row["interface_id"],
+}
+
+
+def flow_partition_prefix(account_id: str, hour: datetime) -> str:
+    return (
+        f"{FLOW_LOG_PREFIX}/AWSLogs/aws-account-id={account_id}/aws-service=vpcflowlogs/"
+        f"aws-region={REGION}/year={hour:%Y}/month={hour:%m}/day={hour:%d}/hour={hour:%H}/"
+    )
+
+
+def s3_prefix_cidrs(ec2_client) -> list[str]:
+    """Plages de la prefix list gérée S3 de la région, celles que route le gateway endpoint."""
+    lists = ec2_client.describe_managed_prefix_lists(
+        Filters=[{"Name": "prefix-list-name", "Values": [f"com.amazonaws.{REGION}.s3"]}]
+    )["PrefixLists"]
+    cidrs = []
+    for prefix_list in lists:
+        paginator = ec2_client.get_paginator("get_managed_prefix_list_entries")
+        for page in paginator.paginate(PrefixListId=prefix_list["PrefixListId"]):
+            cidrs.extend(entry["Cidr"] for entry in page["Entries"])
+    return cidrs
+
+
+def in_networks(address: str, networks: list) -> bool:
+    if not address or address == "-":
+        return False
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+class PathClassifier:
+    def __init__(
+        self,
+        vpc_cidrs: list[str],
+        nat_interfaces: list[str] = None,
+        endpoint_addresses: list[str] = None,
+        gateway_prefixes: list[str] = None,
+    ):
+        self.vpc_networks = [ipaddress.ip_network(cidr) for cidr in vpc_cidrs]
+        self.nat_interfaces = set(nat_interfaces or [])
+        self.endpoint_addresses = set(endpoint_addresses or [])
+        self.gateway_networks = [ipaddress.ip_network(cidr) for cidr in gateway_prefixes or []]
+
+    def in_vpc(self, address: str) -> bool:
+        return in_networks(address, self.vpc_networks)
+
+    def via_gateway_endpoint(self, remote: str) -> bool:
+        return in_networks(remote, self.gateway_networks)
+
+    def classify(self, row: dict) -> str:
+        source = row["pkt_srcaddr"] or row["srcaddr"]
+        destination = row["pkt_dstaddr"] or row["dstaddr"]
+
+        if row["interface_id"] in self.nat_interfaces:
+            return "nat"
+        if source in self.endpoint_addresses or destination in self.endpoint_addresses:
+            return "endpoint"
+        if row["traffic_path"] in GATEWAY_ENDPOINT_PATHS:
+            return "endpoint"
+
+        source_local, destination_local = self.in_vpc(source), self.in_vpc(destination)
+        if source_local and destination_local:
+            return "local"
+        # Hors NAT, un échange entre le VPC et une plage S3 passe par le gateway endpoint
+        if source_local != destination_local and row["traffic_path"] in (GATEWAY_OR_INTERNET_PATH, None):
+            if self.via_gateway_endpoint(destination if source_local else source):
+                return "endpoint"
+        # Un flux sortant d'un sous-réseau privé vers l'extérieur passe par une ressource du VPC : le NAT
+        if row["traffic_path"] == 1 and not destination_local:
+            return "nat"
+        if row["traffic_path"] in INTERNET_PATHS | {GATEWAY_OR_INTERNET_PATH} or source_local != destination_local:
+            return "internet"
+        return "other"
+
+
+def iter_rows(stream, start_epoch: int, end_epoch: int, batch_size: int = 65536):
+    if pq is None:
+        raise RuntimeError("pyarrow est requis pour lire les flow logs Parquet")
+
+    parquet_file = pq.ParquetFile(stream)
+    columns = [name for name in COLUMNS if name in parquet_file.schema_arrow.names]
+    for batch in parquet_file.iter_batches(columns=columns, batch_size=batch_size):
+        for row in batch.to_pylist():
+            if row.get("start") is not None and not (start_epoch <= row["start"] < end_epoch):
+                continue
+            for name in COLUMNS:
+                row.setdefault(name, None)
+            yield row
+
+
+def aggregate(rows, classifier: PathClassifier, group_by: list[str]) -> dict:
+    totals = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        row["path"] = classifier.classify(row)
+        key = tuple(GROUP_KEYS[name](row) for name in group_by)
+        entry = totals[key]
+        entry[0] += row["bytes"] or 0
+        entry[1] += row["packets"] or 0
+        entry[2] += 1
+    return totals
+
+
+def top(totals: dict, limit: int) -> list[tuple]:
+    return sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+
+
+def format_bytes(value: int) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TiB"
+
+
+def render(rows: list[tuple], group_by: list[str]) -> str:
+    header = "  ".join(f"{name:<22}" for name in group_by)
+    lines = [f"{header}  {'bytes':>12} {'packets':>12} {'flows':>8}"]
+    for key, (total_bytes, packets, flows) in rows:
+        columns = "  ".join(f"{str(value):<22}" for value in key)
+        lines.append(f"{columns}  {format_bytes(total_bytes):>12} {packets:>12} {flows:>8}")
+    return "\n".join(lines)
+
+
+def query(archive, account_id: str, start: datetime, end: datetime):
+    start_epoch, end_epoch = int(start.timestamp()), int(end.timestamp())
+    for hour in iter_hours(start, end):
+        for key in archive.list(flow_partition_prefix(account_id, hour)):
+            if not key.endswith(".parquet"):
+                continue
+            with archive.open(key) as stream:
+                yield from iter_rows(io.BytesIO(stream.read()), start_epoch, end_epoch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Top talkers des VPC flow logs")
+    parser.add_argument("bucket")
+    parser.add_argument("--start", type=parse_hour, required=True)
+    parser.add_argument("--end", type=parse_hour, required=True)
+    parser.add_argument("--by", nargs="+", choices=sorted(GROUP_KEYS), default=["source", "destination", "port", "path"])
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--vpc-cidr", action="append", help="CIDR du VPC (10.0.0.0/16 par défaut)")
+    parser.add_argument("--nat-eni", action="append", default=[], help="ENI d'un NAT gateway")
+    parser.add_argument("--endpoint-ip", action="append", default=[], help="adresse d'un endpoint interface")
+    parser.add_argument(
+        "--gateway-prefix", action="append", help="plage servie par un gateway endpoint (prefix list S3 par défaut)"
+    )
+    parser.add_argument("--account-id", help="compte AWS des partitions, lu via STS si absent")
+    parser.add_argument("--local", help="répertoire miroir du bucket au lieu de S3")
+    args = parser.parse_args()
+
+    if args.end <= args.start:
+        print("La date de fin doit être postérieure à la date de début.")
+        sys.exit(1)
+
+    account_id = args.account_id
+    if account_id is None:
+        if args.local:
+            print("--account-id est requis avec --local.")
+            sys.exit(1)
+        import boto3
+
+        account_id = boto3.client("sts", region_name=REGION).get_caller_identity()["Account"]
+
+    gateway_prefixes = args.gateway_prefix
+    if gateway_prefixes is None and not args.local:
+        import boto3
+
+        gateway_prefixes = s3_prefix_cidrs(boto3.client("ec2", region_name=REGION))
+
+    archive = LocalArchive(args.local) if args.local else S3Archive(args.bucket)
+    classifier = PathClassifier(args.vpc_cidr or ["10.0.0.0/16"], args.nat_eni, args.endpoint_ip, gateway_prefixes)
+
+    totals = aggregate(query(archive, account_id, args.start, args.end), classifier, args.by)
+    print(render(top(totals, args.top), args.by))
+    print(f"{sum(entry[2] for entry in totals.values())} flux agrégé(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+"""
+Test de charge en modèle ouvert de l'API Gateway et de CloudFront.
+
+Usage:
+    python scripts/load_test.py run <stack> [<stack> ...] [--rate 50] [--duration 60] [--scenario scenario.json]
+        [--connections 64] [--report-interval 10] [--target api=https://...] [--json result.json]
+    python scripts/load_test.py calibrate [--duration 3] [--max-rate 20000]
+
+`run` lit `api_gateway_url` et `cloudfront_domain` dans les sorties des stacks ({env},
+ou {env}-app et {env}-edge en couches) ou `--target nom=url`, et envoie les requêtes à
+débit fixe (`--rate` par seconde) : le départ de chaque requête est planifié à
+l'avance, indépendamment des réponses. La
+latence est mesurée depuis l'instant prévu (correction de la coordinated omission),
+le temps de service depuis l'envoi effectif ; l'écart entre les deux révèle la file
+d'attente. Chaque endpoint a ses histogrammes HDR, résumés toutes les
+`--report-interval` secondes puis à la fin.
+
+Le scénario est un fichier JSON : {"requests": [{"name": "health", "target": "api",
+"method": "GET", "path": "/api/health", "weight": 5, "headers": {...}, "body": "..."}]}.
+Sans scénario, GET / sur chaque cible, à poids égal.
+
+`calibrate` mesure le débit maximal que le générateur tient contre un serveur local
+qui répond immédiatement : au-delà, les mesures de `run` reflètent le générateur.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import ssl
+import subprocess
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlsplit
+
+_root = Path(__file__).resolve().parent.parent
+_dotenv = _root / ".env"
+if _dotenv.exists():
+    try:
+        import dotenv
+        dotenv.load_dotenv(_dotenv)
+    except ImportError:
+        pass
+
+
+PERCENTILES = (50, 90, 99, 99.9, 100)
+# Le générateur est saturé quand il part régulièrement en retard sur son planning (p90)
+MAX_SCHEDULE_LAG_MS = 5.0
+
+
+class HdrHistogram:
+    """
+    Histogramme HDR (High Dynamic Range) en microsecondes.
+
+    Des sous-buckets linéaires dans des buckets de taille doublée : l'erreur relative
+    reste sous 10^-significant_figures sur toute la plage, en mémoire constante.
+    """
+
+    def __init__(self, lowest: int = 1, highest: int = 3_600_000_000, significant_figures: int = 3):
+        self.highest = highest
+        largest_single_unit = 2 * 10**significant_figures
+        self.unit_magnitude = int(math.floor(math.log2(lowest)))
+        self.sub_bucket_count_magnitude = int(math.ceil(math.log2(largest_single_unit)))
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_count_magnitude - 1
+        self.sub_bucket_count = 1 << self.sub_bucket_count_magnitude
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_mask = (self.sub_bucket_count - 1) << self.unit_magnitude
+
+        smallest_untrackable = self.sub_bucket_count << self.unit_magnitude
+        self.bucket_count = 1
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            self.bucket_count += 1
+
+        self.counts = [0] * ((self.bucket_count + 1) * self.sub_bucket_half_count)
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        bucket = (value | self.sub_bucket_mask).bit_length() - self.unit_magnitude - self.sub_bucket_count_magnitude
+        sub_bucket = value >> (bucket + self.unit_magnitude)
+        return ((bucket + 1) << self.sub_bucket_half_count_magnitude) + sub_bucket - self.sub_bucket_half_count
+
+    def _highest_equivalent(self, index: int) -> int:
+        bucket = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket < 0:
+            sub_bucket -= self.sub_bucket_half_count
+            bucket = 0
+        lowest = sub_bucket << (bucket + self.unit_magnitude)
+        return lowest + (1 << (bucket + self.unit_magnitude)) - 1
+
+    def record(self, value: int, count: int = 1) -> None:
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += count
+        self.total += count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def value_at_percentile(self, q: float) -> int:
+        if not self.total:
+            return 0
+        if q >= 100:
+            return self.max
+        threshold = max(math.ceil(self.total * q / 100), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def add(self, other: "HdrHistogram") -> None:
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def reset(self) -> None:
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def summary_ms(self) -> dict:
+        return {f"p{q:g}": round(self.value_at_percentile(q) / 1000, 3) for q in PERCENTILES}
+
+
+@dataclass
+class RequestSpec:
+    name: str
+    target: str
+    method: str = "GET"
+    path: str = "/"
+    weight: float = 1.0
+    headers: dict = field(default_factory=dict)
+    body: str = None
+    url: str = None
+
+
+@dataclass
+class EndpointStats:
+    latency: HdrHistogram = field(default_factory=HdrHistogram)
+    service: HdrHistogram = field(default_factory=HdrHistogram)
+    interval: HdrHistogram = field(default_factory=HdrHistogram)
+    statuses: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+
+    @property
+    def count(self) -> int:
+        return self.latency.total
+
+
+def load_scenario(path: str) -> list[RequestSpec]:
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    specs = [RequestSpec(**entry) for entry in document["requests"]]
+    if not specs or any(spec.weight <= 0 for spec in specs):
+        raise ValueError("Le scénario doit contenir des requêtes de poids positif")
+    return specs
+
+
+def default_scenario(targets: dict) -> list[RequestSpec]:
+    return [RequestSpec(name=f"{target} /", target=target) for target in targets]
+
+
+def resolve_urls(specs: list[RequestSpec], targets: dict) -> list[RequestSpec]:
+    for spec in specs:
+        if spec.target not in targets:
+            raise ValueError(f"Cible inconnue '{spec.target}' (disponibles : {', '.join(targets)})")
+        spec.url = targets[spec.target].rstrip("/") + "/" + spec.path.lstrip("/")
+    return specs
+
+
+def stack_targets(stack: str) -> dict:
+    result = subprocess.run(
+        ["pulumi", "stack", "output", "--json", "-s", stack], cwd=_root, capture_output=True, text=True, check=True
+    )
+    outputs = json.loads(result.stdout)
+    targets = {}
+    if outputs.get("api_gateway_url"):
+        targets["api"] = outputs["api_gateway_url"]
+    if outputs.get("cloudfront_domain"):
+        targets["cdn"] = f"https://{outputs['cloudfront_domain']}"
+    return targets
+
+
+async def read_response(reader: asyncio.StreamReader, method: str) -> tuple[int, int, bool]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError("connection closed by server")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    keep_alive = headers.get("connection", "").lower() != "close"
+    if method == "HEAD" or status in (204, 304) or status < 200:
+        return status, 0, keep_alive
+    if "content-length" in headers:
+        size = int(headers["content-length"])
+        await reader.readexactly(size)
+        return status, size, keep_alive
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        size = 0
+        while True:
+            chunk = int((await reader.readline()).split(b";")[0], 16)
+            if chunk == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return status, size, keep_alive
+            await reader.readexactly(chunk + 2)
+            size += chunk
+    # Corps délimité par la fermeture de la connexion
+    return status, len(await reader.read()), False
+
+
+class ConnectionPool:
+    """Connexions HTTP/1.1 keep-alive, au plus `limit` par origine."""
+
+    def __init__(self, limit: int = 64, timeout: float = 30.0):
+        self.limit = limit
+        self.timeout = timeout
+        self.idle = {}
+        self.slots = {}
+        self.opened = 0
+        self.ssl_context = ssl.create_default_context()
+
+    async def _connect(self, scheme: str, host: str, port: int):
+        self.opened += 1
+        if scheme == "https":
+            return await asyncio.open_connection(host, port, ssl=self.ssl_context, server_hostname=host)
+        return await asyncio.open_connection(host, port)
+
+    async def request(self, method: str, url: str, headers: dict = None, body: bytes = b"") -> tuple[int, int, float]:
+        """Statut, taille du corps et instant d'envoi (après l'attente d'une connexion libre)."""
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        origin = (parts.scheme, parts.hostname, port)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        head = [f"{method} {target} HTTP/1.1", f"Host: {parts.netloc}", "Connection: keep-alive"]
+        head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        if body or method in ("POST", "PUT", "PATCH"):
+            head.append(f"Content-Length: {len(body)}")
+        payload = ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+        slot = self.slots.setdefault(origin, asyncio.Semaphore(self.limit))
+        async with slot:
+            idle = self.idle.setdefault(origin, [])
+            # Une connexion inactive a pu être fermée par le serveur : un seul nouvel essai
+            for attempt in range(2):
+                reused = bool(idle)
+                reader, writer = idle.pop() if reused else await self._connect(*origin)
+                try:
+                    sent = asyncio.get_running_loop().time()
+                    writer.write(payload)
+                    status, size, keep_alive = await asyncio.wait_for(read_response(reader, method), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError) as e:
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise ConnectionError(str(e) or type(e).__name__) from e
+                except BaseException:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, size, sent
+
+    async def close(self) -> None:
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle.clear()
+
+
+async def run_load(
+    specs: list[RequestSpec],
+    rate: float,
+    duration: float,
+    pool: ConnectionPool,
+    seed: int = 1,
+    report_interval: float = 0,
+    on_report=None,
+) -> dict:
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    total = int(rate * duration)
+    plan = rng.choices(specs, weights=[spec.weight for spec in specs], k=total)
+    stats = {spec.name: EndpointStats() for spec in specs}
+    schedule_lag = HdrHistogram()
+    tasks = set()
+
+    async def fire(spec: RequestSpec, intended: float) -> None:
+        endpoint = stats[spec.name]
+        # En cas d'erreur, le temps de service inclut l'attente d'une connexion
+        sent = loop.time()
+        try:
+            status, _, sent = await pool.request(
+                spec.method, spec.url, spec.headers, spec.body.encode() if spec.body is not None else b""
+            )
+            endpoint.statuses[status] += 1
+        except Exception as e:
+            endpoint.errors[type(e).__name__] += 1
+        finally:
+            done = loop.time()
+            endpoint.latency.record((done - intended) * 1e6)
+            endpoint.interval.record((done - intended) * 1e6)
+            endpoint.service.record((done - sent) * 1e6)
+
+    async def reporter() -> None:
+        while True:
+            await asyncio.sleep(report_interval)
+            on_report(interval_report(stats, report_interval))
+
+    reporting = asyncio.create_task(reporter()) if report_interval and on_report else None
+    start = loop.time() + 0.01
+    for index, spec in enumerate(plan):
+        intended = start + index / rate
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        schedule_lag.record((loop.time() - intended) * 1e6)
+        task = asyncio.create_task(fire(spec, intended))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    sending = loop.time() - start
+
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+    if reporting is not None:
+        reporting.cancel()
+
+    return final_report(stats, schedule_lag, rate, total, sending, elapsed, pool.opened)
+
+
+def interval_report(stats: dict, seconds: float) -> dict:
+    report = {}
+    for name, endpoint in stats.items():
+        report[name] = {"rate": round(endpoint.interval.total / seconds, 1), **endpoint.interval.summary_ms()}
+        endpoint.interval.reset()
+    return report
+
+
+def final_report(
+    stats: dict, schedule_lag: HdrHistogram, rate: float, total: int, sending: float, elapsed: float, connections: int
+) -> dict:
+    # Intervalle entre le premier et le dernier envoi
+    send_rate = (total - 1) / sending if total > 1 and sending > 0 else float(rate)
+    lag = schedule_lag.summary_ms()
+    return {
+        "target_rate": rate,
+        "sent": total,
+        "send_rate": round(send_rate, 1),
+        "achieved_rate": round(total / elapsed, 1) if elapsed > 0 else 0.0,
+        "elapsed": round(elapsed, 3),
+        "connections": connections,
+        "schedule_lag_ms": lag,
+        "saturated": schedule_lag.value_at_percentile(90) / 1000 > MAX_SCHEDULE_LAG_MS or send_rate < 0.95 * rate,
+        "endpoints": {
+            name: {
+                "count": endpoint.count,
+                "statuses": dict(sorted(endpoint.statuses.items())),
+                "errors": dict(endpoint.errors),
+                "latency_ms": endpoint.latency.summary_ms(),
+                "service_ms": endpoint.service.summary_ms(),
+            }
+            for name, endpoint in stats.items()
+        },
+    }
+
+
+def render(report: dict) -> str:
+    lines = [
+        f"Débit visé {report['target_rate']:g}/s, envoyé {report['send_rate']:g}/s, "
+        f"{report['sent']} requêtes en {report['elapsed']:.1f}s sur {report['connections']} connexion(s)",
+        f"Retard du planning : p99 {report['schedule_lag_ms']['p99']:.1f} ms, max {report['schedule_lag_ms']['p100']:.1f} ms",
+        "",
+        f"{'endpoint':<24} {'requêtes':>8} {'erreurs':>8} " + " ".join(f"{f'p{q:g}':>9}" for q in PERCENTILES),
+    ]
+    for name, endpoint in report["endpoints"].items():
+        errors = sum(endpoint["errors"].values()) + sum(
+            count for status, count in endpoint["statuses"].items() if int(status) >= 500
+        )
+        latencies = " ".join(f"{value:9.1f}" for value in endpoint["latency_ms"].values())
+        service = " ".join(f"{value:9.1f}" for value in endpoint["service_ms"].values())
+        lines.append(f"{name:<24} {endpoint['count']:>8} {errors:>8} {latencies}")
+        lines.append(f"{'  (service)':<24} {'':>8} {'':>8} {service}")
+    if report["saturated"]:
+        lines += ["", "ATTENTION : le générateur n'a pas tenu le débit visé, voir `calibrate`"]
+    return "\n".join(lines)
+
+
+def render_interval(report: dict) -> str:
+    return "  ".join(f"{name}: {entry['rate']:g}/s p50 {entry['p50']:.1f} p99 {entry['p99']:.1f} ms" for name, entry in report.items())
+
+
+async def start_stub_server(host: str = "127.0.0.1") -> tuple[asyncio.AbstractServer, str]:
+    """Serveur HTTP/1.1 keep-alive minimal : /delay/<ms> attend, /status/<code> renvoie ce statut."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                length = 0
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+
+                parts = request_line.decode("latin-1").split()[1].strip("/").split("/")
+                status = 200
+                if len(parts) == 2 and parts[0] == "delay":
+                    await asyncio.sleep(float(parts[1]) / 1000)
+                elif len(parts) == 2 and parts[0] == "status":
+                    status = int(parts[1])
+                writer.write(f"HTTP/1.1 {status} X\r\nContent-Length: 2\r\nContent-Type: text/plain\r\n\r\nok".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, 0)
+    return server, f"http://{host}:{server.sockets[0].getsockname()[1]}"
+
+
+async def calibrate(duration: float = 3.0, start_rate: float = 250, max_rate: float = 20000, connections: int = 64) -> dict:
+    """Double le débit contre le serveur local tant que le générateur tient son planning."""
+    server, url = await start_stub_server()
+    specs = resolve_urls([RequestSpec(name="stub", target="stub")], {"stub": url})
+    steps, best, rate = [], 0.0, start_rate
+    try:
+        while rate <= max_rate:
+            pool = ConnectionPool(limit=connections)
+            report = await run_load(specs, rate, duration, pool)
+            await pool.close()
+            errors = sum(report["endpoints"]["stub"]["errors"].values())
+            steps.append({"rate": rate, "send_rate": report["send_rate"], "lag_p99_ms": report["schedule_lag_ms"]["p99"]})
+            if report["saturated"] or errors:
+                break
+            best = rate
+            rate *= 2
+    finally:
+        server.close()
+        await server.wait_closed()
+    return {"max_rate": best, "steps": steps}
+
+
+def parse_targets(values: list[str]) -> dict:
+    targets = {}
+    for value in values:
+        name, _, url = value.partition("=")
+        if not name or not url.startswith(("http://", "https://")):
+            raise argparse.ArgumentTypeError(f"--target attend nom=http(s)://... : {value}")
+        targets[name] = url
+    return targets
+
+
+async def run_command(args, targets: dict) -> dict:
+    specs = resolve_urls(load_scenario(args.scenario) if args.scenario else default_scenario(targets), targets)
+    pool = ConnectionPool(limit=args.connections, timeout=args.timeout)
+    try:
+        return await run_load(
+            specs,
+            args.rate,
+            args.duration,
+            pool,
+            seed=args.seed,
+            report_interval=args.report_interval,
+            on_report=lambda report: print(render_interval(report), flush=True),
+        )
+    finally:
+        await pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Test de charge en modèle ouvert")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="envoyer la charge sur les sorties d'une stack")
+    run_parser.add_argument("stacks", nargs="*")
+    run_parser.add_argument("--rate", type=float, default=50, help="requêtes par seconde")
+    run_parser.add_argument("--duration", type=float, default=60, help="secondes")
+    run_parser.add_argument("--scenario", help="fichier JSON du mélange de requêtes")
+    run_parser.add_argument("--connections", type=int, default=64, help="connexions max par origine")
+    run_parser.add_argument("--timeout", type=float, default=30)
+    run_parser.add_argument("--report-interval", type=float, default=10)
+    run_parser.add_argument("--target", action="append", default=[], help="nom=url, remplace les sorties de la stack")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--json", help="écrire le rapport final dans ce fichier")
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="débit maximal du générateur")
+    calibrate_parser.add_argument("--duration", type=float, default=3)
+    calibrate_parser.add_argument("--max-rate", type=float, default=20000)
+    calibrate_parser.add_argument("--connections", type=int, default=64)
+
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        result = asyncio.run(calibrate(args.duration, max_rate=args.max_rate, connections=args.connections))
+        for step in result["steps"]:
+            print(f"{step['rate']:>8g}/s  envoyé {step['send_rate']:>8g}/s  retard p99 {step['lag_p99_ms']:.1f} ms")
+        print(f"Débit maximal tenu : {result['max_rate']:g} requêtes/s")
+        return
+
+    try:
+        targets = parse_targets(args.target)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    for stack in reversed(args.stacks):
+        try:
+            targets = {**stack_targets(stack), **targets}
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            print(f"Sorties de la stack illisibles : {e}")
+            sys.exit(1)
+    if not targets:
+        parser.error("une stack ou au moins un --target est requis")
+
+    try:
+        report = asyncio.run(run_command(args, targets))
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}")
+        sys.exit(1)
+
+    print()
+    print(render(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Interroge l'archive de logs (Firehose -> S3) sur une plage de partitions horaires.
+
+Usage:
+    python scripts/logs_query.py <bucket> <api|lambda> --start 2026-10-01T00 --end 2026-10-02T00
+        [--route "GET /api/items"] [--status 500] [--local DIR]
+
+Les partitions hors plage ne sont jamais listées (pushdown sur le temps), le filtre
+de route est appliqué avant décodage complet quand l'archive est en Parquet.
+Les enregistrements sont écrits en JSON lines sur la sortie standard au fil de l'eau.
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+_dotenv = _root / ".env"
+if _dotenv.exists():
+    try:
+        import dotenv
+        dotenv.load_dotenv(_dotenv)
+    except ImportError:
+        pass
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+REGION = os.getenv("AWS_REGION") or "eu-west-3"
+LOG_ARCHIVE_PREFIX = "logs"
+REQUEST_TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+PARQUET_MAGIC = b"PAR1"
+
+
+def parse_hour(value: str) -> datetime:
+    for fmt in ("%Y-%m-%dT%H", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Date invalide: {value}")
+
+
+def iter_hours(start: datetime, end: datetime):
+    hour = start.replace(minute=0, second=0, microsecond=0)
+    while hour < end:
+        yield hour
+        hour += timedelta(hours=1)
+
+
+def partition_prefix(source: str, hour: datetime) -> str:
+    return (
+        f"{LOG_ARCHIVE_PREFIX}/{source}/"
+        f"year={hour:%Y}/month={hour:%m}/day={hour:%d}/hour={hour:%H}/"
+    )
+
+
+def record_time(record: dict):
+    value = record.get("requestTime")
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, REQUEST_TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def matches(record: dict, start: datetime, end: datetime, route: str = None, status: str = None) -> bool:
+    if route and record.get("routeKey") != route:
+        return False
+    if status and str(record.get("status")) != status:
+        return False
+    when = record_time(record)
+    if when is not None and not (start <= when < end):
+        return False
+    return True
+
+
+def iter_json_lines(stream):
+    for line in io.TextIOWrapper(gzip.GzipFile(fileobj=stream), encoding="utf-8"):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            yield {"message": line}
+
+
+def iter_parquet(source, route: str = None):
+    if pq is None:
+        raise RuntimeError("pyarrow est requis pour lire l'archive Parquet")
+    filters = [("routeKey", "=", route)] if route else None
+    table = pq.read_table(source, filters=filters)
+    yield from table.to_pylist()
+
+
+class PeekedStream(io.RawIOBase):
+    """Flux dont les premiers octets ont déjà été lus pour reconnaître le format."""
+
+    def __init__(self, head: bytes, stream):
+        self.head = head
+        self.stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self.head:
+            size = min(len(buffer), len(self.head))
+            buffer[:size], self.head = self.head[:size], self.head[size:]
+            return size
+        data = self.stream.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def iter_object_records(name: str, opener, route: str = None):
+    # Les objets Parquet écrits avant l'ajout de l'extension se reconnaissent à leur en-tête ;
+    # seuls ceux-là sont mis en mémoire (pyarrow lit le pied de page), le gzip est lu en flux
+    with opener() as stream:
+        head = b"" if name.endswith(".parquet") else stream.read(len(PARQUET_MAGIC))
+        if name.endswith(".parquet") or head == PARQUET_MAGIC:
+            yield from iter_parquet(io.BytesIO(head + stream.read()), route)
+        else:
+            yield from iter_json_lines(io.BufferedReader(PeekedStream(head, stream)))
+
+
+class S3Archive:
+    def __init__(self, bucket: str):
+        import boto3
+
+        self.bucket = bucket
+        self.client = boto3.client("s3", region_name=REGION)
+
+    def list(self, prefix: str):
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"]
+
+    def open(self, key: str):
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+
+class LocalArchive:
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def list(self, prefix: str):
+        directory = self.root / prefix
+        if not directory.is_dir():
+            return
+        for path in sorted(directory.iterdir()):
+            if path.is_file():
+                yield str(path.relative_to(self.root))
+
+    def open(self, key: str):
+        return open(self.root / key, "rb")
+
+
+def query(archive, source: str, start: datetime, end: datetime, route: str = None, status: str = None):
+    for hour in iter_hours(start, end):
+        for key in archive.list(partition_prefix(source, hour)):
+            records = iter_object_records(key, lambda: archive.open(key), route)
+            for record in records:
+                if matches(record, start, end, route, status):
+                    yield record
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Requête sur l'archive de logs S3")
+    parser.add_argument("bucket")
+    parser.add_argument("source", choices=["api", "lambda"])
+    parser.add_argument("--start", type=parse_hour, required=True)
+    parser.add_argument("--end", type=parse_hour, required=True)
+    parser.add_argument("--route", help="routeKey exacte, ex: 'GET /api/items'")
+    parser.add_argument("--status", help="code HTTP exact")
+    parser.add_argument("--local", help="répertoire miroir de l'archive au lieu de S3")
+    args = parser.parse_args()
+
+    if args.end <= args.start:
+        print("La date de fin doit être postérieure à la date de début.")
+        sys.exit(1)
+
+    archive = LocalArchive(args.local) if args.local else S3Archive(args.bucket)
+
+    count = 0
+    try:
+        for record in query(archive, args.source, args.start, args.end, args.route, args.status):
+            sys.stdout.write(json.dumps(record) + "\n")
+            count += 1
+    except BrokenPipeError:
+        return
+    print(f"{count} enregistrement(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark du cache d'objets local (handler/object_cache.py) contre un S3 local.
+
+Usage:
+    python scripts/object_cache_benchmark.py [--endpoint-url http://localhost:9000]
+        [--small-kb 16] [--large-mb 8] [--iterations 200]
+
+Sans --endpoint-url, un serveur HTTP minimal (GET/PUT/HEAD avec ETag et
+If-None-Match) est démarré en local. Compare pour un petit et un gros objet :
+un GET S3 à chaque lecture, un hit mémoire, un hit disque, une lecture mmap et
+une revalidation conditionnelle (304).
+"""
+import argparse
+import hashlib
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_root / "handler"))
+
+from object_cache import ObjectCache  # noqa: E402
+
+BUCKET = "bench-data"
+
+
+class LocalS3Handler(BaseHTTPRequestHandler):
+    objects = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _key(self) -> str:
+        return self.path.split("?")[0].lstrip("/")
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if "/" in self._key():
+            self.objects[self._key()] = (body, f'"{hashlib.md5(body).hexdigest()}"')
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def _respond(self, send_body: bool):
+        stored = self.objects.get(self._key())
+        if stored is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body, etag = stored
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def start_local_s3() -> str:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LocalS3Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_client(endpoint_url: str):
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=endpoint_url,
+        region_name="us-east-1",
+        aws_access_key_id="bench",
+        aws_secret_access_key="bench",
+        config=Config(s3={"addressing_style": "path"}),
+    )
+
+
+def measure(func, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": statistics.fmean(samples),
+        "p50_ms": samples[len(samples) // 2],
+        "p99_ms": samples[min(int(len(samples) * 0.99), len(samples) - 1)],
+    }
+
+
+def run(client, args) -> dict:
+    objects = {
+        "small": ("reference/small.json", b"x" * (args.small_kb * 1024)),
+        "large": ("reference/large.bin", b"y" * (args.large_mb * 1024**2)),
+    }
+    try:
+        client.create_bucket(Bucket=BUCKET)
+    except Exception:
+        pass
+    for key, body in objects.values():
+        client.put_object(Bucket=BUCKET, Key=key, Body=body)
+
+    directory = tempfile.mkdtemp(prefix="object-cache-bench-")
+    cache = ObjectCache(BUCKET, s3_client=client, revalidate_after=3600, directory=directory)
+    revalidating = ObjectCache(BUCKET, s3_client=client, revalidate_after=0, directory=f"{directory}-revalidate")
+
+    results = {}
+    for label, (key, body) in objects.items():
+        cache.get(key)
+        revalidating.get(key)
+        results[f"{label} s3 get"] = measure(
+            lambda key=key: client.get_object(Bucket=BUCKET, Key=key)["Body"].read(), args.iterations
+        )
+        tier = "memory" if len(body) <= cache.small_object_bytes else "disk"
+        results[f"{label} {tier} hit"] = measure(lambda key=key: cache.get(key), args.iterations)
+        results[f"{label} revalidate 304"] = measure(lambda key=key: revalidating.get(key), args.iterations)
+
+    large_key = objects["large"][0]
+
+    def read_mmap():
+        with cache.open_mmap(large_key) as mapped:
+            mapped[: 64 * 1024]
+
+    results["large mmap 64 KiB"] = measure(read_mmap, args.iterations)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du cache d'objets local")
+    parser.add_argument("--endpoint-url", help="S3 local (MinIO, moto_server...), sinon serveur intégré")
+    parser.add_argument("--small-kb", type=int, default=16)
+    parser.add_argument("--large-mb", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    client = make_client(args.endpoint_url or start_local_s3())
+    results = run(client, args)
+
+    print(f"{'scénario':<24} {'moyenne ms':>11} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, stats in results.items():
+        print(f"{name:<24} {stats['mean_ms']:>11.3f} {stats['p50_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
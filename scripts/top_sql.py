@@ -0,0 +1,285 @@
+"""
+Rapport Top SQL : Performance Insights + différentiel de pg_stat_statements.
+
+Usage:
+    python scripts/top_sql.py snapshot --dsn <dsn> --output snap.json
+    python scripts/top_sql.py report [--instance main-db-dev] [--dsn <dsn> --interval 60]
+        [--before snap1.json --after snap2.json] [--bucket <data_bucket>] [--limit 20]
+
+Performance Insights donne le top SQL par charge (db.load.avg) sur la période.
+Deux snapshots de pg_stat_statements donnent, par requête, les appels, le temps
+moyen, un p95 estimé, les lignes et le ratio de hit du shared buffer.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_root = Path(__file__).resolve().parent.parent
+_dotenv = _root / ".env"
+if _dotenv.exists():
+    try:
+        import dotenv
+        dotenv.load_dotenv(_dotenv)
+    except ImportError:
+        pass
+
+
+REGION = os.getenv("AWS_REGION") or "eu-west-3"
+REPORT_PREFIX = "reports/top-sql"
+# Quantile 95 % d'une loi normale, le p95 reste une estimation à partir de la moyenne et de l'écart-type
+Z_95 = 1.645
+
+SNAPSHOT_QUERY = """
+SELECT queryid::text, query, calls, total_exec_time, mean_exec_time, stddev_exec_time,
+       rows, shared_blks_hit, shared_blks_read
+FROM pg_stat_statements
+WHERE calls > 0
+"""
+
+
+def take_snapshot(conn) -> dict:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SNAPSHOT_QUERY)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    statements = {}
+    for queryid, query, calls, total, mean, stddev, rows_count, hit, read in rows:
+        statements[queryid] = {
+            "query": query,
+            "calls": int(calls),
+            "total_time": float(total),
+            "mean_time": float(mean),
+            "stddev_time": float(stddev),
+            "rows": int(rows_count),
+            "shared_blks_hit": int(hit),
+            "shared_blks_read": int(read),
+        }
+
+    return {
+        "taken_at": datetime.now(timezone.utc).isoformat(),
+        "statements": statements,
+    }
+
+
+def sum_of_squares(stats: dict) -> float:
+    return (stats["stddev_time"] ** 2 + stats["mean_time"] ** 2) * stats["calls"]
+
+
+def diff_snapshots(before: dict, after: dict) -> list[dict]:
+    results = []
+    for queryid, current in after["statements"].items():
+        previous = before["statements"].get(queryid)
+        # Une baisse des compteurs signifie un reset de pg_stat_statements entre les deux snapshots
+        if previous is None or current["calls"] < previous["calls"]:
+            previous = {
+                "calls": 0, "total_time": 0.0, "mean_time": 0.0, "stddev_time": 0.0,
+                "rows": 0, "shared_blks_hit": 0, "shared_blks_read": 0,
+            }
+
+        calls = current["calls"] - previous["calls"]
+        if calls <= 0:
+            continue
+
+        total_time = current["total_time"] - previous["total_time"]
+        mean_time = total_time / calls
+        variance = max((sum_of_squares(current) - sum_of_squares(previous)) / calls - mean_time**2, 0.0)
+        hit = current["shared_blks_hit"] - previous["shared_blks_hit"]
+        read = current["shared_blks_read"] - previous["shared_blks_read"]
+
+        results.append(
+            {
+                "queryid": queryid,
+                "query": current["query"],
+                "calls": calls,
+                "total_time_ms": total_time,
+                "mean_time_ms": mean_time,
+                "p95_time_ms": mean_time + Z_95 * math.sqrt(variance),
+                "rows": current["rows"] - previous["rows"],
+                "hit_ratio": hit / (hit + read) if hit + read else None,
+            }
+        )
+
+    results.sort(key=lambda row: row["total_time_ms"], reverse=True)
+    return results
+
+
+def get_resource_id(rds_client, instance_identifier: str) -> str:
+    resp = rds_client.describe_db_instances(DBInstanceIdentifier=instance_identifier)
+    return resp["DBInstances"][0]["DbiResourceId"]
+
+
+def top_sql_from_pi(pi_client, resource_id: str, start: datetime, end: datetime, limit: int = 10) -> list[dict]:
+    resp = pi_client.describe_dimension_keys(
+        ServiceType="RDS",
+        Identifier=resource_id,
+        StartTime=start,
+        EndTime=end,
+        Metric="db.load.avg",
+        GroupBy={"Group": "db.sql_tokenized", "Limit": limit},
+    )
+
+    results = []
+    for key in resp.get("Keys", []):
+        dimensions = key.get("Dimensions", {})
+        results.append(
+            {
+                "sql_id": dimensions.get("db.sql_tokenized.id"),
+                "statement": dimensions.get("db.sql_tokenized.statement"),
+                "db_load": key.get("Total", 0.0),
+            }
+        )
+    return results
+
+
+def format_ms(value) -> str:
+    return "-" if value is None else f"{value:.2f}"
+
+
+def render_table(report: dict, width: int = 60) -> str:
+    lines = []
+    if report.get("performance_insights"):
+        lines.append("Top SQL par charge (Performance Insights)")
+        lines.append(f"{'load':>8}  statement")
+        for row in report["performance_insights"]:
+            statement = " ".join((row["statement"] or "").split())[:width]
+            lines.append(f"{row['db_load']:>8.3f}  {statement}")
+        lines.append("")
+
+    if report.get("statements"):
+        lines.append("pg_stat_statements (différentiel)")
+        lines.append(
+            f"{'calls':>8} {'total ms':>12} {'mean ms':>10} {'p95~ ms':>10} {'rows':>10} {'hit %':>7}  query"
+        )
+        for row in report["statements"]:
+            hit = "-" if row["hit_ratio"] is None else f"{row['hit_ratio'] * 100:.1f}"
+            query = " ".join(row["query"].split())[:width]
+            lines.append(
+                f"{row['calls']:>8} {row['total_time_ms']:>12.1f} {format_ms(row['mean_time_ms']):>10} "
+                f"{format_ms(row['p95_time_ms']):>10} {row['rows']:>10} {hit:>7}  {query}"
+            )
+
+    return "\n".join(lines)
+
+
+def upload_report(s3_client, bucket: str, report: dict) -> str:
+    key = f"{REPORT_PREFIX}/{report['generated_at'][:10]}/{report['generated_at']}.json"
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=json.dumps(report, indent=2).encode("utf-8"),
+        ContentType="application/json",
+    )
+    return key
+
+
+def connect(dsn: str):
+    import psycopg
+
+    return psycopg.connect(dsn, autocommit=True)
+
+
+def load_snapshot(path: str) -> dict:
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def build_report(args, pi_client=None, rds_client=None, conn=None) -> dict:
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(minutes=args.minutes)
+    report = {"generated_at": end.strftime("%Y-%m-%dT%H-%M-%SZ")}
+
+    if args.instance:
+        resource_id = get_resource_id(rds_client, args.instance)
+        report["instance"] = args.instance
+        report["performance_insights"] = top_sql_from_pi(pi_client, resource_id, start, end, args.limit)
+
+    if args.before and args.after:
+        before, after = load_snapshot(args.before), load_snapshot(args.after)
+    elif conn is not None:
+        before = take_snapshot(conn)
+        time.sleep(args.interval)
+        after = take_snapshot(conn)
+    else:
+        before = after = None
+
+    if before is not None:
+        report["statements"] = diff_snapshots(before, after)[: args.limit]
+
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rapport Top SQL")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snapshot = sub.add_parser("snapshot")
+    snapshot.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    snapshot.add_argument("--output", required=True)
+
+    report = sub.add_parser("report")
+    report.add_argument("--instance", help="identifiant RDS pour Performance Insights")
+    report.add_argument("--minutes", type=int, default=60)
+    report.add_argument("--dsn", default=os.getenv("DATABASE_URL"))
+    report.add_argument("--interval", type=int, default=60, help="secondes entre les deux snapshots")
+    report.add_argument("--before")
+    report.add_argument("--after")
+    report.add_argument("--bucket", help="bucket data où écrire le rapport")
+    report.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        if not args.dsn:
+            print("--dsn ou DATABASE_URL requis.")
+            sys.exit(1)
+        conn = connect(args.dsn)
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(take_snapshot(conn), handle)
+        conn.close()
+        print(f"Snapshot écrit dans {args.output}")
+        return
+
+    pi_client = rds_client = conn = None
+    # botocore n'est requis que pour Performance Insights : un rapport sur Postgres local s'en passe
+    aws_errors = ()
+    if args.instance:
+        import boto3
+        from botocore.exceptions import ClientError
+
+        pi_client = boto3.client("pi", region_name=REGION)
+        rds_client = boto3.client("rds", region_name=REGION)
+        aws_errors = (ClientError,)
+    if args.dsn and not (args.before and args.after):
+        try:
+            conn = connect(args.dsn)
+        except Exception as e:
+            print(f"Base injoignable, pg_stat_statements ignoré: {e}", file=sys.stderr)
+
+    try:
+        result = build_report(args, pi_client, rds_client, conn)
+    except aws_errors as e:
+        print(f"Erreur AWS: {e.response['Error']['Code']} - {e.response['Error']['Message']}")
+        sys.exit(1)
+    finally:
+        if conn is not None:
+            conn.close()
+
+    print(render_table(result))
+
+    if args.bucket:
+        import boto3
+
+        key = upload_report(boto3.client("s3", region_name=REGION), args.bucket, result)
+        print(f"Rapport écrit dans s3://{args.bucket}/{key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Pulumi mocks: évaluation du programme et des factories infra sans compte AWS ni réseau
+"""
+import collections
+import runpy
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pulumi
+import pytest
+from pulumi.runtime import mocks, settings
+from pulumi.runtime.stack import wait_for_rpcs
+from pulumi.runtime.sync_await import _sync_await
+
+ROOT = Path(__file__).resolve().parent.parent
+PROJECT = "cloud-module"
+ACCOUNT_ID = "123456789012"
+REGION = "eu-west-3"
+AVAILABILITY_ZONES = ["eu-west-3a", "eu-west-3b", "eu-west-3c"]
+
+
+@dataclass
+class Registration:
+    urn: str
+    type: str
+    name: str
+    inputs: dict
+    parent: str
+    dependencies: list[str]
+
+
+@dataclass
+class Evaluation:
+    resources: list[Registration] = field(default_factory=list)
+    invokes: collections.Counter = field(default_factory=collections.Counter)
+    exports: dict = field(default_factory=dict)
+    result: object = None
+    seconds: float = 0.0
+    peak_bytes: int = 0
+    applies: int = 0
+
+    def of_type(self, type_: str) -> list[Registration]:
+        return [resource for resource in self.resources if resource.type == type_]
+
+    def named(self, name: str) -> Registration:
+        matches = [resource for resource in self.resources if resource.name == name]
+        assert len(matches) == 1, f"{len(matches)} resources named '{name}'"
+        return matches[0]
+
+    def counts(self) -> collections.Counter:
+        return collections.Counter(resource.type for resource in self.resources)
+
+
+class Mocks(pulumi.runtime.Mocks):
+    def __init__(self, evaluation: Evaluation, stack_outputs: dict):
+        self.evaluation = evaluation
+        self.stack_outputs = stack_outputs
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        outputs = dict(args.inputs)
+        outputs.setdefault("arn", f"arn:aws:mock:{REGION}:{ACCOUNT_ID}:{args.name}")
+        outputs.setdefault("name", args.name)
+
+        if args.typ == "random:index/randomPassword:RandomPassword":
+            outputs["result"] = "p" * int(args.inputs["length"])
+        elif args.typ == "aws:rds/instance:Instance":
+            outputs.setdefault("address", f"{args.name}.rds.local")
+            outputs.setdefault("endpoint", f"{args.name}.rds.local:5432")
+            outputs.setdefault("port", 5432)
+            if args.inputs.get("manageMasterUserPassword"):
+                outputs["masterUserSecrets"] = [
+                    {"secretArn": f"arn:aws:secretsmanager:{REGION}:{ACCOUNT_ID}:secret:rds", "secretStatus": "active"}
+                ]
+        elif args.typ == "aws:rds/cluster:Cluster":
+            outputs.setdefault("endpoint", f"{args.name}.cluster.local")
+            outputs.setdefault("readerEndpoint", f"{args.name}.cluster-ro.local")
+            outputs.setdefault("port", 5432)
+            if args.inputs.get("manageMasterUserPassword"):
+                outputs["masterUserSecrets"] = [
+                    {"secretArn": f"arn:aws:secretsmanager:{REGION}:{ACCOUNT_ID}:secret:rds", "secretStatus": "active"}
+                ]
+        elif args.typ == "aws:elasticache/serverlessCache:ServerlessCache":
+            outputs["endpoints"] = [{"address": f"{args.name}.cache.local", "port": 6379}]
+        elif args.typ == "aws:serverlessrepository/cloudFormationStack:CloudFormationStack":
+            outputs["outputs"] = {"RotationLambdaARN": f"arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:rotation"}
+        elif args.typ == "pulumi:pulumi:StackReference":
+            layer = args.name.rsplit("-", 1)[-1]
+            outputs["outputs"] = self.stack_outputs.get(layer, {})
+
+        return [f"{args.name}-id", outputs]
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        self.evaluation.invokes[args.token] += 1
+
+        if args.token == "aws:index/getAvailabilityZones:getAvailabilityZones":
+            return {"names": AVAILABILITY_ZONES, "zoneIds": [f"euw3-az{i + 1}" for i in range(len(AVAILABILITY_ZONES))]}
+        if args.token == "aws:index/getCallerIdentity:getCallerIdentity":
+            return {"accountId": ACCOUNT_ID, "arn": f"arn:aws:iam::{ACCOUNT_ID}:user/test", "userId": "test"}
+        if args.token == "aws:index/getRegion:getRegion":
+            return {"name": REGION, "id": REGION}
+        return {}
+
+
+class RecordingMonitor(mocks.MockMonitor):
+    """Garde le parent et les dépendances de chaque ressource, absents de MockResourceArgs."""
+
+    def __init__(self, mocks_: Mocks, evaluation: Evaluation):
+        super().__init__(mocks_)
+        self.evaluation = evaluation
+
+    def RegisterResource(self, request):
+        response = super().RegisterResource(request)
+        if request.type != "pulumi:pulumi:Stack":
+            self.evaluation.resources.append(
+                Registration(
+                    urn=response.urn,
+                    type=request.type,
+                    name=request.name,
+                    inputs=pulumi.runtime.rpc.deserialize_properties(request.object),
+                    parent=request.parent,
+                    dependencies=list(request.dependencies),
+                )
+            )
+        return response
+
+
+def reload_infra() -> None:
+    # La configuration est lue à l'import des modules infra : chaque évaluation repart de zéro
+    for module in [name for name in sys.modules if name == "infra" or name.startswith("infra.")]:
+        del sys.modules[module]
+
+
+def evaluate(
+    program=None,
+    config: dict = None,
+    stack: str = "dev",
+    stack_outputs: dict = None,
+    preview: bool = False,
+    measure: bool = False,
+) -> Evaluation:
+    """
+    Évalue `__main__.py` (ou `program`, un callable) avec des mocks et renvoie le graphe de ressources.
+
+    `config` prend des clés sans namespace (`{"environment": "prod"}`) ; `stack_outputs`
+    fournit les sorties des StackReference par couche.
+    """
+    evaluation = Evaluation()
+    # Pas de fichier de cache d'invokes par défaut : chaque évaluation compte ses propres appels
+    full_config = {"aws:region": REGION, f"{PROJECT}:environment": stack, f"{PROJECT}:invoke_cache": "false"}
+    full_config.update({key if ":" in key else f"{PROJECT}:{key}": str(value) for key, value in (config or {}).items()})
+
+    pulumi.runtime.set_all_config(full_config)
+    settings.ROOT.set(None)
+    monitor = RecordingMonitor(Mocks(evaluation, stack_outputs or {}), evaluation)
+    pulumi.runtime.set_mocks(monitor.mocks, project=PROJECT, stack=stack, preview=preview, monitor=monitor)
+    reload_infra()
+
+    apply = pulumi.Output.apply
+
+    def counted_apply(self, *args, **kwargs):
+        evaluation.applies += 1
+        return apply(self, *args, **kwargs)
+
+    pulumi.Output.apply = counted_apply
+    if measure:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        if program is None:
+            runpy.run_path(str(ROOT / "__main__.py"), run_name="__main__")
+        else:
+            evaluation.result = program()
+        _sync_await(wait_for_rpcs())
+    finally:
+        evaluation.seconds = time.perf_counter() - started
+        if measure:
+            evaluation.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        pulumi.Output.apply = apply
+
+    evaluation.exports = dict(settings.get_root_resource().outputs)
+    return evaluation
+
+
+def resolve(output) -> object:
+    """Valeur d'un Output après évaluation (les mocks ne laissent aucune valeur inconnue)."""
+    values = []
+    pulumi.Output.from_input(output).apply(values.append)
+    _sync_await(wait_for_rpcs())
+    return values[0] if values else None
+
+
+@pytest.fixture
+def program():
+    return evaluate
@@ -0,0 +1,90 @@
+import gzip
+import json
+import random
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from access_log_analyzer import QuantileSketch, analyze, analyze_file, expand_paths, merge_stats, summarize
+
+
+def latencies(count: int, seed: int = 7) -> list[float]:
+    rng = random.Random(seed)
+    return [round(rng.lognormvariate(4, 1.2), 3) for _ in range(count)] + [0.0] * 10
+
+
+def sketch_of(values, alpha=0.01) -> QuantileSketch:
+    sketch = QuantileSketch(alpha)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05])
+def test_quantiles_stay_within_the_relative_error_bound(alpha):
+    values = latencies(20000)
+    sketch = sketch_of(values, alpha)
+    ordered = sorted(values)
+
+    for q in (0.0, 0.1, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=alpha, abs=1e-9)
+
+
+def test_merged_sketches_match_a_single_sketch():
+    values = latencies(5000)
+    parts = [sketch_of(values[i::4]) for i in range(4)]
+
+    merged = QuantileSketch()
+    for part in parts:
+        merged.merge(part)
+    single = sketch_of(values)
+
+    assert merged.buckets == single.buckets
+    assert (merged.count, merged.zero_count, merged.min, merged.max) == (
+        single.count, single.zero_count, single.min, single.max,
+    )
+    assert [merged.quantile(q) for q in (0.5, 0.95, 0.99)] == [single.quantile(q) for q in (0.5, 0.95, 0.99)]
+
+
+def test_sketches_of_different_precision_do_not_merge():
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+def records(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "routeKey": rng.choice(["GET /api/items", "POST /api/items"]),
+            "responseLatency": str(rng.randint(5, 900)),
+            "integrationLatency": str(rng.randint(1, 5)),
+        }
+        for _ in range(count)
+    ]
+
+
+def test_archive_files_in_every_format_are_analyzed_and_merged(tmp_path):
+    batches = [records(300, seed) for seed in range(4)]
+    (tmp_path / "a.jsonl").write_text("\n".join(json.dumps(record) for record in batches[0]))
+    (tmp_path / "b.jsonl.gz").write_bytes(gzip.compress("\n".join(json.dumps(record) for record in batches[1]).encode()))
+    pq.write_table(pa.Table.from_pylist(batches[2]), tmp_path / "c.parquet")
+    # Objet Parquet de l'archive Firehose sans extension
+    pq.write_table(pa.Table.from_pylist(batches[3]), tmp_path / "d")
+
+    # Comme les workers : un sketch par fichier, fusionnés ensuite
+    per_file = {}
+    for path in expand_paths([str(tmp_path)]):
+        merge_stats(per_file, analyze_file(path))
+    everything = [record for batch in batches for record in batch]
+    single = tmp_path.parent / "single.jsonl"
+    single.write_text("\n".join(json.dumps(record) for record in everything))
+
+    sequential = summarize(per_file)
+
+    assert sum(row["count"] for row in sequential) == 1200
+    assert sequential == summarize(analyze([str(single)]))
+    get_items = [float(r["responseLatency"]) for r in everything if r["routeKey"] == "GET /api/items"]
+    row = next(row for row in sequential if row["route"] == "GET /api/items")
+    assert row["total_p50"] == pytest.approx(sorted(get_items)[int(0.5 * (len(get_items) - 1))], rel=0.01)
@@ -0,0 +1,66 @@
+import pytest
+
+from infra.api_routes import Route, RouteFunction, resolve_route_table
+from infra.capacity import resolve_capacity
+
+ROUTES = {
+    "exports": {
+        "memory_size": 2048,
+        "timeout": 120,
+        "reserved_concurrency": 10,
+        "routes": {"POST /api/exports": {"burst": 5, "rate": 2}, "GET /api/exports/{proxy+}": None},
+    },
+    "health": {"memory_size": 128, "timeout": 5, "routes": {"GET /health/db": {"burst": 50, "rate": 100}}},
+}
+
+
+def test_functions_take_their_share_of_the_connection_budget():
+    table = resolve_route_table(ROUTES, resolve_capacity("prod"))
+
+    assert table["functions"][0] == RouteFunction(
+        name="exports",
+        memory_size=2048,
+        timeout=120,
+        reserved_concurrency=10,
+        routes=(Route("POST /api/exports", burst=5, rate=2.0), Route("GET /api/exports/{proxy+}")),
+    )
+    assert table["functions"][0].routes[1].slug == "get-api-exports-proxy"
+    assert table["handler_max_concurrency"] == 310
+    assert table["handler_reserved_concurrency"] == 310
+
+
+def test_unset_sizes_follow_the_capacity_profile():
+    table = resolve_route_table({"health": {"routes": {"GET /health/db": {}}}}, resolve_capacity("dev"))
+
+    function = table["functions"][0]
+    assert (function.memory_size, function.timeout, function.reserved_concurrency) == (256, 30, None)
+    # Profil dev : pas de concurrence réservée pour api-handler
+    assert table["handler_reserved_concurrency"] is None
+
+
+def test_empty_table_keeps_the_capacity_values():
+    capacity = resolve_capacity("prod")
+
+    table = resolve_route_table({}, capacity)
+
+    assert table["functions"] == []
+    assert table["handler_reserved_concurrency"] == capacity["lambda_reserved_concurrency"]
+
+
+@pytest.mark.parametrize(
+    "spec, message",
+    [
+        ({"handler": {"routes": {"GET /x": {}}}}, "Invalid route function name"),
+        ({"exports": {"routes": {}}}, "has no routes"),
+        ({"exports": {"routes": {"/api/exports": {}}}}, "Invalid route key"),
+        ({"exports": {"routes": {"ANY /api/{proxy+}": {}}}}, "served by api-handler"),
+        ({"a": {"routes": {"GET /a-b": {}}}, "b": {"routes": {"GET /a/b": {}}}}, "conflicts with"),
+        ({"exports": {"timeout": 1000, "routes": {"GET /x": {}}}}, "timeout"),
+        ({"exports": {"memory": 512, "routes": {"GET /x": {}}}}, "Unknown settings"),
+        ({"exports": {"routes": {"GET /x": {"burst": -1}}}}, "must not be negative"),
+        ({"exports": {"reserved_concurrency": 320, "routes": {"GET /x": {}}}}, "none is left for api-handler"),
+    ],
+)
+def test_invalid_tables_are_rejected(spec, message):
+    with pytest.raises(ValueError, match=message):
+        resolve_route_table(spec, resolve_capacity("prod"))
@@ -0,0 +1,77 @@
+"""
+Budgets d'évaluation du programme : durée, mémoire, Output.apply et invokes.
+
+Les invokes et les chaînes apply s'exécutent à chaque preview/up : un dépassement
+signale une régression du chemin critique du déploiement. Les budgets laissent
+une marge d'environ 10 % sur les valeurs mesurées ; les abaisser quand une
+optimisation les réduit. La durée dépend de la machine : elle n'est mesurée
+qu'avec `pytest -m benchmark`.
+"""
+import statistics
+
+import pytest
+
+from conftest import evaluate
+
+RUNS = 5
+MAX_MEDIAN_SECONDS = 1.5
+MAX_PEAK_BYTES = 16 * 1024 * 1024
+
+# Par environnement : Output.apply et invokes par token pendant une évaluation
+BUDGETS = {
+    "dev": {
+        "applies": 660,
+        "invokes": {
+            "aws:index/getAvailabilityZones:getAvailabilityZones": 1,
+            "aws:index/getCallerIdentity:getCallerIdentity": 1,
+        },
+    },
+    "prod": {
+        "applies": 760,
+        "invokes": {
+            "aws:index/getAvailabilityZones:getAvailabilityZones": 1,
+            "aws:index/getCallerIdentity:getCallerIdentity": 1,
+        },
+    },
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warm_imports():
+    # Le premier import de pulumi_aws domine, il n'est pas compté
+    evaluate()
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("environment", sorted(BUDGETS))
+def test_evaluation_time(environment):
+    durations = [evaluate(config={"environment": environment}, stack=environment).seconds for _ in range(RUNS)]
+
+    median = statistics.median(durations)
+    print(f"{environment}: median {median * 1000:.0f} ms, min {min(durations) * 1000:.0f} ms over {RUNS} runs")
+    assert median <= MAX_MEDIAN_SECONDS
+
+
+@pytest.mark.parametrize("environment", sorted(BUDGETS))
+def test_peak_memory(environment):
+    evaluation = evaluate(config={"environment": environment}, stack=environment, measure=True)
+
+    print(f"{environment}: peak {evaluation.peak_bytes / 2**20:.1f} MiB")
+    assert evaluation.peak_bytes <= MAX_PEAK_BYTES
+
+
+@pytest.mark.parametrize("environment", sorted(BUDGETS))
+def test_apply_chains(environment):
+    evaluation = evaluate(config={"environment": environment}, stack=environment)
+
+    print(f"{environment}: {evaluation.applies} Output.apply for {len(evaluation.resources)} resources")
+    assert evaluation.applies <= BUDGETS[environment]["applies"]
+
+
+@pytest.mark.parametrize("environment", sorted(BUDGETS))
+def test_invokes(environment):
+    evaluation = evaluate(config={"environment": environment}, stack=environment)
+
+    assert set(evaluation.invokes) <= set(BUDGETS[environment]["invokes"]), "new invoke in the program"
+    for token, count in evaluation.invokes.items():
+        assert count <= BUDGETS[environment]["invokes"][token], token
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from cache import ReadThroughCache
+
+
+class FakeRedis:
+    """Sous-ensemble de redis.Redis utilisé par le cache : get/set (ex, nx, px)/incr/delete/ttl."""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _live(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    def get(self, key):
+        with self.lock:
+            item = self._live(key)
+            return None if item is None else item[0]
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self.lock:
+            if nx and self._live(key) is not None:
+                return None
+            seconds = ex if ex is not None else (px / 1000 if px is not None else None)
+            expires = None if seconds is None else time.monotonic() + seconds
+            self.data[key] = (value if isinstance(value, bytes) else str(value).encode(), expires)
+            return True
+
+    def incr(self, key):
+        with self.lock:
+            item = self._live(key)
+            value = int(item[0]) + 1 if item else 1
+            self.data[key] = (str(value).encode(), None)
+            return value
+
+    def delete(self, key):
+        with self.lock:
+            return int(self.data.pop(key, None) is not None)
+
+    def ttl(self, key):
+        with self.lock:
+            item = self._live(key)
+            if item is None:
+                return -2
+            return -1 if item[1] is None else round(item[1] - time.monotonic())
+
+
+@pytest.fixture(params=["fake", "redis"])
+def client(request):
+    if request.param == "fake":
+        return FakeRedis()
+    # Redis local : REDIS_URL=redis://localhost:6379/15 python -m pytest tests/test_cache.py
+    url = os.getenv("REDIS_URL")
+    if not url:
+        pytest.skip("REDIS_URL non défini")
+    redis = pytest.importorskip("redis")
+    real = redis.Redis.from_url(url)
+    try:
+        real.ping()
+    except redis.RedisError:
+        pytest.skip(f"Redis injoignable sur {url}")
+    return real
+
+
+@pytest.fixture
+def cache(client):
+    # Espace de noms propre à chaque test : rien à nettoyer sur un Redis partagé
+    return ReadThroughCache(client, namespace=f"test-{uuid.uuid4().hex[:8]}", default_ttl=300, negative_ttl=30)
+
+
+def counting_loader(value):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return value
+
+    return loader, calls
+
+
+def test_second_read_is_a_hit(cache):
+    loader, calls = counting_loader({"id": 1, "name": "item"})
+
+    assert cache.get("items", "1", loader) == {"id": 1, "name": "item"}
+    assert cache.get("items", "1", loader) == {"id": 1, "name": "item"}
+
+    assert len(calls) == 1
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.loads) == (1, 1, 1)
+
+
+def test_entries_expire_after_their_ttl(cache, client):
+    cache.get("items", "1", lambda: {"id": 1})
+    cache.get("items", "2", lambda: {"id": 2}, ttl=60)
+
+    assert 290 <= client.ttl(cache.make_key("items", "1")) <= 300
+    assert 50 <= client.ttl(cache.make_key("items", "2")) <= 60
+
+
+def test_absent_values_are_cached_with_the_negative_ttl(cache, client):
+    loader, calls = counting_loader(None)
+
+    assert cache.get("items", "404", loader) is None
+    assert cache.get("items", "404", loader) is None
+
+    assert len(calls) == 1
+    assert 20 <= client.ttl(cache.make_key("items", "404")) <= 30
+
+
+def test_invalidation_bumps_the_group_version(cache):
+    cache.get("items", "1", lambda: "old")
+    cache.get("users", "1", lambda: "user")
+
+    assert cache.invalidate("items") == 1
+
+    assert cache.get("items", "1", lambda: "new") == "new"
+    # Les autres groupes gardent leurs entrées
+    assert cache.get("users", "1", lambda: pytest.fail("reloaded")) == "user"
+
+
+def test_concurrent_misses_load_once_per_container(cache):
+    release = threading.Event()
+    loader_calls = []
+
+    def slow_loader():
+        loader_calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("items", "hot", slow_loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Les suiveurs sont enregistrés avant que le chargement se termine
+    deadline = time.monotonic() + 5
+    while cache.stats.coalesced < 7 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 8
+    assert len(loader_calls) == 1
+    assert cache.stats.coalesced == 7
+
+
+def test_another_container_holding_the_lock_is_awaited(client):
+    cache = ReadThroughCache(client, namespace=f"test-{uuid.uuid4().hex[:8]}", lock_ttl_ms=2000, wait_interval=0.01)
+    cache_key = cache.make_key("items", "hot")
+    client.set(f"{cache_key}:lock", "other-container", nx=True, px=2000)
+    waits = []
+
+    def sleep(seconds):
+        # L'autre conteneur publie sa valeur pendant l'attente
+        waits.append(seconds)
+        if len(waits) == 3:
+            client.set(cache_key, '"from-other"', ex=60)
+        time.sleep(seconds)
+
+    cache._sleep = sleep
+
+    assert cache.get("items", "hot", lambda: pytest.fail("loaded twice")) == "from-other"
+    assert cache.stats.loads == 0
+
+
+def test_unavailable_cache_serves_from_the_source():
+    class Down:
+        def get(self, key):
+            raise ConnectionError("cache down")
+
+    cache = ReadThroughCache(Down())
+
+    assert cache.get("items", "1", lambda: "from-db") == "from-db"
+    assert (cache.stats.errors, cache.stats.loads) == (1, 1)
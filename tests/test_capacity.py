@@ -0,0 +1,68 @@
+import pytest
+
+from infra.capacity import CAPACITY_PROFILES, resolve_capacity
+
+
+@pytest.mark.parametrize(
+    ("profile", "max_connections", "lambda_concurrency", "reserved", "cpu_alarm", "duration_alarm"),
+    [
+        # Le dev garde les seuils d'avant les profils
+        ("dev", 100, 80, None, 80, 25000),
+        ("staging", 400, 320, 320, 70, 24000),
+        ("prod", 400, 320, 320, 80, 24000),
+    ],
+)
+def test_profile_values(profile, max_connections, lambda_concurrency, reserved, cpu_alarm, duration_alarm):
+    capacity = resolve_capacity(profile)
+
+    assert capacity["name"] == profile
+    assert capacity["db_max_connections"] == max_connections
+    # 80 % des connexions PostgreSQL pour les Lambdas
+    assert capacity["lambda_max_concurrency"] == lambda_concurrency
+    assert capacity["lambda_reserved_concurrency"] == reserved
+    assert capacity["alarm_rds_cpu_percent"] == cpu_alarm
+    assert capacity["alarm_lambda_duration_ms"] == duration_alarm
+    # Mêmes seuils de connexions et de stockage qu'avant les profils en dev
+    if profile == "dev":
+        assert capacity["alarm_rds_connections"] == 80
+        assert capacity["alarm_rds_free_storage_bytes"] == 5 * 1024**3
+
+
+def test_pinned_duration_alarm_stays_below_the_timeout():
+    assert resolve_capacity("dev", {"lambda_timeout": 60})["alarm_lambda_duration_ms"] == 25000
+    assert resolve_capacity("dev", {"lambda_timeout": 20})["alarm_lambda_duration_ms"] == 16000
+
+
+def test_overrides_ignore_unset_values():
+    capacity = resolve_capacity("dev", {"lambda_memory_size": 512, "lambda_timeout": None})
+
+    assert capacity["lambda_memory_size"] == 512
+    assert capacity["lambda_timeout"] == CAPACITY_PROFILES["dev"]["lambda_timeout"]
+
+
+def test_aurora_memory_follows_max_acu():
+    capacity = resolve_capacity("dev", {"db_engine": "aurora-serverless"})
+
+    assert capacity["db_memory_gib"] == 4
+    assert capacity["db_max_connections"] == 400
+    # Pas de crédits CPU sur Aurora Serverless
+    assert capacity["alarm_rds_cpu_percent"] == 80
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"db_engine": "mysql"},
+        {"db_storage_iops": 3000, "db_allocated_storage": 100},
+        {"lambda_ephemeral_storage": 256},
+        {"db_min_acu": 4, "db_max_acu": 2},
+    ],
+)
+def test_invalid_overrides(overrides):
+    with pytest.raises(ValueError):
+        resolve_capacity("dev", overrides)
+
+
+def test_unknown_profile():
+    with pytest.raises(ValueError, match="Unknown capacity profile"):
+        resolve_capacity("qa")
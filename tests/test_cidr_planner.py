@@ -0,0 +1,180 @@
+import ipaddress
+
+import pytest
+
+from infra.cidr_planner import (
+    AWS_RESERVED_ADDRESSES,
+    MIN_SUBNET_PREFIX,
+    SubnetDemand,
+    addresses_per_az,
+    lambda_addresses,
+    legacy_plan,
+    plan_subnets,
+    prefix_for,
+    tier_slots,
+    validate_allocations,
+)
+
+PROD_DEMAND = SubnetDemand(
+    peak_concurrency=320,
+    lambda_memory_mb=1024,
+    interface_endpoints=2,
+    cache_nodes=2,
+    db_instances=2,
+    nat_gateways=2,
+)
+
+
+def test_lambda_addresses_follow_memory_ratio():
+    assert lambda_addresses(SubnetDemand()) == 0
+    # 320 x 1024 / 3072 = 106.7
+    assert lambda_addresses(SubnetDemand(peak_concurrency=320, lambda_memory_mb=1024)) == 107
+    # Jamais moins d'une adresse par fonction
+    assert lambda_addresses(SubnetDemand(peak_concurrency=1, lambda_memory_mb=128, lambda_functions=3)) == 3
+
+
+def test_addresses_per_az_spreads_shared_demand():
+    assert addresses_per_az(PROD_DEMAND, 2) == {
+        "public": 1,
+        "private": 54 + 2,
+        "data": 2 + 1,
+    }
+
+
+@pytest.mark.parametrize(
+    ("addresses", "growth", "prefix"),
+    [
+        (0, 2.0, MIN_SUBNET_PREFIX),
+        (3, 2.0, MIN_SUBNET_PREFIX),
+        # 56 x 2 + 5 = 117 -> 128 adresses
+        (56, 2.0, 25),
+        (56, 1.0, 26),
+        (251, 1.0, 24),
+        (252, 1.0, 23),
+    ],
+)
+def test_prefix_for(addresses, growth, prefix):
+    assert prefix_for(addresses, growth) == prefix
+    assert 2 ** (32 - prefix) >= addresses * growth + AWS_RESERVED_ADDRESSES
+
+
+def test_prefix_for_rejects_demand_larger_than_a_vpc():
+    with pytest.raises(ValueError):
+        prefix_for(70000, 1.0)
+
+
+def test_plan_sizes_subnets_in_fixed_slots():
+    plan = plan_subnets("10.0.0.0/16", 2, PROD_DEMAND)
+
+    # Un quart du VPC par niveau, un /21 par AZ dans chaque quart
+    assert plan.cidrs("public") == ["10.0.0.0/28", "10.0.8.0/28"]
+    assert plan.cidrs("private") == ["10.0.64.0/25", "10.0.72.0/25"]
+    assert plan.cidrs("data") == ["10.0.128.0/28", "10.0.136.0/28"]
+    validate_allocations(ipaddress.ip_network("10.0.0.0/16"), plan.allocated())
+
+
+def test_plan_skips_reserved_ranges():
+    plan = plan_subnets("10.0.0.0/16", 3, PROD_DEMAND, existing=["10.0.0.0/20"])
+
+    reserved = ipaddress.ip_network("10.0.0.0/20")
+    assert len(plan.allocated()) == 9
+    assert not any(network.overlaps(reserved) for network in plan.allocated())
+
+
+def test_plan_keeps_growth_reserve():
+    # 18 sous-réseaux /27 dans un /22 : plus de la moitié du VPC
+    with pytest.raises(ValueError, match="leaving less than 50%"):
+        plan_subnets("10.0.0.0/22", 6, SubnetDemand(), min_prefix={"public": 27, "private": 27, "data": 27})
+
+
+def test_subnet_larger_than_its_slot_is_rejected():
+    with pytest.raises(ValueError, match="does not fit in its /28 slot"):
+        plan_subnets("10.0.0.0/23", 2, PROD_DEMAND)
+
+
+@pytest.mark.parametrize("vpc_cidr", ["10.0.0.0/8", "10.0.0.0/24", "fd00::/56"])
+def test_plan_rejects_invalid_vpc(vpc_cidr):
+    with pytest.raises(ValueError):
+        plan_subnets(vpc_cidr, 2, PROD_DEMAND)
+
+
+def test_reserved_ranges_must_fit_the_vpc():
+    with pytest.raises(ValueError, match="outside"):
+        plan_subnets("10.0.0.0/16", 2, PROD_DEMAND, existing=["192.168.0.0/24"])
+    with pytest.raises(ValueError, match="Overlapping"):
+        plan_subnets("10.0.0.0/16", 2, PROD_DEMAND, existing=["10.0.0.0/24", "10.0.0.128/25"])
+
+
+def test_reserved_ranges_can_exhaust_a_tier():
+    vpc = ipaddress.ip_network("10.0.0.0/16")
+    assert len(tier_slots(vpc, "public", [ipaddress.ip_network("10.0.0.0/19")])) == 4
+
+    with pytest.raises(ValueError, match="No free public slot left for AZ 0"):
+        plan_subnets("10.0.0.0/16", 2, PROD_DEMAND, existing=["10.0.0.0/18"])
+
+
+def test_legacy_plan_keeps_historical_layout():
+    plan = legacy_plan(2)
+    assert plan.cidrs("public") == ["10.0.0.0/24", "10.0.1.0/24"]
+    assert plan.cidrs("private") == ["10.0.10.0/24", "10.0.11.0/24"]
+    assert plan.cidrs("data") == []
+
+
+def test_proxies_and_load_balancers_add_per_az_addresses():
+    demand = SubnetDemand(db_instances=1, db_proxies=1, load_balancers=1, nat_gateways=3)
+
+    assert addresses_per_az(demand, 3) == {"public": 1 + 8, "private": 0, "data": 1 + 3}
+
+
+def test_min_prefix_widens_a_tier():
+    plan = plan_subnets("10.0.0.0/16", 2, PROD_DEMAND, min_prefix={"data": 24, "private": 27})
+
+    # Un minimum plus étroit que le besoin calculé ne rétrécit jamais le sous-réseau
+    assert [network.prefixlen for network in plan.subnets["private"]] == [25, 25]
+    assert [network.prefixlen for network in plan.subnets["data"]] == [24, 24]
+    validate_allocations(ipaddress.ip_network("10.0.0.0/16"), plan.allocated())
+
+
+def test_adding_an_az_keeps_existing_subnets():
+    current = plan_subnets("10.0.0.0/16", 2, PROD_DEMAND)
+
+    extended = plan_subnets("10.0.0.0/16", 3, PROD_DEMAND)
+
+    for tier in current.subnets:
+        assert extended.cidrs(tier)[:2] == current.cidrs(tier)
+
+
+def test_widening_a_tier_leaves_the_others_in_place():
+    current = plan_subnets("10.0.0.0/16", 2, PROD_DEMAND)
+
+    wider = plan_subnets("10.0.0.0/16", 2, SubnetDemand(**{**PROD_DEMAND.__dict__, "lambda_memory_mb": 2048}))
+
+    assert wider.cidrs("private") == ["10.0.64.0/24", "10.0.72.0/24"]
+    assert (wider.cidrs("public"), wider.cidrs("data")) == (current.cidrs("public"), current.cidrs("data"))
+
+
+def test_deployed_subnets_are_kept():
+    # Plan historique : les /24 déjà en service restent, seules les nouvelles AZ et le niveau data sont placés
+    deployed = {"public": legacy_plan(2).cidrs("public"), "private": legacy_plan(2).cidrs("private")}
+
+    plan = plan_subnets("10.0.0.0/16", 3, PROD_DEMAND, deployed=deployed)
+
+    assert plan.cidrs("public")[:2] == deployed["public"]
+    assert plan.cidrs("private")[:2] == deployed["private"]
+    assert plan.cidrs("public")[2] == "10.0.16.0/28"
+    validate_allocations(ipaddress.ip_network("10.0.0.0/16"), plan.allocated())
+
+
+def test_plan_fails_instead_of_growing_a_deployed_subnet():
+    deployed = {tier: plan_subnets("10.0.0.0/16", 2, PROD_DEMAND).cidrs(tier) for tier in ("public", "private")}
+    wider = SubnetDemand(**{**PROD_DEMAND.__dict__, "lambda_memory_mb": 2048})
+
+    with pytest.raises(ValueError, match="Deployed private subnet 0 .* smaller than the /24"):
+        plan_subnets("10.0.0.0/16", 2, wider, deployed=deployed)
+    with pytest.raises(ValueError, match="Unknown tiers"):
+        plan_subnets("10.0.0.0/16", 2, PROD_DEMAND, deployed={"isolated": []})
+
+
+def test_plan_requires_an_az():
+    with pytest.raises(ValueError, match="az_count"):
+        plan_subnets("10.0.0.0/16", 0, PROD_DEMAND)
@@ -0,0 +1,174 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from concurrency_plan import PlanOptions, Target, apply_target, build_plan, percentile, render_plan, target_at
+
+MONDAY = datetime(2026, 9, 7, tzinfo=timezone.utc)
+
+
+def synthetic_series(weeks: int = 4, base: float = 4, peak: float = 60, peak_hours=(9, 10), noise: float = 0.1):
+    """Points à 5 minutes : charge de fond, pic quotidien pendant `peak_hours`, bruit multiplicatif."""
+    generator = random.Random(42)
+    samples = []
+    for step in range(weeks * 7 * 24 * 12):
+        when = MONDAY - timedelta(weeks=weeks) + timedelta(minutes=5 * step)
+        level = peak if when.hour in peak_hours else base
+        samples.append((when, level * (1 + generator.uniform(-noise, noise))))
+    return samples
+
+
+def test_percentile_interpolates():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([5], 95) == 5
+    assert percentile(list(range(101)), 95) == 95
+
+
+def test_daily_peak_is_provisioned_with_headroom():
+    plan = build_plan(synthetic_series(), PlanOptions(percentile=95, headroom=0.2, max_concurrency=320))
+
+    assert len(plan) == 24
+    # p95 d'un pic de 60 ± 10 % : entre 60 et 66, plus 20 %
+    assert 72 <= plan[9].provisioned <= 80
+    assert plan[3].provisioned <= 6
+    # Limite dure : une fenêtre creuse ne baisse pas la concurrence réservée
+    assert {target.reserved for target in plan} == {320}
+
+
+def test_reserved_follows_the_forecast_only_above_its_floor():
+    plan = build_plan(synthetic_series(), PlanOptions(headroom=0.2, min_reserved=40, max_concurrency=320))
+
+    assert plan[9].reserved >= plan[9].provisioned
+    assert plan[9].reserved <= 80
+    assert plan[3].reserved == 40
+
+
+def test_without_ceiling_or_floor_the_function_is_unreserved():
+    plan = build_plan(synthetic_series())
+
+    assert {target.reserved for target in plan} == {None}
+
+
+def test_ceiling_caps_both_values():
+    plan = build_plan(synthetic_series(), PlanOptions(max_concurrency=50))
+
+    assert max(target.provisioned for target in plan) == 50
+    assert max(target.reserved for target in plan) == 50
+
+
+def test_weekly_windows_separate_weekends():
+    samples = [(when, 0.0 if when.weekday() >= 5 else value) for when, value in synthetic_series()]
+    options = PlanOptions(weekly=True, min_reserved=1)
+
+    plan = build_plan(samples, options)
+
+    assert len(plan) == 7 * 24
+    assert plan[9].provisioned > 60  # lundi 09:00
+    assert plan[5 * 24 + 9].provisioned == 0  # samedi 09:00
+    assert render_plan(plan, options).splitlines()[1 + 5 * 24 + 9].startswith("sam 09:00")
+
+
+def test_windows_without_points_are_idle():
+    samples = [(when, value) for when, value in synthetic_series() if when.hour != 3]
+
+    plan = build_plan(samples, PlanOptions(min_provisioned=2, min_reserved=5))
+
+    assert plan[3] == Target(provisioned=2, reserved=5)
+
+
+def test_without_history_only_the_ceiling_applies():
+    plan = build_plan([], PlanOptions(min_provisioned=2, max_concurrency=100))
+
+    assert set(plan) == {Target(provisioned=2, reserved=100)}
+
+
+def test_target_anticipates_the_next_window():
+    options = PlanOptions(lead_minutes=15)
+    plan = build_plan(synthetic_series(), options)
+
+    before_peak = target_at(plan, MONDAY.replace(hour=8, minute=50), options)
+    early = target_at(plan, MONDAY.replace(hour=8, minute=30), options)
+
+    assert before_peak == Target(provisioned=plan[9].provisioned, reserved=plan[9].reserved)
+    assert early == plan[8]
+
+
+def test_invalid_options():
+    with pytest.raises(ValueError, match="divide a day"):
+        PlanOptions(window_minutes=7)
+    with pytest.raises(ValueError, match="percentile"):
+        PlanOptions(percentile=0)
+    with pytest.raises(ValueError, match="min_reserved"):
+        PlanOptions(min_reserved=0)
+
+
+class FakeLambda:
+    class exceptions:
+        class ProvisionedConcurrencyConfigNotFoundException(Exception):
+            pass
+
+    def __init__(self, reserved=None, provisioned=0):
+        self.reserved = reserved
+        self.provisioned = provisioned
+        self.calls = []
+
+    def get_function_concurrency(self, FunctionName):
+        return {} if self.reserved is None else {"ReservedConcurrentExecutions": self.reserved}
+
+    def get_provisioned_concurrency_config(self, FunctionName, Qualifier):
+        if not self.provisioned:
+            raise self.exceptions.ProvisionedConcurrencyConfigNotFoundException()
+        return {"RequestedProvisionedConcurrentExecutions": self.provisioned}
+
+    def put_function_concurrency(self, FunctionName, ReservedConcurrentExecutions):
+        # AWS refuse une concurrence réservée inférieure à la concurrence provisionnée
+        assert ReservedConcurrentExecutions >= self.provisioned
+        self.reserved = ReservedConcurrentExecutions
+        self.calls.append("reserved")
+
+    def delete_function_concurrency(self, FunctionName):
+        self.reserved = None
+        self.calls.append("reserved")
+
+    def put_provisioned_concurrency_config(self, FunctionName, Qualifier, ProvisionedConcurrentExecutions):
+        assert self.reserved is None or ProvisionedConcurrentExecutions <= self.reserved
+        self.provisioned = ProvisionedConcurrentExecutions
+        self.calls.append("provisioned")
+
+    def delete_provisioned_concurrency_config(self, FunctionName, Qualifier):
+        self.provisioned = 0
+        self.calls.append("provisioned")
+
+
+def test_scaling_up_raises_reserved_first():
+    client = FakeLambda(reserved=10, provisioned=5)
+
+    changes = apply_target(client, "api-handler-prod", Target(provisioned=40, reserved=60), alias="live")
+
+    assert client.calls == ["reserved", "provisioned"]
+    assert changes == {"reserved": [10, 60], "provisioned": [5, 40]}
+
+
+def test_scaling_down_lowers_provisioned_first():
+    client = FakeLambda(reserved=60, provisioned=40)
+
+    apply_target(client, "api-handler-prod", Target(provisioned=0, reserved=8), alias="live")
+
+    assert client.calls == ["provisioned", "reserved"]
+    assert (client.provisioned, client.reserved) == (0, 8)
+
+
+def test_unchanged_target_makes_no_calls():
+    client = FakeLambda(reserved=60, provisioned=40)
+
+    assert apply_target(client, "api-handler-prod", Target(provisioned=40, reserved=60), alias="live") == {}
+    assert client.calls == []
+
+
+def test_without_alias_only_reserved_is_applied():
+    client = FakeLambda(reserved=None)
+
+    changes = apply_target(client, "api-handler-dev", Target(provisioned=12, reserved=20))
+
+    assert changes == {"reserved": [None, 20]}
@@ -0,0 +1,247 @@
+import threading
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError, WaiterError
+
+import control
+from control import cloudfront_disable, cloudfront_enable, lambda_disable, resolve_targets, run_actions, wait_deployed
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "UpdateDistribution")
+
+
+class FakeCloudFront:
+    def __init__(self, enabled: bool = True, races: int = 0, deployed: set = None):
+        self.enabled = enabled
+        self.etag = 1
+        self.races = races
+        self.deployed = deployed
+        self.updates = 0
+
+    def get_distribution_config(self, Id):
+        return {"DistributionConfig": {"Enabled": self.enabled, "Comment": Id}, "ETag": f"E{self.etag}"}
+
+    def update_distribution(self, Id, DistributionConfig, IfMatch):
+        if self.races:
+            # Un autre opérateur a modifié la distribution entre-temps
+            self.races -= 1
+            self.etag += 1
+        if IfMatch != f"E{self.etag}":
+            raise client_error("PreconditionFailed")
+        self.enabled = DistributionConfig["Enabled"]
+        self.etag += 1
+        self.updates += 1
+
+    def get_waiter(self, name):
+        assert name == "distribution_deployed"
+        fake = self
+
+        class Waiter:
+            def wait(self, Id, WaiterConfig):
+                if Id not in fake.deployed:
+                    raise WaiterError(name, "Max attempts exceeded", {})
+
+        return Waiter()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(control.time, "sleep", lambda seconds: None)
+
+
+def test_cloudfront_update_retries_on_precondition_failed():
+    client = FakeCloudFront(races=2)
+
+    result = cloudfront_disable(client, "E123")
+
+    assert result.changed is True
+    assert client.enabled is False
+    assert client.updates == 1
+
+
+def test_cloudfront_gives_up_after_repeated_races():
+    client = FakeCloudFront(races=control.PRECONDITION_ATTEMPTS)
+
+    with pytest.raises(ClientError):
+        cloudfront_disable(client, "E123")
+
+
+def test_cloudfront_already_in_target_state():
+    client = FakeCloudFront(enabled=True)
+
+    result = cloudfront_enable(client, "E123")
+
+    assert result.changed is False
+    assert client.updates == 0
+
+
+def test_bulk_actions_run_concurrently_and_report_errors():
+    barrier = threading.Barrier(3, timeout=5)
+    calls = []
+
+    class FakeLambda:
+        def put_function_concurrency(self, FunctionName, ReservedConcurrentExecutions):
+            barrier.wait()
+            calls.append(FunctionName)
+            if FunctionName == "missing":
+                raise client_error("ResourceNotFoundException")
+
+    results = run_actions(lambda_disable, FakeLambda(), ["api-dev", "api-prod", "missing"], workers=3)
+
+    assert [result.target for result in results] == ["api-dev", "api-prod", "missing"]
+    assert results[2].error.startswith("ResourceNotFoundException")
+    assert sorted(calls) == ["api-dev", "api-prod", "missing"]
+
+
+def test_tag_selection_merges_with_explicit_targets():
+    class FakeTagging:
+        def get_paginator(self, name):
+            class Paginator:
+                def paginate(self, ResourceTypeFilters, TagFilters):
+                    assert ResourceTypeFilters == ["cloudfront:distribution"]
+                    assert TagFilters == [{"Key": "Environment", "Values": ["prod"]}]
+                    yield {"ResourceTagMappingList": [{"ResourceARN": "arn:aws:cloudfront::123456789012:distribution/E1"}]}
+                    yield {"ResourceTagMappingList": [{"ResourceARN": "arn:aws:cloudfront::123456789012:distribution/E2"}]}
+
+            return Paginator()
+
+    targets = resolve_targets(FakeTagging(), "cloudfront", ["E2", "E9"], {"Environment": ["prod"]})
+
+    assert targets == ["E2", "E9", "E1"]
+
+
+def test_lambda_arns_resolve_to_function_names():
+    class FakeTagging:
+        def get_paginator(self, name):
+            class Paginator:
+                def paginate(self, **kwargs):
+                    yield {"ResourceTagMappingList": [{"ResourceARN": "arn:aws:lambda:eu-west-3:123456789012:function:api-prod"}]}
+
+            return Paginator()
+
+    assert resolve_targets(FakeTagging(), "lambda", [], {"Environment": ["prod"]}) == ["api-prod"]
+
+
+def test_wait_reports_each_distribution(capsys):
+    statuses = wait_deployed(FakeCloudFront(deployed={"E1", "E2"}), ["E1", "E2", "E3"], timeout=60)
+
+    assert statuses == {"E1": "Deployed", "E2": "Deployed", "E3": "InProgress"}
+    assert "[3/3]" in capsys.readouterr().out
+
+
+def test_scale_dry_run_prints_the_plan_without_applying():
+    from datetime import datetime, timezone
+
+    from concurrency_plan import PlanOptions
+
+    class FakeCloudWatch:
+        def get_paginator(self, name):
+            class Paginator:
+                def paginate(self, MetricDataQueries, StartTime, EndTime, ScanBy):
+                    assert MetricDataQueries[0]["MetricStat"]["Metric"]["Dimensions"][0]["Value"] == "api-handler-prod"
+                    timestamps = [datetime(2026, 9, day, 9, 5, tzinfo=timezone.utc) for day in range(1, 8)]
+                    yield {"MetricDataResults": [{"Timestamps": timestamps, "Values": [50.0] * 7}]}
+
+            return Paginator()
+
+    class NoCalls:
+        def __getattr__(self, name):
+            raise AssertionError(f"unexpected call {name}")
+
+    result = control.lambda_scale(
+        NoCalls(),
+        "api-handler-prod",
+        cloudwatch=FakeCloudWatch(),
+        options=PlanOptions(headroom=0.2, max_concurrency=320),
+        dry_run=True,
+        now=datetime(2026, 9, 8, 8, 50, tzinfo=timezone.utc),
+    )
+
+    assert result.changed is False
+    # La concurrence réservée reste au plafond, seule la provisionnée suit la prévision
+    assert "Cible : provisioned 60, reserved 320" in result.message
+    assert "dry-run" in result.message
+
+
+def test_warmup_marker_skips_routing_and_unconfigured_components(monkeypatch):
+    import lambda_function
+
+    for name in ("DB_HOST", "CACHE_ENDPOINT", "DATA_BUCKET"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(lambda_function, "_invocations", 0)
+
+    # Le handler reconnaît la clé que control.py envoie
+    first = lambda_function.handler({control.WARMUP_KEY: {"hold_ms": 0}}, None)
+    second = lambda_function.handler({control.WARMUP_KEY: None}, None)
+
+    assert first == {"container": lambda_function.CONTAINER_ID, "cold": True, "initialized": [], "errors": {}}
+    assert second["cold"] is False
+
+
+def test_warm_counts_distinct_containers():
+    import io
+    import json
+
+    class FakeLambda:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.calls = 0
+
+        def invoke(self, FunctionName, InvocationType, Payload, Qualifier):
+            assert json.loads(Payload) == {"warmup": {"hold_ms": 200}}
+            assert Qualifier == "live"
+            with self.lock:
+                self.calls += 1
+                index = self.calls
+            if index == 6:
+                return {"FunctionError": "Unhandled", "Payload": io.BytesIO(b'{"errorMessage": "boom"}')}
+            # 5 conteneurs : les invocations au-delà retombent sur un conteneur déjà chaud
+            body = {"container": f"c{index % 5}", "cold": index <= 5, "initialized": ["database"], "errors": {}}
+            if index == 2:
+                body["errors"] = {"cache": "timeout"}
+            return {"StatusCode": 200, "Payload": io.BytesIO(json.dumps(body).encode())}
+
+    client = FakeLambda()
+
+    result = control.lambda_warm(client, "api-handler-prod", count=8, hold_ms=200, qualifier="live")
+
+    assert client.calls == 8
+    assert result.changed is True
+    assert "5/8 conteneurs distincts chauds, 5 démarrés à froid, 1 échec(s)" in result.message
+    assert "initialisation : cache: timeout" in result.message
+
+
+def test_network_errors_do_not_abort_bulk_or_warm_runs():
+    class FakeLambda:
+        def __init__(self):
+            self.calls = 0
+
+        def put_function_concurrency(self, FunctionName, ReservedConcurrentExecutions):
+            if FunctionName == "unreachable":
+                raise EndpointConnectionError(endpoint_url="https://lambda.eu-west-3.amazonaws.com")
+
+        def invoke(self, FunctionName, InvocationType, Payload, Qualifier):
+            raise ReadTimeoutError(endpoint_url="https://lambda.eu-west-3.amazonaws.com")
+
+    results = run_actions(lambda_disable, FakeLambda(), ["api-dev", "unreachable"], workers=2)
+
+    assert results[0].error == ""
+    assert results[1].error.startswith("EndpointConnectionError")
+
+    result = control.lambda_warm(FakeLambda(), "api-handler-prod", count=3, hold_ms=0, qualifier="live")
+
+    assert result.changed is False
+    assert "0/3 conteneurs distincts chauds" in result.message
+    assert "3 échec(s)" in result.message
+
+
+@pytest.mark.parametrize("option", ["--count", "--workers"])
+def test_count_and_workers_must_be_positive(monkeypatch, capsys, option):
+    monkeypatch.setattr("sys.argv", ["control.py", "lambda", "warm", "api-handler-dev", option, "0"])
+
+    with pytest.raises(SystemExit) as exc:
+        control.main()
+
+    assert exc.value.code == 2
+    assert "doit être au moins 1" in capsys.readouterr().err
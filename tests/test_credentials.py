@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from credentials import CredentialCache
+
+
+class AuthFailure(Exception):
+    sqlstate = "28P01"
+
+
+class FakeSecretsManager:
+    def __init__(self):
+        self.version = 1
+        self.reads = 0
+
+    def get_secret_value(self, SecretId, VersionStage):
+        assert VersionStage == "AWSCURRENT"
+        self.reads += 1
+        return {
+            "SecretString": f'{{"username": "app_user", "password": "p{self.version}"}}',
+            "VersionId": f"v{self.version}",
+        }
+
+
+def connect_to(valid_password: str):
+    attempts = []
+
+    def connect_with(credentials: dict):
+        attempts.append(credentials["password"])
+        if credentials["password"] != valid_password:
+            raise AuthFailure("password authentication failed for user app_user")
+        return "connection"
+
+    return connect_with, attempts
+
+
+def test_credentials_are_read_once():
+    client = FakeSecretsManager()
+    cache = CredentialCache("db-app-credentials-prod", client_factory=lambda: client)
+    connect_with, _ = connect_to("p1")
+
+    for _ in range(3):
+        assert cache.connect(connect_with) == "connection"
+
+    assert client.reads == 1
+
+
+def test_auth_failure_refetches_the_current_version_once():
+    client = FakeSecretsManager()
+    cache = CredentialCache("db-app-credentials-prod", client_factory=lambda: client)
+    cache.get()
+    # Rotation : AWSCURRENT pointe désormais vers l'autre utilisateur
+    client.version = 2
+    connect_with, attempts = connect_to("p2")
+
+    assert cache.connect(connect_with) == "connection"
+
+    assert attempts == ["p1", "p2"]
+    assert (client.reads, cache.refreshes) == (2, 1)
+
+
+def test_other_errors_do_not_refetch():
+    client = FakeSecretsManager()
+    cache = CredentialCache("db-app-credentials-prod", client_factory=lambda: client)
+
+    def connect_with(credentials):
+        raise TimeoutError("connection timed out")
+
+    with pytest.raises(TimeoutError):
+        cache.connect(connect_with)
+    assert client.reads == 1
+
+
+def test_concurrent_failures_refetch_a_stale_version_once():
+    client = FakeSecretsManager()
+    cache = CredentialCache("db-app-credentials-prod", client_factory=lambda: client)
+    cache.get()
+    client.version = 2
+    connect_with, _ = connect_to("p2")
+    barrier = threading.Barrier(4, timeout=5)
+
+    def worker():
+        barrier.wait()
+        cache.connect(connect_with)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Les threads qui échouent après la relecture réutilisent la nouvelle version
+    assert cache.refreshes == 1
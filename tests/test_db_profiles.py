@@ -0,0 +1,112 @@
+import pytest
+
+from infra.db_profiles import AURORA_PARAMETERS, PROFILES, STATIC_PARAMETERS, apply_method, compute_parameters, instance_memory_gib
+
+GIB_KB = 1024 * 1024
+
+
+@pytest.mark.parametrize(
+    ("instance_class", "memory_gib"),
+    [
+        ("db.t3.micro", 1),
+        ("db.t4g.medium", 4),
+        ("db.m6g.large", 8),
+        ("db.r6g.2xlarge", 64),
+        ("db.m5.xlarge", 16),
+    ],
+)
+def test_instance_memory(instance_class, memory_gib):
+    assert instance_memory_gib(instance_class) == memory_gib
+
+
+@pytest.mark.parametrize("instance_class", ["db.t3.nano2", "db.z1d.large", "m5.large"])
+def test_unknown_instance_class(instance_class):
+    with pytest.raises(ValueError):
+        instance_memory_gib(instance_class)
+
+
+def test_compute_parameters_oltp_small():
+    parameters = compute_parameters("oltp-small", "db.t4g.medium")
+
+    # 4 GiB : shared_buffers 1 GiB et effective_cache_size 3 GiB en pages de 8 kB
+    assert parameters["shared_buffers"] == str(1024 * 1024 // 8)
+    assert parameters["effective_cache_size"] == str(3 * 1024 * 1024 // 8)
+    assert parameters["max_connections"] == "400"
+    assert parameters["maintenance_work_mem"] == str(256 * 1024)
+    assert parameters["random_page_cost"] == "1.1"
+
+
+def test_compute_parameters_clamps_connections_and_work_mem():
+    small = compute_parameters("oltp-large", "db.t3.micro")
+    assert small["max_connections"] == "100"
+    assert small["work_mem"] == "4096"
+
+    analytics = compute_parameters("analytics", "db.r6g.2xlarge", storage_type="standard")
+    assert analytics["max_connections"] == "200"
+    assert analytics["random_page_cost"] == "4"
+
+
+def test_static_parameters_wait_for_reboot():
+    assert apply_method("shared_buffers") == "pending-reboot"
+    assert apply_method("work_mem") == "immediate"
+
+
+
+@pytest.mark.parametrize(
+    ("profile", "instance_class", "max_connections", "work_mem_kb"),
+    [
+        # 1 GiB : plancher de connexions du profil, work_mem au minimum de 4 MB
+        ("oltp-small", "db.t3.micro", 100, 4096),
+        # 8 GiB x 100 connexions/GiB ; (8 - 2) GiB x 0,25 / 800 < 4 MB
+        ("oltp-small", "db.m6g.large", 800, 4096),
+        # 64 GiB : plafond de 1000 connexions ; 48 GiB x 0,25 / 1000
+        ("oltp-small", "db.r6g.2xlarge", 1000, 48 * GIB_KB // 4 // 1000),
+        ("oltp-large", "db.m6g.large", 400, 4096),
+        ("oltp-large", "db.r6g.2xlarge", 3200, 4096),
+        # 8 GiB x 10 connexions/GiB ; 6 GiB x 0,5 / 80
+        ("analytics", "db.m6g.large", 80, 6 * GIB_KB // 2 // 80),
+        ("analytics", "db.r6g.2xlarge", 200, 48 * GIB_KB // 2 // 200),
+    ],
+)
+def test_connections_and_work_mem_per_instance_class(profile, instance_class, max_connections, work_mem_kb):
+    parameters = compute_parameters(profile, instance_class)
+
+    assert parameters["max_connections"] == str(max_connections)
+    assert parameters["work_mem"] == str(work_mem_kb)
+
+
+@pytest.mark.parametrize("instance_class", ["db.t3.micro", "db.t4g.medium", "db.m6g.large", "db.r6g.2xlarge", "db.m5.xlarge"])
+@pytest.mark.parametrize("profile", sorted(PROFILES))
+def test_memory_ratios_per_instance_class(profile, instance_class):
+    parameters = compute_parameters(profile, instance_class)
+    memory_kb = instance_memory_gib(instance_class) * GIB_KB
+
+    # Pages de 8 kB : 25 % de la mémoire en shared_buffers, 75 % en effective_cache_size
+    assert int(parameters["shared_buffers"]) * 8 == memory_kb // 4
+    assert int(parameters["effective_cache_size"]) * 8 == memory_kb * 3 // 4
+    # maintenance_work_mem : 1/16 de la mémoire, au plus 2 GiB
+    assert int(parameters["maintenance_work_mem"]) == min(memory_kb // 16, 2 * GIB_KB)
+
+
+def test_every_generated_parameter_has_an_apply_method():
+    parameters = compute_parameters("oltp-large", "db.m6g.large")
+
+    assert STATIC_PARAMETERS <= set(parameters)
+    assert AURORA_PARAMETERS <= set(parameters)
+    assert {name for name in parameters if apply_method(name) == "pending-reboot"} == STATIC_PARAMETERS
+
+
+def test_unknown_workload_profile():
+    with pytest.raises(ValueError, match="Unknown workload profile"):
+        compute_parameters("batch", "db.m6g.large")
+
+
+def test_min_connections_raises_max_connections_and_shares_work_mem():
+    own = compute_parameters("oltp-small", "db.r6g.2xlarge")
+    raised = compute_parameters("oltp-small", "db.r6g.2xlarge", min_connections=int(own["max_connections"]) * 2)
+
+    assert int(raised["max_connections"]) == int(own["max_connections"]) * 2
+    assert int(raised["work_mem"]) < int(own["work_mem"])
+    assert raised["shared_buffers"] == own["shared_buffers"]
+    # Un minimum inférieur au calcul ne change rien
+    assert compute_parameters("oltp-small", "db.r6g.2xlarge", min_connections=10) == own
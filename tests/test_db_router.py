@@ -0,0 +1,195 @@
+import pytest
+
+from db_router import DatabaseRouter, is_operational_error
+
+
+class OperationalError(Exception):
+    pass
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.row = None
+
+    def execute(self, query):
+        if self.conn.server.down:
+            raise OperationalError(f"server closed the connection unexpectedly ({self.conn.host})")
+        self.conn.server.queries.append(query)
+        self.row = (self.conn.server.lag,)
+
+    def fetchone(self):
+        return self.row
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.host = server.host
+        self.closed = False
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeServer:
+    def __init__(self, host, lag=0.0):
+        self.host = host
+        self.lag = lag
+        self.down = False
+        self.refuse = False
+        self.queries = []
+        self.connects = 0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def servers():
+    return {host: FakeServer(host) for host in ("primary", "replica-1", "replica-2")}
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def router_for(servers, clock, **kwargs):
+    def connect(host):
+        server = servers[host]
+        server.connects += 1
+        if server.refuse:
+            raise OperationalError(f"connection refused ({host})")
+        return FakeConnection(server)
+
+    return DatabaseRouter(connect, "primary", ["replica-1", "replica-2"], clock=clock, **kwargs)
+
+
+def select_one(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1")
+    return cursor.fetchone()
+
+
+def test_reads_rotate_over_replicas_and_writes_go_to_the_primary(servers, clock):
+    router = router_for(servers, clock)
+
+    hosts = []
+    for _ in range(4):
+        router.run(select_one, readonly=True)
+        hosts.append(router.last_host)
+    router.run(select_one)
+
+    assert hosts == ["replica-1", "replica-2", "replica-1", "replica-2"]
+    assert router.last_host == "primary"
+    # Une connexion par hôte, réutilisée entre les requêtes
+    assert [servers[host].connects for host in ("primary", "replica-1", "replica-2")] == [1, 1, 1]
+
+
+def test_lagging_replica_is_skipped_until_it_catches_up(servers, clock):
+    servers["replica-1"].lag = 45.0
+    router = router_for(servers, clock, max_lag_seconds=30.0, lag_check_interval=5.0)
+
+    assert [router.choose_replica() for _ in range(2)] == ["replica-2", "replica-2"]
+
+    servers["replica-1"].lag = 2.0
+    # Retard en cache pendant lag_check_interval
+    assert router.choose_replica() == "replica-2"
+    clock.now += 5.0
+    assert {router.choose_replica() for _ in range(2)} == {"replica-1", "replica-2"}
+
+
+def test_all_replicas_lagging_falls_back_to_the_primary(servers, clock):
+    servers["replica-1"].lag = servers["replica-2"].lag = 60.0
+    router = router_for(servers, clock)
+
+    router.run(select_one, readonly=True)
+
+    assert router.last_host == "primary"
+
+
+def test_unreachable_replica_backs_off_for_retry_after(servers, clock):
+    servers["replica-1"].refuse = True
+    router = router_for(servers, clock, retry_after=30.0)
+
+    assert [router.choose_replica() for _ in range(3)] == ["replica-2"] * 3
+    assert servers["replica-1"].connects == 1
+
+    servers["replica-1"].refuse = False
+    clock.now += 29.0
+    assert router.choose_replica() == "replica-2"
+    clock.now += 1.0
+    assert "replica-1" in {router.choose_replica() for _ in range(2)}
+
+
+def test_replica_failing_mid_query_is_marked_unhealthy_and_the_read_retried_on_the_primary(servers, clock):
+    router = router_for(servers, clock, retry_after=30.0)
+    router.run(select_one, readonly=True)
+    router.run(select_one, readonly=True)
+
+    # Retard encore en cache : l'échec survient dans la requête, pas dans la mesure du retard
+    servers["replica-1"].down = True
+    clock.now += 1.0
+    assert router.run(select_one, readonly=True) == (0.0,)
+
+    assert router.last_host == "primary"
+    assert servers["primary"].queries == ["SELECT 1"]
+    assert "replica-1" not in router._connections
+    # Écarté jusqu'à la fin du backoff, même une fois revenu
+    servers["replica-1"].down = False
+    assert [router.choose_replica() for _ in range(3)] == ["replica-2"] * 3
+    clock.now += 30.0
+    assert "replica-1" in {router.choose_replica() for _ in range(2)}
+
+
+def test_query_errors_are_not_retried(servers, clock):
+    class ProgrammingError(Exception):
+        pass
+
+    def bad_query(conn):
+        raise ProgrammingError("syntax error")
+
+    router = router_for(servers, clock)
+
+    with pytest.raises(ProgrammingError):
+        router.run(bad_query, readonly=True)
+    assert servers["primary"].connects == 0
+    replica = router._connections[router.last_host]
+    # Un rollback après la mesure du retard, un pour la requête en échec, aucun commit
+    assert (replica.commits, replica.rollbacks) == (0, 2)
+
+
+def test_primary_failures_are_raised(servers, clock):
+    servers["primary"].down = True
+    router = router_for(servers, clock)
+
+    with pytest.raises(OperationalError):
+        router.run(select_one)
+
+
+def test_operational_error_is_matched_by_name():
+    class DriverOperationalError(OperationalError):
+        pass
+
+    assert is_operational_error(DriverOperationalError())
+    assert not is_operational_error(ValueError())
@@ -0,0 +1,216 @@
+import shutil
+import stat
+import threading
+import time
+
+import pytest
+
+from pulumi.automation.errors import CommandError
+
+from deploy_environments import DeadlineCommand, StackResult, deploy_stack, resolve_order, run_all, summary
+
+
+class FakeRunner:
+    def __init__(self, outcomes: dict = None, seconds: float = 0.05):
+        self.outcomes = outcomes or {}
+        self.seconds = seconds
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.started = []
+        self.finished = []
+
+    def __call__(self, stack: str) -> StackResult:
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.started.append(stack)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.active -= 1
+            self.finished.append(stack)
+        return StackResult(stack, status=self.outcomes.get(stack, "succeeded"), seconds=self.seconds)
+
+
+def test_pool_bounds_concurrency():
+    stacks = [f"env-{i}" for i in range(6)]
+    runner = FakeRunner()
+
+    results = run_all(stacks, resolve_order(stacks, {}), runner, workers=2)
+
+    assert runner.peak == 2
+    assert all(result.status == "succeeded" for result in results.values())
+
+
+def test_dependencies_run_after_their_predecessor():
+    stacks = ["dev", "staging", "prod"]
+    runner = FakeRunner()
+
+    run_all(stacks, resolve_order(stacks, {"prod": ["staging"]}), runner, workers=3)
+
+    assert runner.started.index("prod") > runner.finished.index("staging")
+    # dev et staging démarrent ensemble
+    assert set(runner.started[:2]) == {"dev", "staging"}
+
+
+@pytest.mark.parametrize("status", ["failed", "timeout"])
+def test_dependents_of_a_failed_stack_are_skipped(status):
+    stacks = ["dev", "staging", "prod", "prod-app"]
+    order = {"prod": ["staging"], "prod-app": ["prod"]}
+    runner = FakeRunner({"staging": status})
+
+    results = run_all(stacks, resolve_order(stacks, order), runner, workers=2)
+
+    assert results["staging"].status == status
+    assert results["prod"].status == "skipped"
+    assert results["prod-app"].status == "skipped"
+    assert results["dev"].status == "succeeded"
+    assert "prod" not in runner.started
+
+
+def test_runner_exceptions_fail_only_that_stack():
+    def runner(stack):
+        if stack == "staging":
+            raise RuntimeError("boom")
+        return StackResult(stack, status="succeeded")
+
+    results = run_all(["dev", "staging"], {"dev": [], "staging": []}, runner, workers=2)
+
+    assert results["staging"].status == "failed"
+    assert results["staging"].message == "boom"
+    assert results["dev"].status == "succeeded"
+
+
+def test_order_ignores_unselected_stacks_and_rejects_cycles():
+    assert resolve_order(["dev", "prod"], {"prod": ["staging"]}) == {"dev": [], "prod": []}
+
+    with pytest.raises(ValueError, match="cycle"):
+        resolve_order(["a", "b"], {"a": ["b"], "b": ["a"]})
+
+
+def test_summary_table():
+    table = summary(
+        {
+            "staging": StackResult("staging", "succeeded", 12.3, {"update": 2, "create": 1}),
+            "prod": StackResult("prod", "skipped", message="staging n'a pas réussi"),
+        }
+    )
+
+    lines = table.splitlines()
+    assert lines[1].split()[:3] == ["staging", "succeeded", "12.3s"]
+    assert lines[1].endswith("create 1, update 2")
+    assert lines[2].endswith("staging n'a pas réussi")
+
+
+def fake_cli(tmp_path, body: str) -> str:
+    """Installation Pulumi factice : `version` répond, les autres commandes exécutent `body`."""
+    script = tmp_path / "bin" / "pulumi"
+    script.parent.mkdir()
+    script.write_text(f'#!/bin/sh\nif [ "$1" = version ]; then echo v3.200.0; exit 0; fi\n{body}\n')
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(tmp_path)
+
+
+def test_deadline_command_keeps_the_sdk_argument_handling(tmp_path):
+    command = DeadlineCommand(root=fake_cli(tmp_path, 'echo "$@"\necho "${PATH%%:*}"'))
+    command.deadline = time.monotonic() + 30
+
+    result = command.run(["up", "--", "extra"], str(tmp_path), {})
+
+    args, path = result.stdout.splitlines()
+    # --non-interactive avant le séparateur et bin/ de l'installation en tête du PATH
+    assert args == "--non-interactive up -- extra"
+    assert path == str(tmp_path / "bin")
+    assert not command.timed_out
+
+
+def test_deadline_command_interrupts_with_sigint(tmp_path):
+    body = "sleep 30 >/dev/null 2>&1 &\npid=$!\ntrap 'kill $pid; echo interrupted >&2; exit 130' INT\nwait $pid"
+    command = DeadlineCommand(grace=10, root=fake_cli(tmp_path, body))
+    command.deadline = time.monotonic() + 0.5
+    started = time.monotonic()
+
+    with pytest.raises(CommandError, match="interrupted"):
+        command.run(["up"], str(tmp_path), {})
+
+    assert command.timed_out
+    assert time.monotonic() - started < 5
+
+
+def test_deadline_command_kills_the_cli_after_the_grace_period(tmp_path):
+    body = "trap '' INT\nsleep 30 >/dev/null 2>&1 &\nwait $!"
+    command = DeadlineCommand(grace=0.5, root=fake_cli(tmp_path, body))
+    command.deadline = time.monotonic() + 0.5
+    started = time.monotonic()
+
+    with pytest.raises(CommandError):
+        command.run(["up"], str(tmp_path), {})
+
+    assert command.timed_out
+    assert time.monotonic() - started < 5
+
+
+def test_deadline_command_does_not_start_past_its_deadline(tmp_path):
+    command = DeadlineCommand(root=fake_cli(tmp_path, "touch started"))
+    command.deadline = time.monotonic() - 1
+
+    with pytest.raises(CommandError, match="deadline exceeded"):
+        command.run(["up"], str(tmp_path), {})
+
+    assert command.timed_out
+    assert not (tmp_path / "started").exists()
+
+
+@pytest.fixture
+def local_project(tmp_path, monkeypatch):
+    if shutil.which("pulumi") is None:
+        pytest.skip("pulumi CLI not installed")
+
+    from pulumi import automation as auto
+
+    backend = f"file://{tmp_path / 'state'}"
+    (tmp_path / "state").mkdir()
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "Pulumi.yaml").write_text("name: deploy-test\nruntime: python\n")
+    (project / "__main__.py").write_text(
+        "import time\nimport pulumi\n"
+        "time.sleep(pulumi.Config().get_float('sleep') or 0)\n"
+        "pulumi.export('stack', pulumi.get_stack())\n"
+    )
+    monkeypatch.setenv("PULUMI_CONFIG_PASSPHRASE", "test")
+
+    def create(name: str, sleep: float = 0) -> None:
+        stack = auto.create_stack(
+            stack_name=name,
+            work_dir=str(project),
+            opts=auto.LocalWorkspaceOptions(env_vars={"PULUMI_BACKEND_URL": backend}),
+        )
+        stack.set_config("sleep", auto.ConfigValue(str(sleep)))
+
+    return project, backend, create
+
+
+def test_deploys_stacks_on_a_file_backend(local_project):
+    project, backend, create = local_project
+    for name in ("dev", "staging"):
+        create(name)
+
+    results = run_all(
+        ["dev", "staging"],
+        {"dev": [], "staging": []},
+        lambda stack: deploy_stack(stack, work_dir=str(project), backend=backend),
+        workers=2,
+    )
+
+    assert [result.status for result in results.values()] == ["succeeded", "succeeded"]
+
+
+def test_timeout_interrupts_the_cli(local_project):
+    project, backend, create = local_project
+    create("slow", sleep=60)
+
+    result = deploy_stack("slow", work_dir=str(project), backend=backend, timeout=5, grace=10)
+
+    assert result.status == "timeout"
+    assert result.seconds < 30
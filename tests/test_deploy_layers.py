@@ -0,0 +1,49 @@
+import json
+import subprocess
+
+import pytest
+
+import deploy_layers
+
+
+def exported(*types: str) -> str:
+    resources = [{"urn": f"urn:pulumi:dev::cloud-module::{kind}::r{index}", "type": kind} for index, kind in enumerate(types)]
+    return json.dumps({"version": 3, "deployment": {"resources": resources}})
+
+
+@pytest.fixture
+def fake_pulumi(monkeypatch):
+    calls, exports = [], {}
+
+    def run(*args, check=True):
+        calls.append(args)
+        if args[:2] == ("stack", "export"):
+            stack = args[args.index("-s") + 1]
+            if stack not in exports:
+                return subprocess.CompletedProcess(args, 255, "", f"no stack named '{stack}' found")
+            return subprocess.CompletedProcess(args, 0, exports[stack], "")
+        raise AssertionError(f"unexpected pulumi call {args}")
+
+    monkeypatch.setattr(deploy_layers, "pulumi", run)
+    return calls, exports
+
+
+def test_monolith_resources_ignore_stack_and_providers(fake_pulumi):
+    _, exports = fake_pulumi
+    exports["dev"] = exported("pulumi:pulumi:Stack", "pulumi:providers:aws", "aws:ec2/vpc:Vpc")
+
+    assert deploy_layers.monolith_resources("dev") == ["urn:pulumi:dev::cloud-module::aws:ec2/vpc:Vpc::r2"]
+    assert deploy_layers.monolith_resources("staging") == []
+
+
+def test_up_refuses_while_the_monolith_holds_resources(fake_pulumi, capsys):
+    calls, exports = fake_pulumi
+    exports["dev"] = exported("pulumi:pulumi:Stack", "aws:ec2/vpc:Vpc", "aws:rds/instance:Instance")
+
+    with pytest.raises(SystemExit) as exc:
+        deploy_layers.up("dev", [], force=False, preview=False)
+
+    assert exc.value.code == 1
+    assert "2 ressource(s)" in capsys.readouterr().out
+    # Rien n'est déployé : seul l'export de la stack monolithique a été lu
+    assert [call[:2] for call in calls] == [("stack", "export")]
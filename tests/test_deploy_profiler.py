@@ -0,0 +1,110 @@
+import json
+
+from pulumi.automation import events as engine_events
+
+from deploy_profiler import analyze, load_log, render, serialize
+
+STACK = "urn:pulumi:prod::cloud-module::"
+VPC = STACK + "aws:ec2/vpc:Vpc::main-vpc-prod"
+SUBNET = STACK + "aws:ec2/subnet:Subnet::private-subnet-0-prod"
+DB = STACK + "aws:rds/instance:Instance::main-db-prod"
+BUCKET = STACK + "aws:s3/bucketV2:BucketV2::static-content-prod"
+CDN = STACK + "aws:cloudfront/distribution:Distribution::cdn-prod"
+ROLE = STACK + "aws:iam/role:Role::lambda-role-prod"
+
+# (urn, type, op, début, fin) en secondes
+STEPS = [
+    (VPC, "aws:ec2/vpc:Vpc", "same", 0.0, 0.1),
+    (SUBNET, "aws:ec2/subnet:Subnet", "update", 0.2, 2.0),
+    (BUCKET, "aws:s3/bucketV2:BucketV2", "create", 0.2, 1.5),
+    (ROLE, "aws:iam/role:Role", "same", 0.3, 0.3),
+    (DB, "aws:rds/instance:Instance", "update", 2.5, 400.0),
+    (CDN, "aws:cloudfront/distribution:Distribution", "update", 1.6, 250.0),
+]
+
+DEPENDENCIES = {
+    SUBNET: [VPC],
+    DB: [SUBNET],
+    CDN: [BUCKET],
+}
+
+
+def engine_log(steps=STEPS, failed=()) -> list[dict]:
+    entries = []
+    for urn, type_, op, start, end in steps:
+        metadata = {"metadata": {"urn": urn, "type": type_, "op": op}}
+        entries.append({"timestamp": int(start), "receivedAt": 1000 + start, "resourcePreEvent": metadata})
+        key = "resOpFailedEvent" if urn in failed else "resOutputsEvent"
+        entries.append({"timestamp": int(end), "receivedAt": 1000 + end, key: metadata})
+    entries.sort(key=lambda entry: entry["receivedAt"])
+    for sequence, entry in enumerate(entries):
+        entry["sequence"] = sequence
+    return entries
+
+
+def test_critical_path_follows_last_finishing_dependency():
+    report = analyze(engine_log(), DEPENDENCIES)
+
+    assert report["total"] == 400.0
+    assert [entry["name"] for entry in report["critical_path"]] == [
+        "main-vpc-prod",
+        "private-subnet-0-prod",
+        "main-db-prod",
+    ]
+    assert report["critical_path"][-1]["start"] == 2.5
+
+
+def test_slowest_skips_unchanged_resources():
+    report = analyze(engine_log(), DEPENDENCIES, limit=3)
+
+    assert [(entry["name"], entry["duration"]) for entry in report["slowest"]] == [
+        ("main-db-prod", 397.5),
+        ("cdn-prod", 248.4),
+        ("private-subnet-0-prod", 1.8),
+    ]
+    assert next(iter(report["by_type"])) == "aws:rds/instance:Instance"
+
+
+def test_without_dependencies_each_resource_is_a_root():
+    report = analyze(engine_log())
+
+    assert [entry["name"] for entry in report["critical_path"]] == ["main-db-prod"]
+
+
+def test_replacement_steps_are_merged_per_resource():
+    steps = STEPS + [
+        (CDN, "aws:cloudfront/distribution:Distribution", "create-replacement", 250.0, 500.0),
+        (CDN, "aws:cloudfront/distribution:Distribution", "delete-replaced", 500.0, 520.0),
+    ]
+    report = analyze(engine_log(steps), DEPENDENCIES)
+
+    slowest = report["slowest"][0]
+    assert slowest["name"] == "cdn-prod"
+    assert slowest["ops"] == "update+create-replacement+delete-replaced"
+    assert slowest["duration"] == 518.4
+    assert [entry["name"] for entry in report["critical_path"]] == ["static-content-prod", "cdn-prod"]
+
+
+def test_failed_steps_are_reported():
+    report = analyze(engine_log(failed={DB}), DEPENDENCIES)
+
+    assert report["slowest"][0]["failed"] is True
+    assert "ÉCHEC" in render(report)
+
+
+def test_recorded_log_round_trip(tmp_path):
+    log = tmp_path / "deploy-events.jsonl"
+    with open(log, "w") as f:
+        for entry in engine_log():
+            # Même sérialisation que pendant l'enregistrement, depuis les classes de l'Automation API
+            f.write(json.dumps(serialize(engine_events.EngineEvent.from_json(entry), entry["receivedAt"])) + "\n")
+        f.write(json.dumps({"dependencies": DEPENDENCIES}) + "\n")
+
+    events, dependencies = load_log(str(log))
+
+    assert dependencies == DEPENDENCIES
+    assert analyze(events, dependencies) == analyze(engine_log(), DEPENDENCIES)
+
+
+def test_empty_log():
+    assert analyze([])["critical_path"] == []
@@ -0,0 +1,177 @@
+import importlib
+import json
+
+import pulumi
+import pytest
+
+from conftest import ACCOUNT_ID, evaluate
+
+
+def factory(path: str, *args, **kwargs):
+    """Appel différé : le module infra est importé après la configuration des mocks."""
+    module_name, name = path.rsplit(".", 1)
+
+    def program():
+        return getattr(importlib.import_module(module_name), name)(*args, **kwargs)
+
+    return program
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "infra.s3.create_static_bucket",
+        "infra.s3.create_data_bucket",
+        "infra.secrets.create_api_key_secret",
+        "infra.iam.create_rds_monitoring_role",
+        "infra.iam.create_api_gateway_role",
+        "infra.cloudwatch.create_alert_topic",
+        "infra.api_gateway.create_api_log_group",
+        "infra.rds.create_rds_parameter_group",
+        "infra.rds.create_aurora_parameter_group",
+        "infra.waf.create_waf_acl",
+        "infra.vpc.create_vpc",
+    ],
+)
+def test_standalone_factories_name_and_tag_per_environment(path):
+    evaluation = evaluate(factory(path), config={"environment": "staging"}, stack="staging")
+
+    assert evaluation.resources
+    for resource in evaluation.resources:
+        if resource.type.startswith("pulumi:providers:"):
+            continue
+        assert resource.name.endswith("-staging"), resource.name
+        if "tags" in resource.inputs:
+            assert resource.inputs["tags"]["Environment"] == "staging"
+
+
+def test_factories_honour_parent_opts():
+    def program():
+        from infra.s3 import create_data_bucket
+
+        parent = pulumi.ComponentResource("test:index:Parent", "parent")
+        create_data_bucket(opts=pulumi.ResourceOptions(parent=parent))
+        return parent
+
+    evaluation = evaluate(program)
+    parent = evaluation.named("parent").urn
+
+    assert all(resource.parent == parent for resource in evaluation.resources if resource.name != "parent")
+
+
+def test_rds_parameter_group_defers_static_parameters():
+    evaluation = evaluate(factory("infra.rds.create_rds_parameter_group"))
+    parameters = {
+        parameter["name"]: parameter
+        for parameter in evaluation.named("rds-pg-params-dev").inputs["parameters"]
+    }
+
+    assert parameters["shared_buffers"]["applyMethod"] == "pending-reboot"
+    assert parameters["max_connections"]["value"] == "100"
+    assert parameters["work_mem"]["applyMethod"] == "immediate"
+
+
+def test_endpoint_security_group_only_admits_https_from_lambda_and_rotation():
+    evaluation = evaluate(factory("infra.vpc.create_security_groups", "vpc-1"))
+    ingress = evaluation.named("endpoint-sg-dev").inputs["ingress"]
+
+    assert {rule["fromPort"] for rule in ingress} == {443}
+    assert sorted(rule["securityGroups"][0] for rule in ingress) == ["lambda-sg-dev-id", "rotation-sg-dev-id"]
+
+
+def test_interface_endpoints_are_scoped_to_stack_secrets():
+    program = factory(
+        "infra.vpc_endpoints.create_vpc_endpoints",
+        vpc_id="vpc-1",
+        private_subnet_ids=["subnet-a", "subnet-b"],
+        private_route_table_ids=["rtb-a"],
+        security_group_id="sg-1",
+        data_bucket_arn=pulumi.Output.from_input("arn:aws:s3:::data"),
+        secret_arns=["arn:secret:b", "arn:secret:a", "arn:secret:a"],
+    )
+    evaluation = evaluate(program, config={"vpc_interface_endpoints": "true", "vpc_endpoint_extra_services": '["sqs"]'})
+
+    assert sorted(evaluation.result) == ["logs", "s3", "secretsmanager", "sqs"]
+    policy = json.loads(evaluation.named("secretsmanager-endpoint-dev").inputs["policy"])
+    assert policy["Statement"][0]["Resource"] == ["arn:secret:a", "arn:secret:b"]
+    s3_policy = json.loads(evaluation.named("s3-endpoint-dev").inputs["policy"])
+    assert s3_policy["Statement"][0]["Resource"] == ["arn:aws:s3:::data", "arn:aws:s3:::data/*"]
+
+
+def test_flow_log_policy_is_limited_to_the_account():
+    def program():
+        from infra.flow_logs import create_flow_log
+        from infra.s3 import create_data_bucket
+
+        return create_flow_log(vpc_id="vpc-1", data_bucket=create_data_bucket())
+
+    evaluation = evaluate(program)
+    policy = json.loads(evaluation.named("data-storage-policy-dev").inputs["policy"])
+
+    for statement in policy["Statement"]:
+        assert statement["Condition"]["StringEquals"]["aws:SourceAccount"] == ACCOUNT_ID
+
+
+def test_database_alarms_cover_each_replica():
+    program = factory(
+        "infra.cloudwatch.create_database_alarms",
+        rds_identifier="main-db-dev",
+        alert_topic_arn="arn:aws:sns:::alerts",
+        replica_identifiers=["replica-1", "replica-2"],
+    )
+    evaluation = evaluate(program)
+
+    replica_alarms = [
+        resource for resource in evaluation.of_type("aws:cloudwatch/metricAlarm:MetricAlarm")
+        if resource.inputs["dimensions"].get("DBInstanceIdentifier", "").startswith("replica-")
+    ]
+    # Retard de réplication et CPU pour chaque réplica
+    assert sorted(alarm.name for alarm in replica_alarms) == [
+        "rds-replica-cpu-alarm-0-dev",
+        "rds-replica-cpu-alarm-1-dev",
+        "rds-replica-lag-alarm-0-dev",
+        "rds-replica-lag-alarm-1-dev",
+    ]
+    assert all(alarm.inputs["alarmActions"] == ["arn:aws:sns:::alerts"] for alarm in replica_alarms)
+
+
+def test_dashboard_accepts_list_outputs():
+    program = factory(
+        "infra.cloudwatch.create_dashboard",
+        lambda_function_name="api-handler-dev",
+        rds_identifier="main-db-dev",
+        api_name="api-dev",
+        replica_identifiers=pulumi.Output.from_input(["replica-1"]),
+        nat_gateway_ids=pulumi.Output.from_input(["nat-a", "nat-b"]),
+    )
+    evaluation = evaluate(program)
+    body = evaluation.of_type("aws:cloudwatch/dashboard:Dashboard")[0].inputs["dashboardBody"]
+
+    assert "replica-1" in body
+    assert "nat-a" in body and "nat-b" in body
+
+
+def test_aurora_dashboard_plots_cluster_storage():
+    def body(**kwargs):
+        program = factory(
+            "infra.cloudwatch.create_dashboard",
+            lambda_function_name="api-handler-dev",
+            rds_identifier="main-db-dev",
+            api_name="api-dev",
+            **kwargs,
+        )
+        evaluation = evaluate(program)
+        return json.loads(evaluation.of_type("aws:cloudwatch/dashboard:Dashboard")[0].inputs["dashboardBody"])
+
+    def metrics(dashboard):
+        return [metric[1] for widget in dashboard["widgets"] for metric in widget["properties"]["metrics"]]
+
+    instance = metrics(body())
+    assert "FreeStorageSpace" in instance
+    assert "VolumeBytesUsed" not in instance
+
+    aurora = body(cluster_identifier="main-aurora-dev")
+    assert "FreeStorageSpace" not in metrics(aurora)
+    assert "FreeLocalStorage" in metrics(aurora)
+    storage = next(widget for widget in aurora["widgets"] if widget["properties"]["title"] == "Aurora Storage")
+    assert storage["properties"]["metrics"] == [["AWS/RDS", "VolumeBytesUsed", "DBClusterIdentifier", "main-aurora-dev"]]
@@ -0,0 +1,129 @@
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from flow_logs_analyzer import COLUMNS, PathClassifier, aggregate, flow_partition_prefix, query, s3_prefix_cidrs, top
+from logs_query import LocalArchive
+
+ACCOUNT_ID = "123456789012"
+HOUR = datetime(2026, 10, 1, 10, tzinfo=timezone.utc)
+S3_PREFIX = "52.95.128.0/21"
+S3_ADDRESS = "52.95.130.10"
+
+
+def flow(**fields) -> dict:
+    row = {name: None for name in COLUMNS}
+    row.update({"interface_id": "eni-lambda", "protocol": 6, "dstport": 443, "packets": 1, "bytes": 100})
+    row.update(fields)
+    return row
+
+
+@pytest.fixture
+def classifier():
+    return PathClassifier(
+        ["10.0.0.0/16"],
+        nat_interfaces=["eni-nat"],
+        endpoint_addresses=["10.0.64.20"],
+        gateway_prefixes=[S3_PREFIX],
+    )
+
+
+def test_partition_prefix_follows_the_hive_layout():
+    assert flow_partition_prefix(ACCOUNT_ID, HOUR) == (
+        "flow-logs/AWSLogs/aws-account-id=123456789012/aws-service=vpcflowlogs/"
+        "aws-region=eu-west-3/year=2026/month=10/day=01/hour=10/"
+    )
+
+
+@pytest.mark.parametrize(
+    ("fields", "path"),
+    [
+        ({"interface_id": "eni-nat", "srcaddr": "10.0.64.5", "dstaddr": "8.8.8.8"}, "nat"),
+        ({"srcaddr": "10.0.64.5", "dstaddr": "10.0.64.20", "traffic_path": 1}, "endpoint"),
+        ({"srcaddr": "10.0.64.5", "dstaddr": "10.0.128.7", "traffic_path": 1}, "local"),
+        ({"srcaddr": "10.0.64.5", "dstaddr": "8.8.8.8", "traffic_path": 1}, "nat"),
+        # traffic-path 2 : gateway endpoint S3 ou internet gateway selon la destination
+        ({"srcaddr": "10.0.64.5", "dstaddr": S3_ADDRESS, "traffic_path": 2}, "endpoint"),
+        ({"srcaddr": "10.0.0.5", "dstaddr": "8.8.8.8", "traffic_path": 2}, "internet"),
+        ({"srcaddr": "10.0.64.5", "dstaddr": S3_ADDRESS, "traffic_path": 7}, "endpoint"),
+        ({"srcaddr": "10.0.0.5", "dstaddr": "8.8.8.8", "traffic_path": 8}, "internet"),
+        # Réponse entrante, sans traffic-path
+        ({"srcaddr": S3_ADDRESS, "dstaddr": "10.0.64.5", "flow_direction": "ingress"}, "endpoint"),
+        ({"srcaddr": "8.8.8.8", "dstaddr": "10.0.0.5", "flow_direction": "ingress"}, "internet"),
+        # Adresses réelles derrière une ENI intermédiaire
+        ({"srcaddr": "10.0.0.9", "dstaddr": "10.0.0.10", "pkt_dstaddr": S3_ADDRESS, "traffic_path": 2}, "endpoint"),
+        ({"srcaddr": "-", "dstaddr": "-"}, "other"),
+    ],
+)
+def test_paths(classifier, fields, path):
+    assert classifier.classify(flow(**fields)) == path
+
+
+def test_without_prefix_list_path_2_is_internet():
+    classifier = PathClassifier(["10.0.0.0/16"])
+    assert classifier.classify(flow(srcaddr="10.0.64.5", dstaddr=S3_ADDRESS, traffic_path=2)) == "internet"
+
+
+def test_aggregate_sums_per_group(classifier):
+    rows = [
+        flow(srcaddr="10.0.64.5", dstaddr=S3_ADDRESS, traffic_path=2, bytes=5000, packets=4),
+        flow(srcaddr="10.0.64.6", dstaddr=S3_ADDRESS, traffic_path=2, bytes=3000, packets=2),
+        flow(srcaddr="10.0.0.5", dstaddr="8.8.8.8", traffic_path=8, bytes=700, packets=1, protocol=17, dstport=53),
+        flow(interface_id="eni-nat", srcaddr="10.0.0.5", dstaddr="8.8.8.8", bytes=None, packets=None),
+    ]
+
+    totals = aggregate(rows, classifier, ["path", "port"])
+
+    assert totals == {
+        ("endpoint", "tcp/443"): [8000, 6, 2],
+        ("internet", "udp/53"): [700, 1, 1],
+        ("nat", "tcp/443"): [0, 0, 1],
+    }
+    assert top(totals, 1) == [(("endpoint", "tcp/443"), [8000, 6, 2])]
+
+
+def test_query_reads_only_parquet_in_the_requested_hours(tmp_path, classifier):
+    start = int(HOUR.timestamp())
+    rows = [
+        flow(srcaddr="10.0.64.5", dstaddr=S3_ADDRESS, traffic_path=2, start=start + 60, bytes=4000),
+        flow(srcaddr="10.0.0.5", dstaddr="8.8.8.8", traffic_path=8, start=start + 120, bytes=900),
+        # Flux agrégé dans le fichier de l'heure mais démarré après la fin de la plage
+        flow(srcaddr="10.0.0.5", dstaddr="8.8.8.8", traffic_path=8, start=start + 7200, bytes=50),
+    ]
+    directory = tmp_path / flow_partition_prefix(ACCOUNT_ID, HOUR)
+    directory.mkdir(parents=True)
+    # Fichier Parquet sans certaines colonnes optionnelles : elles valent None
+    table = pa.Table.from_pylist([{k: v for k, v in row.items() if k != "pkt_srcaddr"} for row in rows])
+    pq.write_table(table, directory / "flows.parquet")
+    (directory / "flows.parquet.tmp").write_bytes(b"partial")
+    later = tmp_path / flow_partition_prefix(ACCOUNT_ID, HOUR.replace(hour=12))
+    later.mkdir(parents=True)
+    pq.write_table(table, later / "flows.parquet")
+
+    read = list(query(LocalArchive(tmp_path), ACCOUNT_ID, HOUR, HOUR.replace(hour=11)))
+
+    assert [row["bytes"] for row in read] == [4000, 900]
+    assert all(row["pkt_srcaddr"] is None for row in read)
+    assert aggregate(read, classifier, ["path"]) == {("endpoint",): [4000, 1, 1], ("internet",): [900, 1, 1]}
+
+
+def test_s3_prefix_list_entries_are_paginated():
+    class FakeEc2:
+        def describe_managed_prefix_lists(self, Filters):
+            assert Filters == [{"Name": "prefix-list-name", "Values": ["com.amazonaws.eu-west-3.s3"]}]
+            return {"PrefixLists": [{"PrefixListId": "pl-23ad7b4a"}]}
+
+        def get_paginator(self, name):
+            assert name == "get_managed_prefix_list_entries"
+
+            class Paginator:
+                def paginate(self, PrefixListId):
+                    assert PrefixListId == "pl-23ad7b4a"
+                    yield {"Entries": [{"Cidr": "52.95.128.0/21"}]}
+                    yield {"Entries": [{"Cidr": "3.5.224.0/22"}]}
+
+            return Paginator()
+
+    assert s3_prefix_cidrs(FakeEc2()) == ["52.95.128.0/21", "3.5.224.0/22"]
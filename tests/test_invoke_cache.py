@@ -0,0 +1,72 @@
+import json
+import time
+
+import pytest
+
+from conftest import ACCOUNT_ID, AVAILABILITY_ZONES, evaluate
+
+AZ_TOKEN = "aws:index/getAvailabilityZones:getAvailabilityZones"
+IDENTITY_TOKEN = "aws:index/getCallerIdentity:getCallerIdentity"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("INVOKE_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("INVOKE_CACHE_REFRESH", raising=False)
+    return tmp_path
+
+
+def cached_program(config: dict = None):
+    return evaluate(config={"invoke_cache": "true", **(config or {})})
+
+
+def test_second_evaluation_runs_offline(cache_dir):
+    first = cached_program()
+    second = cached_program()
+
+    assert first.invokes[AZ_TOKEN] == 1
+    assert first.invokes[IDENTITY_TOKEN] == 1
+    assert sum(second.invokes.values()) == 0
+    assert len(second.resources) == len(first.resources)
+
+    entries = json.loads((cache_dir / "cloud-module-dev-eu-west-3.json").read_text())
+    assert entries["availability_zones:available"]["value"] == AVAILABILITY_ZONES
+    assert entries["account_id"]["value"] == ACCOUNT_ID
+
+
+def test_expired_entries_are_fetched_again(cache_dir):
+    cached_program()
+    path = cache_dir / "cloud-module-dev-eu-west-3.json"
+    entries = json.loads(path.read_text())
+    entries["account_id"]["fetched_at"] = time.time() - 7200
+    path.write_text(json.dumps(entries))
+
+    evaluation = cached_program({"invoke_cache_ttl": 3600})
+
+    assert evaluation.invokes[IDENTITY_TOKEN] == 1
+    assert evaluation.invokes[AZ_TOKEN] == 0
+    assert json.loads(path.read_text())["account_id"]["fetched_at"] > time.time() - 60
+
+
+def test_refresh_ignores_the_cache(cache_dir, monkeypatch):
+    cached_program()
+    monkeypatch.setenv("INVOKE_CACHE_REFRESH", "1")
+
+    evaluation = cached_program()
+
+    assert evaluation.invokes[AZ_TOKEN] == 1
+    assert evaluation.invokes[IDENTITY_TOKEN] == 1
+
+
+def test_cache_is_per_stack(cache_dir):
+    cached_program()
+    evaluation = evaluate(config={"invoke_cache": "true", "environment": "prod"}, stack="prod")
+
+    assert evaluation.invokes[AZ_TOKEN] == 1
+    assert (cache_dir / "cloud-module-prod-eu-west-3.json").exists()
+
+
+def test_disabled_cache_writes_nothing(cache_dir):
+    evaluate()
+
+    assert list(cache_dir.iterdir()) == []
@@ -0,0 +1,141 @@
+import asyncio
+import json
+from collections import Counter
+
+import pytest
+
+from load_test import (
+    ConnectionPool,
+    HdrHistogram,
+    RequestSpec,
+    calibrate,
+    load_scenario,
+    render,
+    resolve_urls,
+    run_load,
+    start_stub_server,
+)
+
+
+def run(coroutine):
+    # asyncio.run retire la boucle courante, dont les mocks Pulumi des autres tests ont besoin
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_histogram_keeps_three_significant_digits():
+    histogram = HdrHistogram()
+    for value in range(1, 100_001):
+        histogram.record(value)
+
+    for q in (50, 90, 99, 99.9):
+        expected = 100_000 * q / 100
+        assert abs(histogram.value_at_percentile(q) - expected) / expected < 1e-3
+    assert histogram.value_at_percentile(100) == 100_000
+    assert histogram.min == 1
+
+
+def test_histogram_covers_seconds_and_merges():
+    first, second = HdrHistogram(), HdrHistogram()
+    first.record(250)
+    second.record(45_000_000, count=3)
+
+    first.add(second)
+
+    assert first.total == 4
+    assert first.value_at_percentile(25) == 250
+    assert abs(first.value_at_percentile(99) - 45_000_000) / 45_000_000 < 1e-3
+    first.reset()
+    assert first.value_at_percentile(50) == 0
+
+
+def test_scenario_and_target_resolution(tmp_path):
+    scenario = tmp_path / "scenario.json"
+    scenario.write_text(
+        json.dumps(
+            {
+                "requests": [
+                    {"name": "items", "target": "api", "path": "/api/items", "weight": 3},
+                    {"name": "index", "target": "cdn", "path": "index.html"},
+                ]
+            }
+        )
+    )
+
+    specs = resolve_urls(
+        load_scenario(str(scenario)),
+        {"api": "https://abc.execute-api.eu-west-3.amazonaws.com/prod", "cdn": "https://d123.cloudfront.net"},
+    )
+
+    assert [spec.url for spec in specs] == [
+        "https://abc.execute-api.eu-west-3.amazonaws.com/prod/api/items",
+        "https://d123.cloudfront.net/index.html",
+    ]
+    with pytest.raises(ValueError, match="Cible inconnue"):
+        resolve_urls([RequestSpec(name="x", target="db")], {"api": "http://localhost"})
+
+
+async def against_stub(specs: list[RequestSpec], rate: float, duration: float, connections: int = 16, **kwargs) -> dict:
+    server, url = await start_stub_server()
+    pool = ConnectionPool(limit=connections)
+    try:
+        return await run_load(resolve_urls(specs, {"stub": url}), rate, duration, pool, **kwargs)
+    finally:
+        await pool.close()
+        server.close()
+        await server.wait_closed()
+
+
+def test_fixed_arrival_rate_with_weighted_mix():
+    specs = [
+        RequestSpec(name="ok", target="stub", path="/", weight=3),
+        RequestSpec(name="unavailable", target="stub", path="/status/503", weight=1),
+    ]
+    intervals = []
+
+    report = run(against_stub(specs, rate=200, duration=1.0, report_interval=0.4, on_report=intervals.append))
+
+    endpoints = report["endpoints"]
+    assert endpoints["ok"]["count"] + endpoints["unavailable"]["count"] == 200
+    assert 110 <= endpoints["ok"]["count"] <= 190
+    assert endpoints["unavailable"]["statuses"] == {503: endpoints["unavailable"]["count"]}
+    assert report["send_rate"] == pytest.approx(200, rel=0.1)
+    # Connexions réutilisées : bien moins d'ouvertures que de requêtes
+    assert report["connections"] <= 16
+    assert intervals and set(intervals[0]) == {"ok", "unavailable"}
+    assert "unavailable" in render(report)
+
+
+def test_latency_is_measured_from_the_intended_start():
+    # Une seule connexion, 20 ms par réponse, 100 requêtes/s : la file s'allonge
+    specs = [RequestSpec(name="slow", target="stub", path="/delay/20")]
+
+    report = run(against_stub(specs, rate=100, duration=0.5, connections=1))
+
+    slow = report["endpoints"]["slow"]
+    assert slow["service_ms"]["p99"] < 100
+    # 50 requêtes servies en ~1 s pour 0,5 s de planning : les dernières attendent ~0,5 s
+    assert slow["latency_ms"]["p99"] > 400
+    assert slow["latency_ms"]["p99"] > 4 * slow["service_ms"]["p99"]
+
+
+def test_connection_errors_are_counted_per_endpoint():
+    async def scenario():
+        pool = ConnectionPool(limit=2, timeout=1)
+        # Port fermé : chaque requête échoue à la connexion
+        specs = resolve_urls([RequestSpec(name="down", target="down")], {"down": "http://127.0.0.1:9"})
+        return await run_load(specs, rate=20, duration=0.25, pool=pool)
+
+    report = run(scenario())
+
+    assert Counter(report["endpoints"]["down"]["errors"]).total() == 5
+
+
+def test_calibrate_reports_the_generator_ceiling():
+    result = run(calibrate(duration=0.3, start_rate=100, max_rate=400))
+
+    assert result["max_rate"] >= 100
+    assert [step["rate"] for step in result["steps"]][:1] == [100]
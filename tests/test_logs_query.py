@@ -0,0 +1,76 @@
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from logs_query import LocalArchive, iter_object_records, partition_prefix, query
+
+START = datetime(2026, 10, 1, 10, tzinfo=timezone.utc)
+END = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+
+RECORDS = [
+    {"routeKey": "GET /api/items", "status": "200", "requestTime": "01/Oct/2026:10:05:00 +0000"},
+    {"routeKey": "POST /api/items", "status": "500", "requestTime": "01/Oct/2026:10:06:00 +0000"},
+    {"routeKey": "GET /api/items", "status": "200", "requestTime": "01/Oct/2026:13:00:00 +0000"},
+]
+
+
+def write_partition(root, source: str, hour: datetime, name: str, content: bytes) -> None:
+    directory = root / partition_prefix(source, hour)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / name).write_bytes(content)
+
+
+def parquet_bytes(records: list[dict], path) -> bytes:
+    pq.write_table(pa.Table.from_pylist(records), path)
+    return path.read_bytes()
+
+
+def test_jsonl_archive_is_filtered_by_time_and_status(tmp_path):
+    lines = "\n".join(json.dumps(record) for record in RECORDS).encode()
+    write_partition(tmp_path, "api", START, "api-1.jsonl.gz", gzip.compress(lines))
+
+    records = list(query(LocalArchive(tmp_path), "api", START, END, status="500"))
+
+    assert records == [RECORDS[1]]
+
+
+def test_parquet_objects_are_read_with_or_without_extension(tmp_path):
+    content = parquet_bytes(RECORDS, tmp_path / "source.parquet")
+    write_partition(tmp_path, "api", START, "api-1.parquet", content)
+    # Objet Firehose écrit sans extension : reconnu à l'en-tête PAR1
+    write_partition(tmp_path, "api", START.replace(hour=11), "api-2", content)
+
+    records = list(query(LocalArchive(tmp_path), "api", START, END, route="GET /api/items"))
+
+    assert records == [RECORDS[0], RECORDS[0]]
+
+
+class ChunkedBody(io.BytesIO):
+    """Corps S3 lu par morceaux : une lecture sans taille chargerait tout l'objet."""
+
+    def __init__(self, content: bytes):
+        super().__init__(content)
+        self.largest = 0
+
+    def read(self, size=-1):
+        assert size is not None and size >= 0, "objet gzip lu en entier"
+        self.largest = max(self.largest, size)
+        return super().read(size)
+
+
+def test_gzip_objects_are_streamed():
+    lines = "\n".join(json.dumps({"requestId": f"{i * 2654435761 % 2**32:08x}"}) for i in range(100000)).encode()
+    content = gzip.compress(lines)
+    body = ChunkedBody(content)
+
+    records = iter_object_records("api-1.jsonl.gz", lambda: body)
+
+    assert next(records) == {"requestId": "00000000"}
+    assert body.tell() < len(content)
+    assert sum(1 for _ in records) == 99999
+    assert body.largest < len(content)
+    assert body.closed
@@ -0,0 +1,125 @@
+import io
+import os
+
+import pytest
+from botocore.exceptions import ClientError
+
+from object_cache import ObjectCache
+
+
+class Body(io.BytesIO):
+    def iter_chunks(self, chunk_size):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+
+class FakeS3:
+    def __init__(self, objects: dict):
+        self.objects = objects
+        self.versions = dict.fromkeys(objects, 1)
+        self.calls = []
+
+    def put(self, key: str, data: bytes) -> None:
+        self.objects[key] = data
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        self.calls.append((Key, IfNoneMatch))
+        etag = f'"{self.versions[Key]}"'
+        if IfNoneMatch == etag:
+            raise ClientError({"Error": {"Code": "304", "Message": "Not Modified"}}, "GetObject")
+        data = self.objects[Key]
+        return {"ETag": etag, "ContentLength": len(data), "Body": Body(data)}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def s3():
+    return FakeS3({"small.json": b'{"ok": true}', "large.bin": b"x" * 4096})
+
+
+@pytest.fixture
+def cache(s3, clock, tmp_path):
+    return ObjectCache("data", s3_client=s3, small_object_bytes=1024, directory=str(tmp_path / "cache"), clock=clock)
+
+
+def test_small_objects_stay_in_memory_and_large_ones_on_disk(cache, s3):
+    assert cache.get("small.json") == b'{"ok": true}'
+    assert cache.get("large.bin") == b"x" * 4096
+    assert cache.get("small.json") == b'{"ok": true}'
+
+    assert "small.json" in cache.memory and "large.bin" in cache.disk
+    assert cache.stats["hits"] == 1
+    assert len(s3.calls) == 2
+
+
+@pytest.mark.parametrize("key", ["small.json", "large.bin"])
+def test_path_and_mmap_work_for_uncached_objects(cache, s3, key):
+    mapped = cache.open_mmap(key)
+
+    assert mapped[:] == s3.objects[key]
+    assert key in cache.disk and key not in cache.memory
+    with open(cache.path(key), "rb") as handle:
+        assert handle.read() == s3.objects[key]
+    mapped.close()
+
+
+def test_small_object_already_in_memory_is_spilled_to_disk(cache, s3):
+    cache.get("small.json")
+
+    path = cache.path("small.json")
+
+    assert open(path, "rb").read() == s3.objects["small.json"]
+    assert "small.json" not in cache.memory
+    assert cache.get("small.json") == s3.objects["small.json"]
+    assert len(s3.calls) == 1
+
+
+def test_unchanged_object_is_revalidated_with_its_etag(cache, s3, clock):
+    cache.get("large.bin")
+    clock.now = 120
+
+    assert cache.get("large.bin") == b"x" * 4096
+
+    assert s3.calls[-1] == ("large.bin", '"1"')
+    assert cache.stats["revalidated"] == 1
+
+
+def test_changed_etag_refreshes_the_entry(cache, s3, clock):
+    old_path = cache.path("small.json")
+    s3.put("small.json", b'{"ok": false}')
+    clock.now = 120
+
+    path = cache.path("small.json")
+
+    # Le rafraîchissement range le petit objet en mémoire, path() le remet sur disque
+    assert open(path, "rb").read() == b'{"ok": false}'
+    assert cache.stats["refreshed"] == 1
+    assert path != old_path
+    assert cache.get("small.json") == b'{"ok": false}'
+
+
+def test_disk_budget_evicts_least_recently_used_files(s3, clock, tmp_path):
+    for i in range(3):
+        s3.put(f"part-{i}", bytes([i]) * 4096)
+    cache = ObjectCache("data", s3_client=s3, small_object_bytes=1024, disk_budget_bytes=8192, directory=str(tmp_path), clock=clock)
+
+    first = cache.path("part-0")
+    cache.get("part-1")
+    cache.get("part-2")
+
+    assert "part-0" not in cache.disk
+    assert cache.disk.evictions == 1
+    assert not os.path.exists(first)
@@ -0,0 +1,325 @@
+import collections
+import json
+
+import pulumi
+import pytest
+
+from conftest import evaluate
+
+HISTORICAL_EXPORTS = {
+    "vpc_id",
+    "public_subnet_ids",
+    "private_subnet_ids",
+    "subnet_plan",
+    "nat_gateway_ids",
+    "nat_interface_ids",
+    "vpc_endpoint_ids",
+    "static_bucket_name",
+    "data_bucket_name",
+    "rds_endpoint",
+    "rds_port",
+    "rds_engine",
+    "rds_instance_class",
+    "lambda_max_concurrency",
+    "rds_reader_hosts",
+    "lambda_function_name",
+    "lambda_function_arn",
+    "api_gateway_url",
+    "api_gateway_id",
+    "cloudfront_domain",
+    "cloudfront_distribution_id",
+    "waf_acl_arn",
+    "db_secret_arn",
+    "lambda_db_secret_arn",
+    "api_key_secret_arn",
+    "api_log_stream_name",
+    "lambda_log_stream_name",
+    "sns_alerts_topic_arn",
+}
+
+
+@pytest.fixture(scope="module")
+def dev():
+    return evaluate()
+
+
+@pytest.fixture(scope="module")
+def prod():
+    return evaluate(config={"environment": "prod"}, stack="prod")
+
+
+def urn_of(evaluation, name: str) -> str:
+    return evaluation.named(name).urn
+
+
+def test_dev_resource_counts(dev):
+    counts = dev.counts()
+
+    assert counts["aws:ec2/vpc:Vpc"] == 1
+    assert counts["aws:ec2/subnet:Subnet"] == 4
+    assert counts["aws:ec2/natGateway:NatGateway"] == 1
+    assert counts["aws:ec2/vpcEndpoint:VpcEndpoint"] == 1
+    assert counts["aws:rds/instance:Instance"] == 1
+    assert counts["aws:lambda/function:Function"] == 1
+    assert counts["aws:cloudwatch/metricAlarm:MetricAlarm"] == 5
+    assert counts["aws:ec2/flowLog:FlowLog"] == 1
+    assert counts["aws:elasticache/serverlessCache:ServerlessCache"] == 0
+
+
+def test_prod_adds_nat_per_az_and_interface_endpoints(prod):
+    counts = prod.counts()
+
+    assert counts["aws:ec2/natGateway:NatGateway"] == 2
+    assert counts["aws:ec2/routeTable:RouteTable"] == 3
+    # S3 gateway + Secrets Manager et CloudWatch Logs
+    assert counts["aws:ec2/vpcEndpoint:VpcEndpoint"] == 3
+    assert prod.named("api-handler-prod").inputs["reservedConcurrentExecutions"] == 320
+
+
+def test_historical_exports_are_kept(dev):
+    assert HISTORICAL_EXPORTS <= set(dev.exports)
+
+
+def test_every_resource_belongs_to_a_layer(dev):
+    components = {resource.urn for resource in dev.resources if resource.type.startswith("cloud-module:layers:")}
+
+    assert len(components) == 4
+    for resource in dev.resources:
+        if resource.urn not in components:
+            assert resource.parent in components, resource.urn
+
+
+def test_database_is_private_and_encrypted(dev):
+    database = dev.named("main-db-dev")
+
+    assert database.inputs["publiclyAccessible"] is False
+    assert database.inputs["storageEncrypted"] is True
+    assert database.inputs["dbSubnetGroupName"] == "rds-subnet-group-dev"
+    assert urn_of(dev, "rds-subnet-group-dev") in database.dependencies
+
+
+def test_lambda_runs_in_private_subnets(dev):
+    function = dev.named("api-handler-dev")
+
+    assert function.inputs["vpcConfig"]["subnetIds"] == ["private-subnet-0-dev-id", "private-subnet-1-dev-id"]
+    assert function.inputs["environment"]["variables"]["DB_HOST"] == "main-db-dev.rds.local:5432"
+    # Le log group existe avant la fonction, sinon Lambda le crée sans rétention
+    assert urn_of(dev, "lambda-logs-dev") in function.dependencies
+
+
+def test_buckets_block_public_access(dev):
+    for block in dev.of_type("aws:s3/bucketPublicAccessBlock:BucketPublicAccessBlock"):
+        assert all(block.inputs[key] for key in ("blockPublicAcls", "blockPublicPolicy", "ignorePublicAcls", "restrictPublicBuckets"))
+
+
+def test_flow_log_waits_for_bucket_policy(dev):
+    flow_log = dev.named("vpc-flow-log-dev")
+
+    assert flow_log.inputs["destinationOptions"]["fileFormat"] == "parquet"
+    assert urn_of(dev, "data-storage-policy-dev") in flow_log.dependencies
+
+
+def test_aurora_serverless():
+    evaluation = evaluate(config={"db_engine": "aurora-serverless"})
+    counts = evaluation.counts()
+
+    assert counts["aws:rds/cluster:Cluster"] == 1
+    assert counts["aws:rds/clusterInstance:ClusterInstance"] == 1
+    assert counts["aws:rds/instance:Instance"] == 0
+    dashboard = json.loads(evaluation.of_type("aws:cloudwatch/dashboard:Dashboard")[0].inputs["dashboardBody"])
+    assert "ServerlessDatabaseCapacity" in json.dumps(dashboard)
+
+
+def test_cache_uses_data_tier():
+    evaluation = evaluate(config={"cache_enabled": "true", "subnet_planner": "true", "az_count": 3})
+
+    cache = evaluation.of_type("aws:elasticache/serverlessCache:ServerlessCache")[0]
+    assert cache.inputs["subnetIds"] == [f"data-subnet-{i}-dev-id" for i in range(3)]
+    variables = evaluation.named("api-handler-dev").inputs["environment"]["variables"]
+    assert variables["CACHE_ENDPOINT"].endswith(".cache.local")
+    # Niveau data sans route sortante
+    assert not evaluation.named("data-rt-dev").inputs.get("routes")
+
+
+def test_managed_master_password_keeps_password_out_of_the_program():
+    evaluation = evaluate(config={"db_manage_master_password": "true"})
+
+    assert not any(resource.name.startswith("db-master") for resource in evaluation.resources)
+    assert evaluation.named("main-db-dev").inputs["manageMasterUserPassword"] is True
+
+
+def test_concurrency_scaler_targets_the_live_alias():
+    evaluation = evaluate(config={"environment": "prod", "concurrency_scaler": "true"}, stack="prod")
+
+    assert evaluation.named("api-handler-prod").inputs["publish"] is True
+    assert evaluation.named("lambda-integration-prod").inputs["integrationUri"].endswith("api-handler-live-prod")
+    assert evaluation.named("api-gateway-lambda-permission-prod").inputs["qualifier"] == "live"
+    variables = evaluation.named("concurrency-scaler-prod").inputs["environment"]["variables"]
+    assert variables["FUNCTION_ALIAS"] == "live"
+    assert variables["MAX_CONCURRENCY"] == "320"
+    assert "MIN_RESERVED" not in variables
+    assert evaluation.named("concurrency-scaler-schedule-prod").inputs["scheduleExpression"] == "rate(15 minutes)"
+
+
+def canonical(value):
+    # Les archives sont comparées sur leur contenu, comme le fait le moteur
+    if isinstance(value, pulumi.AssetArchive):
+        return {name: canonical(asset) for name, asset in value.assets.items()}
+    if isinstance(value, pulumi.FileAsset):
+        return ("file", value.path)
+    if isinstance(value, dict):
+        return {key: canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [canonical(item) for item in value]
+    return value
+
+
+def test_two_evaluations_do_not_diff():
+    first, second = evaluate(), evaluate()
+
+    # Aucune valeur non déterministe (horodatage, aléa hors RandomPassword) dans les entrées
+    assert {resource.urn: canonical(resource.inputs) for resource in first.resources} == {
+        resource.urn: canonical(resource.inputs) for resource in second.resources
+    }
+
+
+def test_layers_add_up_to_the_monolithic_stack(dev):
+    stack_outputs = {
+        "network": {name: f"{name}-ref" for name in ("vpc_id", "lambda_sg_id", "rds_sg_id", "rotation_sg_id", "cache_sg_id", "endpoint_sg_id")}
+        | {
+            "private_subnet_ids": ["subnet-a", "subnet-b"],
+            "data_subnet_ids": ["subnet-a", "subnet-b"],
+            "private_route_table_ids": ["rtb-a"],
+            "nat_gateway_ids": {"eu-west-3a": "nat-a"},
+        },
+        "data": {
+            "data_bucket_arn": "arn:aws:s3:::data",
+            "data_bucket_name": "data",
+            "lambda_db_secret_arn": "arn:aws:secretsmanager:::secret",
+            "rds_endpoint": "db.local:5432",
+            "rds_reader_hosts": [],
+            "db_identifier": "main-db-dev",
+            "db_replica_identifiers": [],
+            "sns_alerts_topic_arn": "arn:aws:sns:::alerts",
+        },
+    }
+
+    total = sum(
+        (
+            evaluate(config={"layer": layer}, stack_outputs=stack_outputs).counts()
+            for layer in ("network", "data", "app", "edge")
+        ),
+        start=collections.Counter(),
+    )
+    del total["pulumi:pulumi:StackReference"]
+
+    assert total == dev.counts()
+
+
+def test_unknown_layer_is_rejected():
+    with pytest.raises(Exception, match="layer must be"):
+        evaluate(config={"layer": "cdn"})
+
+
+def test_route_table_adds_sized_functions_and_throttled_routes():
+    routes = {
+        "exports": {
+            "memory_size": 2048,
+            "timeout": 120,
+            "reserved_concurrency": 20,
+            "routes": {"POST /api/exports": {"burst": 5, "rate": 2}},
+        },
+    }
+    evaluation = evaluate(
+        config={"environment": "prod", "concurrency_scaler": "true", "api_routes": json.dumps(routes)},
+        stack="prod",
+    )
+
+    exports = evaluation.named("api-exports-prod").inputs
+    assert (exports["memorySize"], exports["timeout"], exports["reservedConcurrentExecutions"]) == (2048, 120, 20)
+    assert exports["publish"] is False
+    assert evaluation.named("api-handler-prod").inputs["reservedConcurrentExecutions"] == 300
+    assert evaluation.named("lambda-integration-exports-prod").inputs["timeoutMilliseconds"] == 30000
+    assert evaluation.named("route-post-api-exports-prod").inputs["routeKey"] == "POST /api/exports"
+    assert evaluation.named("api-stage-prod").inputs["routeSettings"] == [
+        {
+            "routeKey": "POST /api/exports",
+            "detailedMetricsEnabled": True,
+            "throttlingBurstLimit": 5,
+            "throttlingRateLimit": 2.0,
+        }
+    ]
+    assert evaluation.named("api-gateway-lambda-exports-permission-prod").inputs["function"] == "api-exports-prod"
+    assert evaluation.named("lambda-exports-duration-alarm-prod").inputs["threshold"] == 96000
+    variables = evaluation.named("concurrency-scaler-prod").inputs["environment"]["variables"]
+    assert variables["MAX_CONCURRENCY"] == "300"
+
+
+def test_secret_rotation_is_opt_in():
+    prod = evaluate(config={"environment": "prod"}, stack="prod")
+    assert not prod.of_type("aws:secretsmanager/secretRotation:SecretRotation")
+
+    with pytest.raises(ValueError, match="db_app_password"):
+        evaluate(config={"db_secret_rotation": "true"})
+
+    evaluation = evaluate(config={"db_secret_rotation": "true", "db_app_password": "app-password"})
+    rotation = evaluation.named("db-app-credentials-rotation-dev")
+    assert rotation.inputs["rotateImmediately"] is False
+    variables = evaluation.named("api-handler-dev").inputs["environment"]["variables"]
+    assert variables["DB_SECRET_ARN"].endswith("db-app-credentials-dev")
+
+
+def test_parquet_archive_objects_carry_their_extension():
+    evaluation = evaluate(config={"log_archive_parquet": "true"})
+
+    api = evaluation.named("api-log-archive-dev").inputs["extendedS3Configuration"]
+    lambda_ = evaluation.named("lambda-log-archive-dev").inputs["extendedS3Configuration"]
+    assert (api["fileExtension"], lambda_["fileExtension"]) == (".parquet", ".jsonl.gz")
+
+
+def test_stage_throttling_defaults_to_the_account_limits(dev):
+    settings = dev.named("api-stage-dev").inputs["defaultRouteSettings"]
+    assert (settings["throttlingBurstLimit"], settings["throttlingRateLimit"]) == (5000, 10000)
+
+    evaluation = evaluate(config={"api_throttling_burst_limit": "500", "api_throttling_rate_limit": "200"})
+
+    settings = evaluation.named("api-stage-dev").inputs["defaultRouteSettings"]
+    assert (settings["throttlingBurstLimit"], settings["throttlingRateLimit"]) == (500, 200.0)
+
+
+def test_adding_an_az_keeps_deployed_subnet_cidrs():
+    def cidrs(evaluation, az_count):
+        return {
+            tier: [evaluation.named(f"{tier}-subnet-{i}-dev").inputs["cidrBlock"] for i in range(az_count)]
+            for tier in ("public", "private", "data")
+        }
+
+    two = evaluate(config={"subnet_planner": "true", "az_count": 2})
+    three = evaluate(config={"subnet_planner": "true", "az_count": 3, "subnet_cidrs": json.dumps(two.exports["subnet_plan"])})
+
+    before, after = cidrs(two, 2), cidrs(three, 3)
+    for tier in before:
+        assert after[tier][:2] == before[tier]
+    # Sans épinglage, les emplacements fixes donnent le même résultat
+    unpinned = cidrs(evaluate(config={"subnet_planner": "true", "az_count": 3}), 3)
+    assert unpinned == after
+
+
+def test_smaller_replicas_get_their_own_parameter_group():
+    def parameters(evaluation, name):
+        return {parameter["name"]: parameter["value"] for parameter in evaluation.named(name).inputs["parameters"]}
+
+    config = {"environment": "prod", "db_replica_count": 1}
+    same = evaluate(config=config, stack="prod")
+    assert same.named("main-db-replica-0-prod").inputs["parameterGroupName"] == "rds-pg-params-prod"
+    assert not same.of_type("aws:rds/parameterGroup:ParameterGroup")[1:]
+
+    smaller = evaluate(config={**config, "db_replica_instance_class": "db.t4g.medium"}, stack="prod")
+
+    primary = parameters(smaller, "rds-pg-params-prod")
+    replica = parameters(smaller, "rds-replica-pg-params-prod")
+    assert smaller.named("main-db-replica-0-prod").inputs["parameterGroupName"] == "rds-replica-pg-params-prod"
+    # Mémoire du réplica (4 GiB) mais max_connections du primaire, exigé en hot standby
+    assert replica["shared_buffers"] == str(4 * 1024 * 1024 // 4 // 8)
+    assert int(replica["shared_buffers"]) < int(primary["shared_buffers"])
+    assert replica["max_connections"] == primary["max_connections"] == "400"
@@ -0,0 +1,30 @@
+from conftest import evaluate
+
+SECRET_TYPES = (
+    "random:index/randomPassword:RandomPassword",
+    "aws:secretsmanager/secretVersion:SecretVersion",
+    "aws:rds/instance:Instance",
+)
+
+
+def secret_inputs(evaluation) -> dict:
+    return {
+        resource.name: {key: resource.inputs.get(key) for key in ("keepers", "secretString", "password")}
+        for resource in evaluation.resources
+        if resource.type in SECRET_TYPES
+    }
+
+
+def test_consecutive_evaluations_keep_passwords():
+    first, second = evaluate(), evaluate()
+
+    # Mots de passe lus dans l'état (RandomPassword) : ni SecretVersion ni modification RDS au second `up`
+    assert secret_inputs(first) == secret_inputs(second)
+
+
+def test_rotation_id_is_the_only_regeneration_trigger():
+    rotated = evaluate(config={"password_rotation_id": "2026-10"})
+
+    assert rotated.named("db-master-password-dev").inputs["keepers"] == {"rotation": "2026-10"}
+    assert rotated.named("api-key-password-dev").inputs["keepers"] == {"rotation": "2026-10"}
+
@@ -0,0 +1,153 @@
+import argparse
+import math
+import os
+
+import pytest
+
+from top_sql import Z_95, build_report, diff_snapshots, render_table, take_snapshot
+
+
+def stats(calls, total, stddev=0.0, rows=0, hit=0, read=0, query="SELECT 1"):
+    return {
+        "query": query,
+        "calls": calls,
+        "total_time": total,
+        "mean_time": total / calls if calls else 0.0,
+        "stddev_time": stddev,
+        "rows": rows,
+        "shared_blks_hit": hit,
+        "shared_blks_read": read,
+    }
+
+
+def snapshot(**statements):
+    return {"taken_at": "2026-10-01T10:00:00+00:00", "statements": statements}
+
+
+def test_diff_keeps_only_the_interval():
+    before = snapshot(q1=stats(100, 1000.0, rows=100, hit=900, read=100))
+    after = snapshot(q1=stats(150, 2000.0, rows=160, hit=1800, read=100))
+
+    [row] = diff_snapshots(before, after)
+
+    assert (row["calls"], row["total_time_ms"], row["mean_time_ms"], row["rows"]) == (50, 1000.0, 20.0, 60)
+    assert row["hit_ratio"] == 1.0
+
+
+def test_p95_uses_the_interval_variance():
+    # 100 appels à 10 ms puis 100 appels à 30 ms : moyenne 30 et écart-type nul sur l'intervalle
+    before = snapshot(q1=stats(100, 1000.0))
+    after = snapshot(q1=stats(200, 4000.0, stddev=10.0))
+
+    [row] = diff_snapshots(before, after)
+
+    assert row["mean_time_ms"] == 30.0
+    assert row["p95_time_ms"] == pytest.approx(30.0, abs=1e-6)
+
+    # Sans snapshot précédent : écart-type de pg_stat_statements tel quel
+    [fresh] = diff_snapshots(snapshot(), snapshot(q2=stats(10, 100.0, stddev=4.0)))
+    assert fresh["p95_time_ms"] == pytest.approx(10.0 + Z_95 * 4.0)
+
+
+def test_reset_and_idle_statements():
+    before = snapshot(reset=stats(500, 5000.0), idle=stats(10, 100.0))
+    after = snapshot(reset=stats(20, 400.0, hit=0, read=0), idle=stats(10, 100.0), new=stats(5, 10.0))
+
+    rows = {row["queryid"]: row for row in diff_snapshots(before, after)}
+
+    # Compteurs en baisse : reset, l'intervalle repart de zéro
+    assert rows["reset"]["calls"] == 20
+    assert rows["reset"]["hit_ratio"] is None
+    assert "idle" not in rows
+    assert list(rows) == ["reset", "new"]
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql):
+        self.executed.append(sql)
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+
+    def cursor(self):
+        return FakeCursor(self.snapshots.pop(0))
+
+
+def test_report_combines_performance_insights_and_snapshots():
+    class FakeRds:
+        def describe_db_instances(self, DBInstanceIdentifier):
+            return {"DBInstances": [{"DbiResourceId": f"db-{DBInstanceIdentifier}"}]}
+
+    class FakePi:
+        def describe_dimension_keys(self, **kwargs):
+            assert kwargs["Identifier"] == "db-main-db-dev"
+            assert kwargs["GroupBy"] == {"Group": "db.sql_tokenized", "Limit": 5}
+            return {
+                "Keys": [
+                    {
+                        "Total": 1.25,
+                        "Dimensions": {"db.sql_tokenized.id": "A1", "db.sql_tokenized.statement": "SELECT * FROM items"},
+                    }
+                ]
+            }
+
+    row = ("42", "SELECT * FROM items WHERE id = $1", 10, 50.0, 5.0, 1.0, 10, 90, 10)
+    later = ("42", "SELECT * FROM items WHERE id = $1", 30, 110.0, 110 / 30, 1.0, 30, 290, 10)
+    conn = FakeConnection([row], [later])
+    args = argparse.Namespace(minutes=60, instance="main-db-dev", limit=5, before=None, after=None, interval=0)
+
+    report = build_report(args, FakePi(), FakeRds(), conn)
+
+    assert report["performance_insights"] == [{"sql_id": "A1", "statement": "SELECT * FROM items", "db_load": 1.25}]
+    assert report["statements"][0]["calls"] == 20
+    assert report["statements"][0]["mean_time_ms"] == pytest.approx(3.0)
+    assert "SELECT * FROM items" in render_table(report)
+
+
+def test_snapshot_against_local_postgres():
+    # Postgres local avec pg_stat_statements : DATABASE_URL=postgresql://localhost/appdb
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        pytest.skip("DATABASE_URL non défini")
+    psycopg = pytest.importorskip("psycopg")
+
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        before = take_snapshot(conn)
+        for _ in range(5):
+            conn.execute("SELECT count(*) FROM pg_class")
+        after = take_snapshot(conn)
+
+    counted = [row for row in diff_snapshots(before, after) if "pg_class" in row["query"]]
+    assert counted and counted[0]["calls"] >= 5
+    assert math.isfinite(counted[0]["p95_time_ms"])
+
+
+def test_local_report_runs_without_botocore(tmp_path, monkeypatch, capsys):
+    import json
+    import sys
+
+    import top_sql
+
+    before, after = tmp_path / "before.json", tmp_path / "after.json"
+    before.write_text(json.dumps(snapshot(q1=stats(1, 1.0, query="SELECT now()"))))
+    after.write_text(json.dumps(snapshot(q1=stats(3, 5.0, query="SELECT now()"))))
+    # Un import de botocore lèverait ImportError
+    monkeypatch.setitem(sys.modules, "botocore", None)
+    monkeypatch.setitem(sys.modules, "botocore.exceptions", None)
+    monkeypatch.setattr(sys, "argv", ["top_sql.py", "report", "--before", str(before), "--after", str(after)])
+
+    top_sql.main()
+
+    assert "SELECT now()" in capsys.readouterr().out